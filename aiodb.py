@@ -0,0 +1,104 @@
+"""Async MySQL pool for the ASGI API tier (asgi.py).
+
+Connection settings resolve exactly as in db.py (DATABASE_URL, else the
+DB_* settings including DB_PORT), so both tiers talk to the same database.
+Pools are opened on startup and sized by ASYNC_DB_POOL_MIN /
+ASYNC_DB_POOL_MAX, one for the primary and one per DB_REPLICA_HOSTS entry.
+Reads go to a replica db.py currently considers healthy unless the caller
+asks for the primary. Statements go through db.record_query so they count
+toward /metrics and the slow-query log.
+"""
+import asyncio
+import os
+import time
+
+import aiomysql
+
+import db
+from db import record_query
+
+_pool = None
+_replica_pools = {}   # replica name -> aiomysql pool
+
+
+async def _create_pool(backend, host=None, port=None):
+    params = backend.params(host, port)
+    return await aiomysql.create_pool(
+        host=params['host'],
+        port=params['port'],
+        user=params['user'],
+        password=params['password'],
+        db=params['database'],
+        minsize=int(os.environ.get("ASYNC_DB_POOL_MIN", 1)),
+        maxsize=int(os.environ.get("ASYNC_DB_POOL_MAX", 20)),
+        pool_recycle=int(os.environ.get("DB_POOL_RECYCLE", 3600)),
+        autocommit=False,
+    )
+
+
+async def open_pool():
+    global _pool
+    if _pool is None:
+        backend = db.get_backend()
+        if backend.name != 'mysql':
+            raise RuntimeError(f"the ASGI tier needs MySQL, but DATABASE_URL selects {backend.name}; "
+                               f"serve this database with `python app.py` instead")
+        _pool = await _create_pool(backend)
+        for replica in db.get_replicas():
+            host, _, port = replica.name.partition(":")
+            _replica_pools[replica.name] = await _create_pool(backend, host, int(port) if port else None)
+    return _pool
+
+
+async def close_pool():
+    global _pool
+    pools = [_pool] + list(_replica_pools.values())
+    _pool = None
+    _replica_pools.clear()
+    for pool in pools:
+        if pool is not None:
+            pool.close()
+            await pool.wait_closed()
+
+
+async def _read_pool(primary):
+    if primary or not _replica_pools:
+        return await open_pool()
+    # the lag check may have to connect, so it runs off the event loop
+    replica = await asyncio.to_thread(db.pick_replica)
+    if replica is None:
+        return await open_pool()
+    return _replica_pools.get(replica.name) or await open_pool()
+
+
+async def _run(query, params, fetch, primary=True):
+    pool = await open_pool() if fetch is None else await _read_pool(primary)
+    async with pool.acquire() as conn:
+        start = time.perf_counter()
+        try:
+            async with conn.cursor(aiomysql.DictCursor) as cur:
+                await cur.execute(query, params)
+                if fetch == 'all':
+                    return await cur.fetchall()
+                if fetch == 'one':
+                    return await cur.fetchone()
+                await conn.commit()
+                return cur.rowcount
+        finally:
+            if fetch is not None:
+                # end the read's snapshot so the next borrower sees fresh rows
+                await conn.rollback()
+            record_query(query, time.perf_counter() - start)
+
+
+async def fetchall_dict(query, params=(), primary=False):
+    return await _run(query, params, 'all', primary)
+
+
+async def fetchone_dict(query, params=(), primary=False):
+    return await _run(query, params, 'one', primary)
+
+
+async def execute(query, params=()):
+    """Run a write and commit; returns the affected row count."""
+    return await _run(query, params, None)
@@ -1,85 +1,90 @@
 import os
 from dotenv import load_dotenv
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
-from flask_bcrypt import Bcrypt
+from flask import Flask, Response, abort, current_app, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
-import mysql.connector
-from datetime import datetime, timedelta
-from math import radians, cos, sin, asin, sqrt
+from datetime import datetime
 import json
-from os import getenv
-from mysql.connector import pooling
-from pathlib import Path
+import threading
+import assets
+import db
+import metrics
+from db import fetchall_dict, fetchone_dict, execute, transaction
+from pagination import decode_cursor, keyset_clause, page_size, split_page
+import scores
+from locations import get_buffer
+from nearby import get_nearby
+import eta
+import passwords
+from events import TooManyStreams, broker, stream
+import versions
+from markupsafe import Markup
+from cache import TTLCache
 
 load_dotenv()
 
-if os.path.exists(".env"):
-    load_dotenv()
+REQUIRED_ENV = ("DB_HOST", "DB_USER", "DB_PASS", "DB_NAME")
 
-SECRET_KEY = os.getenv("SECRET_KEY")
-DB_HOST = os.getenv("DB_HOST")
-DB_USER = os.getenv("DB_USER")
-DB_PASS = os.getenv("DB_PASS")
-DB_NAME = os.getenv("DB_NAME")
-GOOGLE_MAPS_API_KEY = os.getenv("GOOGLE_MAPS_API_KEY")
-
-
-required = {
-    "SECRET_KEY": SECRET_KEY,
-    "DB_HOST": DB_HOST,
-    "DB_USER": DB_USER,
-    "DB_PASS": DB_PASS,
-    "DB_NAME": DB_NAME
-}
-
-
-
-missing = [k for k,v in (("SECRET_KEY",SECRET_KEY),("DB_HOST",DB_HOST),("DB_USER",DB_USER),("DB_PASS",DB_PASS),("DB_NAME",DB_NAME)) if not v]
-if missing:
-    raise RuntimeError(f"Missing required environment variables: {', '.join(missing)}")
-
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-
-app = Flask(__name__)
-app.secret_key = os.environ.get("SECRET_KEY", "dev_secret_key")
-bcrypt = Bcrypt(app)
 login_manager = LoginManager()
-login_manager.init_app(app)
-
-# DB helpers
-def get_db_connection():
-    return mysql.connector.connect(
-        host=os.environ.get("DB_HOST", "localhost"),
-        user=os.environ.get("DB_USER", "root"),
-        password=os.environ.get("DB_PASS", ""),
-        database=os.environ.get("DB_NAME", "homimeet_db")
-    )
 
-def fetchall_dict(query, params=()):
-    conn = get_db_connection()
-    cur = conn.cursor(dictionary=True)
-    cur.execute(query, params)
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
-    return rows
-
-def fetchone_dict(query, params=()):
-    conn = get_db_connection()
-    cur = conn.cursor(dictionary=True)
-    cur.execute(query, params)
-    row = cur.fetchone()
-    cur.close()
-    conn.close()
-    return row
-
-def execute(query, params=()):
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute(query, params)
-    conn.commit()
-    cur.close()
-    conn.close()
+# Views register here and are attached to each app by create_app(), so
+# endpoint names (url_for('login'), ...) stay the same as with @app.route.
+_routes = []
+
+def route(rule, **options):
+    def decorator(view):
+        _routes.append((rule, options.pop('endpoint', view.__name__), view, options))
+        return view
+    return decorator
+
+def create_app(config=None):
+    """Build the Flask app. Settings come from .env / the environment, then `config`.
+
+    DATABASE_URL picks the storage backend (see backends.py); without it the
+    DB_* settings for MySQL are required.
+    """
+    app = Flask(__name__)
+    app.config.update(
+        SECRET_KEY=os.getenv("SECRET_KEY"),
+        DATABASE_URL=os.getenv("DATABASE_URL"),
+        GOOGLE_API_KEY=os.getenv("GOOGLE_API_KEY"),
+        # where pages open their live-update stream; unset = no stream (see events.py)
+        EVENTS_URL=os.getenv("EVENTS_URL"),
+        # scrapers send it as a bearer token; unset = /metrics from loopback only
+        METRICS_TOKEN=os.getenv("METRICS_TOKEN"),
+    )
+    app.config.update(config or {})
+    required = ("SECRET_KEY",) if app.config['DATABASE_URL'] else ("SECRET_KEY",) + REQUIRED_ENV
+    missing = [k for k in required if not (app.config.get(k) or os.getenv(k))]
+    if missing:
+        raise RuntimeError(f"Missing required environment variables: {', '.join(missing)}")
+    if 'BCRYPT_LOG_ROUNDS' in app.config:
+        passwords.get_hasher().rounds = int(app.config['BCRYPT_LOG_ROUNDS'])
+
+    login_manager.init_app(app)
+    # DB helpers (pooled, one connection per request; see db.py)
+    db.init_app(app)
+    # Server-Timing headers, per-route histograms, /metrics
+    metrics.init_app(app)
+    # fingerprinted static files under /assets and the asset_url() template helper
+    assets.init_app(app)
+    for rule, endpoint, view, options in _routes:
+        app.add_url_rule(rule, endpoint, view, **options)
+    app.register_error_handler(passwords.Busy, password_busy)
+    app.context_processor(inject_google_key)
+    return app
+
+_app = None
+_app_lock = threading.Lock()
+
+def __getattr__(name):
+    # `from app import app` (wsgi.py, asgi.py) builds the default app on first use
+    global _app
+    if name == 'app':
+        with _app_lock:
+            if _app is None:
+                _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Flask-Login user
 class User(UserMixin):
@@ -87,64 +92,83 @@ class User(UserMixin):
         self.id = str(id)
         self.username = username
 
+# Users are cached per process so @login_required doesn't cost a DB round trip;
+# entries expire after USER_CACHE_TTL_S and are dropped on profile changes/logout.
+user_cache = TTLCache(maxsize=int(os.environ.get("USER_CACHE_SIZE", 10000)),
+                      ttl=float(os.environ.get("USER_CACHE_TTL_S", 300)))
+
 @login_manager.user_loader
 def load_user(user_id):
-    row = fetchone_dict("SELECT * FROM users WHERE id = %s", (user_id,))
-    if row:
-        return User(row['id'], row['username'])
-    return None
+    user = user_cache.get(str(user_id))
+    if user is None:
+        row = fetchone_dict("SELECT id, username FROM users WHERE id = %s", (user_id,))
+        if not row:
+            return None
+        user = User(row['id'], row['username'])
+        user_cache.set(user.id, user)
+    return user
+
+def user_version():
+    user_id = int(current_user.id)
+    return versions.get([('user', user_id)])[('user', user_id)]
 
 # Simple auth routes (login/signup)
-@app.route("/")
+@route("/")
 def home():
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT NOW()")
-        current_time = cursor.fetchone()[0]
-        cursor.close()
-        conn.close()
+        current_time = fetchone_dict("SELECT NOW() AS now")['now']
         return f"✅ Database connected! Server time: {current_time}"
     except Exception as e:
         return f"❌ DB Connection failed: {e}"
 
-@app.route('/signup', methods=['GET','POST'])
+@route('/signup', methods=['GET','POST'])
 def signup():
     if request.method == 'POST':
         username = request.form['username']
-        password = bcrypt.generate_password_hash(request.form['password']).decode('utf-8')
-        execute("INSERT INTO users (username, password) VALUES (%s, %s)", (username, password))
+        password = passwords.get_hasher().hash(request.form['password'])
+        user_id = execute("INSERT INTO users (username, password) VALUES (%s, %s)", (username, password))
+        user_cache.invalidate(str(user_id))
         flash('Account created!')
         return redirect(url_for('login'))
     return render_template('signup.html')
 
-@app.route('/login', methods=['GET','POST'])
+@route('/login', methods=['GET','POST'])
 def login():
     if request.method == 'POST':
         username = request.form['username']
         password = request.form['password']
         user = fetchone_dict("SELECT * FROM users WHERE username = %s", (username,))
-        if user and bcrypt.check_password_hash(user['password'], password):
-            login_user(User(user['id'], user['username']))
+        hasher = passwords.get_hasher()
+        if user and hasher.check(user['password'], password):
+            new_hash = hasher.rehash(user['password'], password)
+            if new_hash:
+                execute("UPDATE users SET password = %s WHERE id = %s AND password = %s",
+                        (new_hash, user['id'], user['password']))
+            session_user = User(user['id'], user['username'])
+            user_cache.set(session_user.id, session_user)
+            login_user(session_user)
             return redirect(url_for('dashboard'))
         flash('Invalid credentials')
     return render_template('login.html')
 
-@app.route('/logout')
+def password_busy(e):
+    return Response("Too many sign-ins right now, please try again in a few seconds.", 503, {'Retry-After': '2'})
+
+@route('/logout')
 @login_required
 def logout():
+    user_cache.invalidate(current_user.id)
     logout_user()
     return redirect(url_for('login'))
 
-@app.route('/dashboard')
+@route('/dashboard')
 @login_required
 def dashboard():
-    row = fetchone_dict("SELECT AVG(score) AS avg_score FROM punctuality_logs WHERE user_id = %s", (current_user.id,))
-    avg_score = row['avg_score'] if row and row['avg_score'] is not None else 0
+    avg_score = scores.average_score(current_user.id)
     return render_template('dashboard.html', username=current_user.username, avg_score=round(avg_score, 2))
 
 # Create group (simple)
-@app.route('/create_group', methods=['GET','POST'])
+@route('/create_group', methods=['GET','POST'])
 @login_required
 def create_group():
     if request.method == 'POST':
@@ -155,7 +179,7 @@ def create_group():
     return "<form method='post'><input name='group_name' placeholder='Group Name'><input type='submit'></form>"
 
 # Legacy schedule meetup (used in some flows)
-@app.route("/schedule_meetup", methods=["POST"])
+@route("/schedule_meetup", methods=["POST"])
 @login_required
 def schedule_meetup():
     location = request.form.get('location') or request.form.get('title')
@@ -173,61 +197,87 @@ def schedule_meetup():
         flash("Invalid coordinates.")
         return redirect(url_for('my_meetups'))
 
-    execute("""
+    meetup_id = execute("""
         INSERT INTO meetups (user_id, location, scheduled_time, lat, lng, status, created_by)
         VALUES (%s, %s, %s, %s, %s, %s, %s)
     """, (current_user.id, location, scheduled_time, lat, lng, 'scheduled', current_user.id))
+    get_nearby().meetup_changed(meetup_id, lat, lng)
+    versions.bump_meetup(meetup_id)
 
     flash("Meetup successfully scheduled!")
     return redirect(url_for('my_meetups'))
 
 # Punctuality
-@app.route('/submit_punctuality', methods=['GET','POST'])
+@route('/submit_punctuality', methods=['GET','POST'])
 @login_required
 def submit_punctuality():
     if request.method == 'POST':
         user_id = request.form['user_id']
         meetup_id = request.form['meetup_id']
         status = request.form['status']
-        score_map = {'on_time':3,'late':-1,'absent':-3}
-        score = score_map.get(status,0)
-        execute("INSERT INTO punctuality_logs (user_id, meetup_id, status, score) VALUES (%s,%s,%s,%s)",
-                (user_id, meetup_id, status, score))
+        scores.record_punctuality(user_id, meetup_id, status)
         flash('Punctuality recorded.')
         return redirect(url_for('dashboard'))
     return "<form method='post'>User ID: <input name='user_id'><br>Meetup ID: <input name='meetup_id'><br>Status: <select name='status'><option value='on_time'>On Time</option><option value='late'>Late</option><option value='absent'>Absent</option></select><br><input type='submit'></form>"
 
 # Leaderboard
-@app.route('/leaderboard/<int:group_id>')
+@route('/leaderboard/<int:group_id>')
 @login_required
 def leaderboard(group_id):
+    version = versions.get([('group', group_id)])[('group', group_id)]
+    etag, not_modified = versions.not_modified(current_user.id, version)
+    if not_modified:
+        return not_modified
     order = request.args.get('order','desc')
-    order_by = 'DESC' if order=='desc' else 'ASC'
-    rows = fetchall_dict(f"""
-        SELECT u.username, SUM(p.score) AS total_score
-        FROM punctuality_logs p
-        JOIN users u ON u.id = p.user_id
-        JOIN meetups m ON m.id = p.meetup_id
-        WHERE m.group_id = %s
-        GROUP BY p.user_id
-        ORDER BY total_score {order_by}
-    """, (group_id,))
-    return render_template('leaderboard.html', scores=rows, group_id=group_id, order=order)
+    rows = scores.group_leaderboard(group_id, descending=(order == 'desc'))
+    return versions.tagged(render_template('leaderboard.html', scores=rows, group_id=group_id, order=order), etag)
 
 # Profile
-@app.route('/profile', methods=['GET','POST'])
+@route('/profile', methods=['GET','POST'])
 @login_required
 def profile():
     if request.method == 'POST':
         bio = request.form['bio']
         execute("REPLACE INTO user_profiles (user_id, bio) VALUES (%s,%s)", (current_user.id, bio))
+        user_cache.invalidate(current_user.id)
         flash("Profile updated.")
     row = fetchone_dict("SELECT bio FROM user_profiles WHERE user_id = %s", (current_user.id,))
     bio = row['bio'] if row else ""
     return render_template('profile.html', bio=bio)
 
+# Push-event helpers (see events.py)
+def meetup_invitees(meetup_id):
+    return [r['user_id'] for r in fetchall_dict("SELECT user_id FROM invitations WHERE meetup_id = %s", (meetup_id,))]
+
+INVITE_HOST_QUERY = """
+    SELECT m.user_id AS host_id, i.meetup_id FROM invitations i
+    JOIN meetups m ON m.id = i.meetup_id
+    WHERE i.id = %s AND i.user_id = %s
+"""
+
+def invite_responded(invite_id, user_id, username, status):
+    row = fetchone_dict(INVITE_HOST_QUERY, (invite_id, user_id))
+    if row:
+        versions.bump_meetup(row['meetup_id'])
+        broker.publish([row['host_id']], f'invitation.{status}', invite_id=int(invite_id),
+                       meetup_id=row['meetup_id'], user_id=int(user_id), username=username)
+
+# Per-user event stream (invitations, member status, meetup changes)
+@route('/events')
+@login_required
+def events():
+    try:
+        sub = broker.subscribe(current_user.id)
+    except TooManyStreams as e:
+        return Response(str(e), 429, {'Retry-After': '60'})
+    response = Response(stream(sub), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # the generator's finally never runs if the client leaves before the body starts
+    response.call_on_close(lambda: broker.unsubscribe(sub))
+    return response
+
 # Cancel (mark canceled) kept for compatibility
-@app.route('/cancel_meetup/<int:meetup_id>', methods=['GET'])
+@route('/cancel_meetup/<int:meetup_id>', methods=['GET'])
 @login_required
 def cancel_meetup(meetup_id):
     # Only owner can cancel
@@ -236,11 +286,14 @@ def cancel_meetup(meetup_id):
         flash("Not authorized to cancel this meetup.", "danger")
         return redirect(url_for('my_meetups'))
     execute("UPDATE meetups SET status = 'canceled' WHERE id = %s", (meetup_id,))
+    get_nearby().meetup_removed(meetup_id)
+    versions.bump_meetup(meetup_id)
+    broker.publish(meetup_invitees(meetup_id), 'meetup.canceled', meetup_id=meetup_id)
     flash("Meetup canceled.")
     return redirect(url_for('my_meetups'))
 
 # New: delete meetup permanently (owner only)
-@app.route('/delete_meetup', methods=['POST'])
+@route('/delete_meetup', methods=['POST'])
 @login_required
 def delete_meetup():
     meetup_id = request.form.get('meetup_id')
@@ -251,45 +304,65 @@ def delete_meetup():
     if not row or str(row.get('user_id')) != str(current_user.id):
         flash("Not authorized to delete this meetup.", "danger")
         return redirect(url_for('my_meetups'))
-    # delete related rows
-    execute("DELETE FROM punctuality_logs WHERE meetup_id = %s", (meetup_id,))
-    execute("DELETE FROM invitations WHERE meetup_id = %s", (meetup_id,))
-    execute("DELETE FROM meetups WHERE id = %s", (meetup_id,))
+    invitees = meetup_invitees(meetup_id)
+    # one transaction: versions and scores first (while the rows still exist), then children, then the meetup
+    with transaction():
+        versions.bump_meetup(meetup_id)
+        scores.remove_meetup_scores(meetup_id)
+        execute("DELETE FROM punctuality_logs WHERE meetup_id = %s", (meetup_id,))
+        execute("DELETE FROM invitations WHERE meetup_id = %s", (meetup_id,))
+        execute("DELETE FROM meetups WHERE id = %s", (meetup_id,))
+    get_nearby().meetup_removed(meetup_id)
+    broker.publish(invitees, 'meetup.deleted', meetup_id=int(meetup_id))
     flash("Meetup deleted.")
     return redirect(url_for('my_meetups'))
 
+def form_id(name):
+    """An integer id from the form; 400 before anything is written if it is missing or not a number."""
+    try:
+        return int(request.form[name])
+    except (KeyError, ValueError):
+        abort(400, f"{name} must be a number")
+
 # New: host can kick a user from meetup (owner only)
-@app.route('/kick_user', methods=['POST'])
+@route('/kick_user', methods=['POST'])
 @login_required
 def kick_user():
-    meetup_id = request.form.get('meetup_id')
-    user_id = request.form.get('user_id')
-    if not meetup_id or not user_id:
-        flash("Missing parameters", "danger")
-        return redirect(url_for('my_meetups'))
+    meetup_id = form_id('meetup_id')
+    user_id = form_id('user_id')
     row = fetchone_dict("SELECT user_id FROM meetups WHERE id = %s", (meetup_id,))
     if not row or str(row.get('user_id')) != str(current_user.id):
         flash("Not authorized to kick users.", "danger")
         return redirect(url_for('my_meetups'))
-    execute("DELETE FROM invitations WHERE meetup_id = %s AND user_id = %s", (meetup_id, user_id))
+    with transaction():
+        versions.bump_meetup(meetup_id)
+        execute("DELETE FROM invitations WHERE meetup_id = %s AND user_id = %s", (meetup_id, user_id))
+    broker.publish([user_id], 'invitation.kicked', meetup_id=meetup_id)
     flash("User removed from meetup.")
     return redirect(url_for('my_meetups'))
 
 # Invite & create invitation endpoints
-@app.route('/invite', methods=['POST'])
+@route('/invite', methods=['POST'])
 @login_required
 def invite():
-    user_id = request.form.get('user_id')
-    meetup_id = request.form.get('meetup_id')
-    meetup = fetchone_dict("SELECT id FROM meetups WHERE id = %s AND user_id = %s", (meetup_id, current_user.id))
+    user_id = form_id('user_id')
+    meetup_id = form_id('meetup_id')
+    meetup = fetchone_dict("SELECT id, location, scheduled_time FROM meetups WHERE id = %s AND user_id = %s", (meetup_id, current_user.id))
     if not meetup:
         flash("Invalid meetup ID or you do not own this meetup.")
         return redirect(url_for('my_meetups'))
-    execute("INSERT INTO invitations (user_id, meetup_id, status) VALUES (%s,%s,%s)", (user_id, meetup_id, 'pending'))
+    if not fetchone_dict("SELECT id FROM users WHERE id = %s", (user_id,)):
+        abort(400, "no such user")
+    with transaction():
+        execute("INSERT INTO invitations (user_id, meetup_id, status) VALUES (%s,%s,%s) "
+                "ON DUPLICATE KEY UPDATE id = id", (user_id, meetup_id, 'pending'))
+        versions.bump_meetup(meetup_id)
+    broker.publish([user_id], 'invitation.created', meetup_id=meetup['id'], location=meetup['location'],
+                   scheduled_time=meetup['scheduled_time'], sender=current_user.username)
     flash("User invited.")
     return redirect(url_for('my_meetups'))
 
-@app.route('/create_invitation', methods=['POST'])
+@route('/create_invitation', methods=['POST'])
 @login_required
 def create_invitation():
     meetup_id = request.form.get('meetup_id')
@@ -301,32 +374,57 @@ def create_invitation():
                 invitee_ids = json.loads(raw)
             except:
                 invitee_ids = []
-    if not meetup_id:
-        location = request.form.get('location') or request.form.get('title') or 'Untitled Meetup'
-        scheduled_time = request.form.get('scheduled_time') or None
-        lat = request.form.get('lat') or None
-        lng = request.form.get('lng') or None
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute("""
-            INSERT INTO meetups (user_id, location, scheduled_time, lat, lng, status, created_by)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
-        """, (current_user.id, location, scheduled_time, lat if lat else None, lng if lng else None, 'scheduled', current_user.id))
-        conn.commit()
-        meetup_id = cur.lastrowid
-        cur.close()
-        conn.close()
+    try:
+        invitee_ids = sorted({int(i) for i in invitee_ids})
+    except (TypeError, ValueError):
+        invitee_ids = []
+    if invitee_ids:
+        # unknown ids would fail the FK (or, with INSERT IGNORE, vanish silently)
+        marks = ", ".join(["%s"] * len(invitee_ids))
+        known = {r['id'] for r in fetchall_dict(f"SELECT id FROM users WHERE id IN ({marks})", tuple(invitee_ids))}
+        unknown = len(invitee_ids) - len(known)
+        invitee_ids = [i for i in invitee_ids if i in known]
     if not invitee_ids:
         flash("Please select at least one user to invite.", "danger")
         return redirect(url_for('invitations'))
-    for invitee_id in invitee_ids:
-        existing = fetchone_dict("SELECT id FROM invitations WHERE user_id = %s AND meetup_id = %s", (invitee_id, meetup_id))
-        if not existing:
-            execute("INSERT INTO invitations (user_id, meetup_id, status) VALUES (%s, %s, %s)", (invitee_id, meetup_id, 'pending'))
-    flash("Invitations sent successfully!", "success")
+
+    # one transaction: optional meetup insert + a single multi-row insert.
+    # The unique (meetup_id, user_id) key makes double-submits harmless.
+    new_meetup = None
+    with transaction():
+        if not meetup_id:
+            location = request.form.get('location') or request.form.get('title') or 'Untitled Meetup'
+            scheduled_time = request.form.get('scheduled_time') or None
+            lat = request.form.get('lat') or None
+            lng = request.form.get('lng') or None
+            meetup_id = execute("""
+                INSERT INTO meetups (user_id, location, scheduled_time, lat, lng, status, created_by)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+            """, (current_user.id, location, scheduled_time, lat if lat else None, lng if lng else None, 'scheduled', current_user.id))
+            new_meetup = (meetup_id, lat, lng)
+        else:
+            row = fetchone_dict("SELECT location, scheduled_time FROM meetups WHERE id = %s AND user_id = %s", (meetup_id, current_user.id))
+            if not row:
+                flash("Invalid meetup ID or you do not own this meetup.", "danger")
+                return redirect(url_for('invitations'))
+            location, scheduled_time = row['location'], row['scheduled_time']
+        values = ", ".join(["(%s, %s, 'pending')"] * len(invitee_ids))
+        params = [v for invitee_id in invitee_ids for v in (invitee_id, meetup_id)]
+        execute(f"INSERT INTO invitations (user_id, meetup_id, status) VALUES {values} "
+                "ON DUPLICATE KEY UPDATE id = id", params)
+        versions.bump_meetup(meetup_id)
+    if new_meetup:
+        get_nearby().meetup_changed(*new_meetup)
+    broker.publish([i for i in invitee_ids if i != int(current_user.id)], 'invitation.created',
+                   meetup_id=int(meetup_id), location=location, scheduled_time=scheduled_time,
+                   sender=current_user.username)
+    if unknown:
+        flash(f"Invitations sent; {unknown} selected user(s) no longer exist and were skipped.", "warning")
+    else:
+        flash("Invitations sent successfully!", "success")
     return redirect(url_for('invitations'))
 
-@app.route('/respond_invite', methods=['POST'])
+@route('/respond_invite', methods=['POST'])
 @login_required
 def respond_invite():
     invite_id = request.form.get('invite_id')
@@ -339,10 +437,11 @@ def respond_invite():
         flash("Unknown action.", "danger")
         return redirect(url_for('invitations'))
     execute("UPDATE invitations SET status = %s WHERE id = %s AND user_id = %s", (status, invite_id, current_user.id))
+    invite_responded(invite_id, current_user.id, current_user.username, status)
     return ('', 204) if request.headers.get('X-Requested-With') == 'XMLHttpRequest' else redirect(url_for('invitations'))
 
-# New endpoint: update user location (server-persisted to user_locations table)
-@app.route('/update_location', methods=['POST'])
+# New endpoint: update user location (coalesced into user_locations, see locations.py)
+@route('/update_location', methods=['POST'])
 @login_required
 def update_location():
     data = request.get_json() or {}
@@ -351,39 +450,181 @@ def update_location():
     accuracy = data.get('accuracy')
     if lat is None or lng is None:
         return jsonify({'error':'missing coordinates'}), 400
-    # upsert into user_locations table
-    conn = get_db_connection()
-    cur = conn.cursor()
-    # Try update first
-    cur.execute("SELECT id FROM user_locations WHERE user_id = %s", (current_user.id,))
-    exists = cur.fetchone()
-    if exists:
-        cur.execute("UPDATE user_locations SET lat=%s, lng=%s, accuracy=%s, last_seen=NOW() WHERE user_id=%s", (lat, lng, accuracy, current_user.id))
-    else:
-        cur.execute("INSERT INTO user_locations (user_id, lat, lng, accuracy, last_seen) VALUES (%s, %s, %s, %s, NOW())", (current_user.id, lat, lng, accuracy))
-    conn.commit()
-    cur.close()
-    conn.close()
-    return jsonify({'ok':True}), 200
+    try:
+        lat = float(lat); lng = float(lng)
+        accuracy = float(accuracy) if accuracy is not None else None
+    except (TypeError, ValueError):
+        return jsonify({'error':'invalid coordinates'}), 400
+    # buffered: written to user_locations by the next batched flush
+    queued = get_buffer().submit(int(current_user.id), lat, lng, accuracy)
+    return jsonify({'ok':True, 'queued':queued}), 200
+
+# Nearby meetups and (recently seen) users around a point, from the in-process grid index
+@route('/api/nearby')
+@login_required
+def api_nearby():
+    try:
+        lat = float(request.args['lat'])
+        lng = float(request.args['lng'])
+        radius_km = min(float(request.args.get('radius_km', 2)), 50.0)
+    except (KeyError, ValueError):
+        return jsonify({'error':'lat, lng and an optional radius_km are required'}), 400
+    kind = request.args.get('kind', 'all')
+    limit = page_size(request.args.get('limit'), default=50)
+    index = get_nearby()
+    result = {}
+    if kind in ('all', 'meetups'):
+        hits = index.nearby_meetups(lat, lng, radius_km, limit)
+        rows = {}
+        if hits:
+            marks = ", ".join(["%s"] * len(hits))
+            rows = {r['id']: r for r in fetchall_dict(
+                f"SELECT id, location, scheduled_time, lat, lng, status FROM meetups WHERE id IN ({marks})",
+                tuple(k for k, _ in hits))}
+        result['meetups'] = [dict(rows[k], distance_km=round(d, 3)) for k, d in hits if k in rows]
+    if kind in ('all', 'users'):
+        hits = index.nearby_users(lat, lng, radius_km, limit, exclude=int(current_user.id))
+        names = {}
+        if hits:
+            marks = ", ".join(["%s"] * len(hits))
+            names = {r['id']: r['username'] for r in fetchall_dict(
+                f"SELECT id, username FROM users WHERE id IN ({marks})", tuple(k for k, _ in hits))}
+        # distance only: other users' exact coordinates are never exposed
+        result['users'] = [{'id': k, 'username': names[k], 'distance_km': round(d, 3)} for k, d in hits if k in names]
+    return jsonify(result)
+
+# Straight-line ETA from the caller's position to a "lat,lng" destination (discover.html)
+@route('/get_eta', methods=['POST'])
+@login_required
+def get_eta():
+    data = request.get_json() or {}
+    try:
+        lat = float(data['lat'])
+        lng = float(data['lng'])
+        dest_lat, dest_lng = (float(v) for v in str(data['destination']).split(','))
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'error':'lat, lng and destination "lat,lng" are required'}), 400
+    return jsonify(eta.estimate_eta(lat, lng, dest_lat, dest_lng, data.get('mode', 'driving')))
+
+# ETAs for the host and accepted members of a meetup (members only)
+@route('/api/meetup/<int:meetup_id>/etas')
+@login_required
+def meetup_etas(meetup_id):
+    allowed = fetchone_dict("""
+        SELECT 1 AS ok FROM meetups WHERE id = %s AND user_id = %s
+        UNION
+        SELECT 1 AS ok FROM invitations WHERE meetup_id = %s AND user_id = %s AND status IN ('accepted', 'pending')
+    """, (meetup_id, current_user.id, meetup_id, current_user.id))
+    if not allowed:
+        return jsonify({'error':'not a member of this meetup'}), 403
+    etas = eta.meetup_etas(meetup_id, request.args.get('mode', 'driving'))
+    return jsonify({'meetup_id': meetup_id, 'participants': [
+        dict(p, last_seen=p['last_seen'].isoformat() if p['last_seen'] else None) for p in etas]})
+
+PENDING_INVITES_QUERY = """
+    SELECT i.id AS invite_id, m.id AS meetup_id, m.location, m.scheduled_time, m.lat AS latitude, m.lng AS longitude
+    FROM invitations i
+    JOIN meetups m ON i.meetup_id = m.id
+    WHERE i.user_id = %s AND i.status = 'pending' AND {ks}
+    ORDER BY m.scheduled_time DESC, i.id DESC
+    LIMIT %s
+"""
 
 # GET /invitations
-@app.route('/invitations')
+@route('/invitations')
 @login_required
 def invitations():
-    invites = fetchall_dict("""
-        SELECT i.id AS invite_id, m.id AS meetup_id, m.location, m.scheduled_time, m.lat AS latitude, m.lng AS longitude
-        FROM invitations i
-        JOIN meetups m ON i.meetup_id = m.id
-        WHERE i.user_id = %s AND i.status = 'pending'
-    """, (current_user.id,))
-    meetups = fetchall_dict("SELECT id, location, scheduled_time, lat, lng, user_id FROM meetups WHERE user_id = %s ORDER BY scheduled_time DESC", (current_user.id,))
-    all_users = fetchall_dict("SELECT id, username FROM users WHERE id != %s", (current_user.id,))
-    return render_template('invitations.html', invitations=invites, meetups=meetups, all_users=all_users)
+    etag, not_modified = versions.not_modified(current_user.id, user_version())
+    if not_modified:
+        return not_modified
+    cursor = decode_cursor(request.args.get('cursor'))
+    limit = page_size(request.args.get('limit'))
+    ks, ks_params = keyset_clause(cursor, "m.scheduled_time", "i.id")
+    invites = fetchall_dict(PENDING_INVITES_QUERY.format(ks=ks), (current_user.id,) + ks_params + (limit + 1,))
+    invites, next_cursor = split_page(invites, limit, id_key='invite_id')
+    # picker of the user's own meetups: most recent page only
+    meetups = fetchall_dict("""
+        SELECT id, location, scheduled_time, lat, lng, user_id FROM meetups
+        WHERE user_id = %s
+        ORDER BY scheduled_time DESC, id DESC
+        LIMIT %s
+    """, (current_user.id, page_size(None)))
+    page = render_template('invitations.html', invitations=invites, meetups=meetups,
+                           next_cursor=next_cursor, is_first_page=cursor is None)
+    return versions.tagged(page, etag)
+
+USER_SEARCH_QUERY = """
+    SELECT id, username FROM users
+    WHERE username LIKE %s AND username > %s AND id != %s
+    ORDER BY username
+    LIMIT %s
+"""
+
+# Invitee picker: prefix search on the users.username unique index, keyset-paged by username
+@route('/api/users')
+@login_required
+def search_users():
+    q = (request.args.get('q') or '').strip()
+    after = request.args.get('after') or ''
+    limit = page_size(request.args.get('limit'), default=10)
+    prefix = q.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+    rows = fetchall_dict(USER_SEARCH_QUERY, (prefix, after, current_user.id, limit + 1))
+    next_after = rows[limit - 1]['username'] if len(rows) > limit else None
+    return jsonify({'users': rows[:limit], 'next': next_after})
+
+MEMBERS_QUERY = """
+    SELECT i.meetup_id, u.id, u.username AS name, i.status
+    FROM invitations i
+    JOIN users u ON i.user_id = u.id
+    WHERE i.meetup_id IN ({marks})
+    ORDER BY i.id
+"""
+
+# Batched loader: members and creator names for a page of meetups in two queries
+def load_meetup_members(meetup_rows):
+    meetup_ids = [r['id'] for r in meetup_rows]
+    members_by_meetup = {mid: [] for mid in meetup_ids}
+    creators = {}
+    if not meetup_ids:
+        return members_by_meetup, creators
+
+    marks = ", ".join(["%s"] * len(meetup_ids))
+    for m in fetchall_dict(MEMBERS_QUERY.format(marks=marks), tuple(meetup_ids)):
+        members_by_meetup[m.pop('meetup_id')].append(m)
+
+    creator_ids = {r.get('user_id') or r.get('created_by') or r.get('created_by_id') for r in meetup_rows} - {None}
+    if creator_ids:
+        marks = ", ".join(["%s"] * len(creator_ids))
+        for u in fetchall_dict(f"SELECT id, username FROM users WHERE id IN ({marks})", tuple(creator_ids)):
+            creators[u['id']] = u['username']
+    return members_by_meetup, creators
+
+# created + accepted-invite meetups in one statement; UNION drops duplicates.
+# Each branch is cut to one page first so the sort stays bounded.
+MY_MEETUPS_QUERY = """
+    SELECT * FROM (
+        SELECT m.* FROM meetups m WHERE {where} AND {ks}
+        ORDER BY m.scheduled_time DESC, m.id DESC LIMIT %s
+    ) AS created
+    UNION
+    SELECT * FROM (
+        SELECT m.* FROM meetups m
+        JOIN invitations i ON m.id = i.meetup_id
+        WHERE {inv_where} AND {ks}
+        ORDER BY m.scheduled_time DESC, m.id DESC LIMIT %s
+    ) AS invited
+    ORDER BY scheduled_time DESC, id DESC
+    LIMIT %s
+"""
 
 # My meetups
-@app.route('/my_meetups')
+@route('/my_meetups')
 @login_required
 def my_meetups():
+    now = datetime.now()
+    etag, not_modified = versions.not_modified(current_user.id, user_version(), now.date())
+    if not_modified:
+        return not_modified
     filter_status = request.args.get('status','all')
     after = request.args.get('after')
     before = request.args.get('before')
@@ -399,7 +640,6 @@ def my_meetups():
         cond.append("m.scheduled_time <= %s"); params.append(before)
 
     where = " AND ".join(cond)
-    created = fetchall_dict(f"SELECT m.* FROM meetups m WHERE {where} ORDER BY m.scheduled_time DESC", tuple(params))
 
     inv_params = [current_user.id]
     inv_cond = ["i.user_id = %s", "i.status = 'accepted'"]
@@ -410,36 +650,40 @@ def my_meetups():
     if before:
         inv_cond.append("m.scheduled_time <= %s"); inv_params.append(before)
     inv_where = " AND ".join(inv_cond)
-    invited = fetchall_dict(f"""
-        SELECT DISTINCT m.* FROM meetups m
-        JOIN invitations i ON m.id = i.meetup_id
-        WHERE {inv_where}
-        ORDER BY m.scheduled_time DESC
-    """, tuple(inv_params))
 
-    seen = {}
-    all_meetups = []
-    def add_meetup_row(row):
+    cursor = decode_cursor(request.args.get('cursor'))
+    limit = page_size(request.args.get('limit'))
+    ks, ks_params = keyset_clause(cursor, "m.scheduled_time", "m.id")
+    rows = fetchall_dict(MY_MEETUPS_QUERY.format(where=where, inv_where=inv_where, ks=ks), tuple(params) + ks_params + (limit + 1,)
+         + tuple(inv_params) + ks_params + (limit + 1,)
+         + (limit + 1,))
+    rows, next_cursor = split_page(rows, limit)
+
+    # timed meetups first, oldest first; the first one from today on starts expanded
+    timed = sorted((r for r in rows if r.get('scheduled_time')), key=lambda r: r['scheduled_time'])
+    rows = timed + [r for r in rows if not r.get('scheduled_time')]
+    open_id = next((r['id'] for r in timed if r['scheduled_time'].date() >= now.date()), None)
+
+    # whole cards are cached per (meetup version, viewer, day, expanded); only misses hit the DB
+    meetup_versions = versions.get(('meetup', r['id']) for r in rows)
+    fragment_keys, cards = {}, {}
+    for row in rows:
+        scheduled = row.get('scheduled_time')
+        is_today = hasattr(scheduled, 'date') and scheduled.date() == now.date()
+        fragment_keys[row['id']] = ('card', row['id'], meetup_versions[('meetup', row['id'])], current_user.id,
+                                    is_today, row['id'] == open_id)
+        cached = versions.fragments.get(fragment_keys[row['id']])
+        if cached is not None:
+            cards[row['id']] = cached
+
+    misses = [r for r in rows if r['id'] not in cards]
+    members_by_meetup, creators = load_meetup_members(misses)
+    for row in misses:
         mid = row['id']
-        if mid in seen:
-            return
-        seen[mid] = True
-
-        # fetch members for this meetup
-        members = fetchall_dict("""
-            SELECT u.id, u.username AS name, i.status
-            FROM invitations i
-            JOIN users u ON i.user_id = u.id
-            WHERE i.meetup_id = %s
-        """, (mid,))
-
-        # determine creator username
-        creator_name = None
+        members = members_by_meetup.get(mid, [])
+
         creator_id = row.get('user_id') or row.get('created_by') or row.get('created_by_id')
-        if creator_id:
-            creator_row = fetchone_dict("SELECT username FROM users WHERE id = %s", (creator_id,))
-            if creator_row:
-                creator_name = creator_row.get('username')
+        creator_name = creators.get(creator_id) if creator_id else None
 
         # if creator not present in members list, prepend them as host (so everyone sees host)
         already_in_members = any(str(m.get('id')) == str(creator_id) for m in members) if creator_id else False
@@ -447,7 +691,7 @@ def my_meetups():
             members.insert(0, {'id': creator_id, 'name': creator_name, 'status': 'host'})
 
         scheduled = row.get('scheduled_time')
-        all_meetups.append({
+        meetup = {
             'id': mid,
             'location': row.get('location'),
             'scheduled_time': scheduled,
@@ -457,53 +701,80 @@ def my_meetups():
             'creator': creator_name,
             'lat': row.get('lat') if 'lat' in row else row.get('latitude') if 'latitude' in row else None,
             'lng': row.get('lng') if 'lng' in row else row.get('longitude') if 'longitude' in row else None
-        })
-
-    for r in created:
-        add_meetup_row(r)
-    for r in invited:
-        add_meetup_row(r)
-
-    now = datetime.now()
-    today = now.date().isoformat()
-    week_start = (now - timedelta(days=now.weekday())).date().isoformat()
-    week_end = (now + timedelta(days=(6 - now.weekday()))).date().isoformat()
+        }
+        _, _, _, _, is_today, is_open = fragment_keys[mid]
+        cards[mid] = Markup(render_template('_meetup_card.html', meetup=meetup, is_today=is_today, is_open=is_open))
+        versions.fragments.set(fragment_keys[mid], cards[mid])
 
-    return render_template('my_meetups.html',
-                           meetups=all_meetups,
+    page = render_template('my_meetups.html',
+                           meetups=[cards[r['id']] for r in rows],
                            current_filter=filter_status,
                            after=after,
                            before=before,
-                           users=fetchall_dict("SELECT id, username FROM users WHERE id != %s", (current_user.id,)),
-                           today=today,
-                           now=now.date().isoformat(),
-                           week_start=week_start,
-                           week_end=week_end)
+                           next_cursor=next_cursor,
+                           is_first_page=cursor is None)
+    return versions.tagged(page, etag)
 
-@app.route('/discover')
+@route('/discover')
 @login_required
 def discover():
     return render_template('discover.html')
 
-@app.route('/my_scores')
+MY_SCORES_QUERY = """
+    SELECT p.id, m.location, m.scheduled_time, p.status, p.score
+    FROM punctuality_logs p
+    JOIN meetups m ON m.id = p.meetup_id
+    WHERE p.user_id = %s AND {ks}
+    ORDER BY m.scheduled_time DESC, p.id DESC
+    LIMIT %s
+"""
+
+@route('/my_scores')
 @login_required
 def my_scores():
-    logs = fetchall_dict("""
-        SELECT m.location, m.scheduled_time, p.status, p.score
-        FROM punctuality_logs p
-        JOIN meetups m ON m.id = p.meetup_id
-        WHERE p.user_id = %s
-        ORDER BY m.scheduled_time DESC
-    """, (current_user.id,))
-    return render_template('my_scores.html', logs=logs)
-
-@app.context_processor
+    cursor = decode_cursor(request.args.get('cursor'))
+    limit = page_size(request.args.get('limit'))
+    ks, ks_params = keyset_clause(cursor, "m.scheduled_time", "p.id")
+    logs = fetchall_dict(MY_SCORES_QUERY.format(ks=ks), (current_user.id,) + ks_params + (limit + 1,))
+    logs, next_cursor = split_page(logs, limit)
+    return render_template('my_scores.html', logs=logs, next_cursor=next_cursor, is_first_page=cursor is None)
+
+# Pool, buffer and cache gauges for /metrics (served by metrics.py)
+def app_metrics():
+    lines = []
+    for target, stats in db.pool_stats().items():
+        for key, value in stats.items():
+            suffix = '_total' if key in ('checkouts', 'waits', 'timeouts', 'connects', 'recycled', 'ping_failures') else ''
+            if key == 'wait_time':
+                key, suffix = 'wait_seconds', '_total'
+            lines.append(f'homimeet_db_pool_{key}{suffix}{{target="{target}"}} {value}')
+    for key, value in db.routing_stats().items():
+        lines.append(f"homimeet_db_{key}_total {value}")
+    for key, value in get_buffer().stats().items():
+        lines.append(f"homimeet_location_{key}{'' if key in ('pending', 'tracked') else '_total'} {value}")
+    for key, value in passwords.get_hasher().stats().items():
+        if key == 'hash_time':
+            key = 'hash_seconds'
+        lines.append(f"homimeet_bcrypt_{key}{'' if key == 'inflight' else '_total'} {value}")
+    for key, value in broker.stats().items():
+        lines.append(f"homimeet_events_{key}{'' if key == 'subscribers' else '_total'} {value}")
+    for name, cache in (('user', user_cache), ('eta', eta.eta_cache), ('meetup_eta', eta.meetup_eta_cache)):
+        for key, value in cache.stats().items():
+            lines.append(f"homimeet_{name}_cache_{key}{'' if key == 'size' else '_total'} {value}")
+    return lines
+
+metrics.register(app_metrics)
+
 def inject_google_key():
-    return dict(GOOGLE_API_KEY=GOOGLE_API_KEY)
+    return dict(GOOGLE_API_KEY=current_app.config['GOOGLE_API_KEY'])
 
-@app.route('/meetup/<int:meetup_id>')
+@route('/meetup/<int:meetup_id>')
 @login_required
 def meetup_detail(meetup_id):
+    version = versions.get([('meetup', meetup_id)])[('meetup', meetup_id)]
+    etag, not_modified = versions.not_modified(current_user.id, version)
+    if not_modified:
+        return not_modified
     meetup = fetchone_dict("""
         SELECT m.*, u.username AS creator
         FROM meetups m
@@ -519,7 +790,7 @@ def meetup_detail(meetup_id):
         JOIN users u ON i.user_id = u.id
         WHERE i.meetup_id = %s
     """, (meetup_id,))
-    return render_template('meetup_detail.html', meetup=meetup, invited_users=invited_users)
+    return versions.tagged(render_template('meetup_detail.html', meetup=meetup, invited_users=invited_users), etag)
 
 if __name__ == '__main__':
-    app.run(debug=True)
+    create_app().run(debug=True)
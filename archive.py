@@ -0,0 +1,115 @@
+"""Move old canceled and past meetups (with their invitations and punctuality
+logs) into the *_archive tables, a bounded chunk per transaction.
+
+    python archive.py --dry-run                   # count what would move
+    python archive.py                             # canceled > 30 days, anything > 365 days
+    python archive.py --canceled-days 7 --past-days 180 --chunk 500
+    python archive.py --delete                    # drop them instead of archiving
+
+Archived logs still count toward user_scores / group_scores (scores.py
+rebuilds from both tables); --delete removes them from the totals, like
+deleting the meetup from the UI. Each chunk holds its locks only for its
+own few hundred meetups, and --sleep spaces chunks out under live traffic.
+"""
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+
+import scores
+import versions
+from db import execute, fetchall_dict, fetchone_dict, transaction
+
+CANDIDATES = """
+    SELECT id, scheduled_time FROM meetups
+    WHERE scheduled_time < %s AND (status = 'canceled' OR scheduled_time < %s)
+      AND (scheduled_time, id) > (%s, %s)
+    ORDER BY scheduled_time, id
+    LIMIT %s
+"""
+
+COUNT = """
+    SELECT COUNT(*) AS n FROM meetups
+    WHERE scheduled_time < %s AND (status = 'canceled' OR scheduled_time < %s)
+"""
+
+SCORE_DELTAS = """
+    SELECT meetup_id, user_id, COALESCE(SUM(score), 0) AS total, COUNT(*) AS n
+    FROM punctuality_logs WHERE meetup_id IN ({marks}) AND user_id IS NOT NULL
+    GROUP BY meetup_id, user_id
+"""
+
+
+def cutoffs(canceled_days, past_days, now=None):
+    now = now or datetime.now()
+    canceled = now - timedelta(days=canceled_days)
+    past = now - timedelta(days=past_days)
+    # canceled meetups qualify sooner; everything older than `past` qualifies regardless
+    return max(canceled, past), past
+
+
+def move_chunk(ids, delete=False):
+    """Archive (or delete) one chunk of meetups in a single transaction."""
+    marks = ", ".join(["%s"] * len(ids))
+    ids = tuple(ids)
+    with transaction():
+        execute(versions.bump_participants_sql(len(ids)), ids + ids)
+        if delete:
+            deltas = {}
+            for r in fetchall_dict(SCORE_DELTAS.format(marks=marks), ids):
+                deltas.setdefault(r['meetup_id'], []).append((r['user_id'], -int(r['total']), -int(r['n'])))
+            for meetup_id, rows in deltas.items():
+                scores.apply_deltas(meetup_id, rows)
+        else:
+            execute(f"INSERT INTO punctuality_logs_archive SELECT * FROM punctuality_logs WHERE meetup_id IN ({marks})", ids)
+            execute(f"INSERT INTO invitations_archive SELECT * FROM invitations WHERE meetup_id IN ({marks})", ids)
+            execute(f"INSERT INTO meetups_archive SELECT * FROM meetups WHERE id IN ({marks})", ids)
+        execute(f"DELETE FROM punctuality_logs WHERE meetup_id IN ({marks})", ids)
+        execute(f"DELETE FROM invitations WHERE meetup_id IN ({marks})", ids)
+        execute(f"DELETE FROM meetups WHERE id IN ({marks})", ids)
+
+
+def run(canceled_days=30, past_days=365, chunk=200, sleep=0.1, delete=False, limit=None):
+    """Move qualifying meetups chunk by chunk; returns the number moved."""
+    newest, past = cutoffs(canceled_days, past_days)
+    last = (datetime(1000, 1, 1), 0)
+    moved = 0
+    while limit is None or moved < limit:
+        size = chunk if limit is None else min(chunk, limit - moved)
+        rows = fetchall_dict(CANDIDATES, (newest, past) + last + (size,))
+        if not rows:
+            break
+        move_chunk([r['id'] for r in rows], delete=delete)
+        moved += len(rows)
+        last = (rows[-1]['scheduled_time'], rows[-1]['id'])
+        print(f"{'deleted' if delete else 'archived'} {moved} meetups (up to {last[0]})")
+        if sleep:
+            time.sleep(sleep)
+    return moved
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--canceled-days', type=int, default=30, help="archive canceled meetups older than this")
+    parser.add_argument('--past-days', type=int, default=365, help="archive any meetup older than this")
+    parser.add_argument('--chunk', type=int, default=200, help="meetups per transaction")
+    parser.add_argument('--sleep', type=float, default=0.1, help="seconds to pause between chunks")
+    parser.add_argument('--limit', type=int, help="stop after this many meetups")
+    parser.add_argument('--delete', action='store_true', help="delete instead of archiving")
+    parser.add_argument('--dry-run', action='store_true', help="only count the candidates")
+    args = parser.parse_args(argv)
+    load_dotenv()
+
+    if args.dry_run:
+        row = fetchone_dict(COUNT, cutoffs(args.canceled_days, args.past_days))
+        print(f"{row['n']} meetups would be {'deleted' if args.delete else 'archived'}")
+        return 0
+    moved = run(args.canceled_days, args.past_days, args.chunk, args.sleep, args.delete, args.limit)
+    print(f"done: {moved} meetups {'deleted' if args.delete else 'archived'}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
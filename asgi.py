@@ -0,0 +1,240 @@
+"""ASGI entry point: async JSON endpoints in front of the Flask app.
+
+The high-frequency XHR endpoints (/update_location, /respond_invite,
+/api/nearby, /get_eta, /api/meetup/<id>/etas) and the /events stream are
+served here on the event loop with async MySQL pools (aiodb.py);
+everything else falls through to the Flask app mounted underneath. Auth is
+the Flask-Login session: the Flask session cookie is verified with the
+app's own serializer, so a user logged in through Flask is logged in here
+too.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 8000
+
+Push events fan out in-process (events.py), so run one worker per set of
+/events subscribers.
+"""
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from urllib.parse import parse_qsl
+
+from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.middleware.wsgi import WSGIMiddleware
+from fastapi.responses import JSONResponse, RedirectResponse, Response, StreamingResponse
+from itsdangerous import BadSignature
+from starlette.background import BackgroundTask
+
+import aiodb
+import db
+import eta
+import versions
+from app import app as flask_app, INVITE_HOST_QUERY, User, user_cache
+from events import TooManyStreams, astream, broker
+from locations import get_buffer
+from nearby import get_nearby
+from pagination import page_size
+
+
+@asynccontextmanager
+async def lifespan(_):
+    await aiodb.open_pool()
+    yield
+    await aiodb.close_pool()
+
+
+# streams are cheap here, so pages served through this tier open one
+flask_app.config['EVENTS_URL'] = flask_app.config.get('EVENTS_URL') or '/events'
+
+app = FastAPI(title="HomiMeet API", lifespan=lifespan, docs_url=None, redoc_url=None, openapi_url=None)
+
+
+def load_session(request):
+    """The Flask session from its signed cookie, or {}."""
+    cookie = request.cookies.get(flask_app.config['SESSION_COOKIE_NAME'])
+    if not cookie:
+        return {}
+    serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+    try:
+        return serializer.loads(cookie, max_age=int(flask_app.permanent_session_lifetime.total_seconds()))
+    except BadSignature:
+        return {}
+
+
+def session_user_id(request):
+    """Flask-Login's `_user_id` from the signed Flask session cookie, or None."""
+    return load_session(request).get('_user_id')
+
+
+def sticky(request):
+    """True while this client's reads must see its own recent writes (the primary)."""
+    return db.sticky_until(load_session(request), request.cookies) > time.time()
+
+
+def stick_to_primary(response):
+    """Pin the client's reads to the primary for DB_STICKY_S, as db._wrote() does.
+
+    Without it a user could write here and read the old row from a lagging
+    replica on the next Flask page. It is a separate cookie: writing back
+    this request's copy of the session could undo a concurrent logout.
+    """
+    if not db.get_replicas():
+        return response
+    response.set_cookie(
+        db.PRIMARY_COOKIE, f"{time.time() + db.STICKY_S:.3f}",
+        max_age=math.ceil(db.STICKY_S),
+        path=flask_app.session_interface.get_cookie_path(flask_app),
+        httponly=True,
+        samesite=flask_app.session_interface.get_cookie_samesite(flask_app),
+    )
+    return response
+
+
+async def current_user_id(request: Request):
+    user_id = session_user_id(request)
+    if user_id is None:
+        raise HTTPException(status_code=401, detail="login required")
+    if user_cache.get(str(user_id)) is None:
+        row = await aiodb.fetchone_dict("SELECT id, username FROM users WHERE id = %s", (user_id,),
+                                        primary=sticky(request))
+        if not row:
+            raise HTTPException(status_code=401, detail="login required")
+        user_cache.set(str(row['id']), User(row['id'], row['username']))
+    return int(user_id)
+
+
+async def json_body(request):
+    try:
+        data = await request.json()
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+@app.post('/update_location')
+async def update_location(request: Request, user_id: int = Depends(current_user_id)):
+    data = await json_body(request)
+    lat = data.get('lat')
+    lng = data.get('lng')
+    accuracy = data.get('accuracy')
+    if lat is None or lng is None:
+        return JSONResponse({'error': 'missing coordinates'}, status_code=400)
+    try:
+        lat = float(lat); lng = float(lng)
+        accuracy = float(accuracy) if accuracy is not None else None
+    except (TypeError, ValueError):
+        return JSONResponse({'error': 'invalid coordinates'}, status_code=400)
+    # in-memory only; the buffer's flush thread does the write (nothing to stick to)
+    queued = get_buffer().submit(user_id, lat, lng, accuracy)
+    return {'ok': True, 'queued': queued}
+
+
+@app.post('/respond_invite')
+async def respond_invite(request: Request, user_id: int = Depends(current_user_id)):
+    form = dict(parse_qsl((await request.body()).decode('utf-8')))
+    status = {'accept': 'accepted', 'decline': 'declined'}.get(form.get('action'))
+    xhr = request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+    if status is None:
+        if xhr:
+            return JSONResponse({'error': 'unknown action'}, status_code=400)
+        return RedirectResponse('/invitations', status_code=303)
+    await aiodb.execute("UPDATE invitations SET status = %s WHERE id = %s AND user_id = %s",
+                        (status, form.get('invite_id'), user_id))
+    response = Response(status_code=204) if xhr else RedirectResponse('/invitations', status_code=303)
+    stick_to_primary(response)
+    row = await aiodb.fetchone_dict(INVITE_HOST_QUERY, (form.get('invite_id'), user_id), primary=True)
+    if row:
+        await aiodb.execute(versions.bump_participants_sql(1), (row['meetup_id'], row['meetup_id']))
+        await aiodb.execute(versions.bump_sql(1), ('meetup', row['meetup_id']))
+        broker.publish([row['host_id']], f'invitation.{status}', invite_id=int(form['invite_id']),
+                       meetup_id=row['meetup_id'], user_id=user_id,
+                       username=getattr(user_cache.get(str(user_id)), 'username', None))
+    return response
+
+
+@app.get('/api/nearby')
+async def api_nearby(request: Request, user_id: int = Depends(current_user_id)):
+    args = request.query_params
+    try:
+        lat = float(args['lat'])
+        lng = float(args['lng'])
+        radius_km = min(float(args.get('radius_km', 2)), 50.0)
+    except (KeyError, ValueError):
+        return JSONResponse({'error': 'lat, lng and an optional radius_km are required'}, status_code=400)
+    kind = args.get('kind', 'all')
+    limit = page_size(args.get('limit'), default=50)
+    index = get_nearby()
+    result = {}
+    if kind in ('all', 'meetups'):
+        # the index may resync from MySQL, so keep it off the event loop
+        hits = await run_in_threadpool(index.nearby_meetups, lat, lng, radius_km, limit)
+        rows = {}
+        if hits:
+            marks = ", ".join(["%s"] * len(hits))
+            rows = {r['id']: r for r in await aiodb.fetchall_dict(
+                f"SELECT id, location, scheduled_time, lat, lng, status FROM meetups WHERE id IN ({marks})",
+                tuple(k for k, _ in hits), primary=sticky(request))}
+        result['meetups'] = [dict(rows[k], distance_km=round(d, 3)) for k, d in hits if k in rows]
+    if kind in ('all', 'users'):
+        hits = await run_in_threadpool(index.nearby_users, lat, lng, radius_km, limit, user_id)
+        names = {}
+        if hits:
+            marks = ", ".join(["%s"] * len(hits))
+            names = {r['id']: r['username'] for r in await aiodb.fetchall_dict(
+                f"SELECT id, username FROM users WHERE id IN ({marks})", tuple(k for k, _ in hits),
+                primary=sticky(request))}
+        result['users'] = [{'id': k, 'username': names[k], 'distance_km': round(d, 3)} for k, d in hits if k in names]
+    return result
+
+
+@app.post('/get_eta')
+async def get_eta(request: Request, user_id: int = Depends(current_user_id)):
+    data = await json_body(request)
+    try:
+        lat = float(data['lat'])
+        lng = float(data['lng'])
+        dest_lat, dest_lng = (float(v) for v in str(data['destination']).split(','))
+    except (KeyError, TypeError, ValueError):
+        return JSONResponse({'error': 'lat, lng and destination "lat,lng" are required'}, status_code=400)
+    return eta.estimate_eta(lat, lng, dest_lat, dest_lng, data.get('mode', 'driving'))
+
+
+@app.get('/api/meetup/{meetup_id}/etas')
+async def meetup_etas(meetup_id: int, request: Request, user_id: int = Depends(current_user_id)):
+    allowed = await aiodb.fetchone_dict("""
+        SELECT 1 AS ok FROM meetups WHERE id = %s AND user_id = %s
+        UNION
+        SELECT 1 AS ok FROM invitations WHERE meetup_id = %s AND user_id = %s AND status IN ('accepted', 'pending')
+    """, (meetup_id, user_id, meetup_id, user_id), primary=sticky(request))
+    if not allowed:
+        return JSONResponse({'error': 'not a member of this meetup'}, status_code=403)
+    mode = request.query_params.get('mode', 'driving')
+    key = (meetup_id, mode)
+    etas = eta.meetup_eta_cache.get(key)
+    if etas is None:
+        rows = await aiodb.fetchall_dict(eta.MEETUP_PARTICIPANTS, (meetup_id, meetup_id), primary=sticky(request))
+        etas = eta.participant_etas(rows, mode)
+        eta.meetup_eta_cache.set(key, etas)
+    return {'meetup_id': meetup_id, 'participants': [dict(p, last_seen=_iso(p['last_seen'])) for p in etas]}
+
+
+@app.get('/events')
+async def events(user_id: int = Depends(current_user_id)):
+    # one idle coroutine per open stream instead of one blocked WSGI thread
+    try:
+        sub = broker.subscribe(user_id, loop=asyncio.get_running_loop())
+    except TooManyStreams as e:
+        return Response(str(e), status_code=429, headers={'Retry-After': '60'})
+    # the background task also runs when the client leaves before the body starts
+    return StreamingResponse(astream(sub), media_type='text/event-stream',
+                             headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+                             background=BackgroundTask(broker.unsubscribe, sub))
+
+
+def _iso(value):
+    return value.isoformat() if value is not None else None
+
+
+# everything else is the Flask app
+app.mount('/', WSGIMiddleware(flask_app))
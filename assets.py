@@ -0,0 +1,269 @@
+"""Fingerprinted, precompressed static assets.
+
+    python assets.py build      # static/ -> static/dist/ + manifest.json
+    python assets.py clean      # drop dist files the manifest no longer uses
+
+`build` copies every file under static/ to static/dist/<name>.<hash>.<ext>,
+writes .gz (and .br, with the brotli package) next to the ones that
+compress, renders the logo at LOGO_HEIGHTS as PNG and WebP (needs Pillow)
+and records it all in static/dist/manifest.json. Run it on every deploy.
+
+At runtime `init_app` reads the manifest and adds:
+  - `asset_url('js/events.js')` -> /assets/js/events.3f9a1c2b0d.js
+  - `logo_picture(40)`          -> <picture> with WebP/PNG 1x/2x variants
+  - /assets/<path>, which serves the precompressed copy the client accepts
+    with `Cache-Control: public, max-age=31536000, immutable`
+A changed file gets a new name, so browsers never revalidate and repeat
+page loads only fetch the HTML. Without a manifest (no build yet) both
+helpers fall back to the plain /static URLs.
+"""
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import mimetypes
+import os
+import sys
+from pathlib import Path
+
+from flask import abort, request, send_file, url_for
+from markupsafe import Markup, escape
+from werkzeug.exceptions import HTTPException
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+STATIC = Path(__file__).resolve().parent / 'static'
+DIST = STATIC / 'dist'
+MANIFEST = DIST / 'manifest.json'
+
+COMPRESSIBLE = {'.css', '.js', '.json', '.map', '.svg', '.txt', '.html', '.ico'}
+LOGO = 'images/homimeet_logo.png'
+LOGO_HEIGHTS = (40, 80, 160)
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+# content encoding -> suffix of the precompressed file, in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+# --- build ---
+
+def digest(data):
+    return hashlib.sha1(data).hexdigest()[:10]
+
+
+def hashed_name(rel, data):
+    path = Path(rel)
+    return path.with_name(f"{path.stem}.{digest(data)}{path.suffix}").as_posix()
+
+
+def compress(path, data, level=9):
+    """Write .gz / .br next to `path` when they are smaller; the encodings written."""
+    written = []
+    if path.suffix not in COMPRESSIBLE:
+        return written
+    variants = [('gzip', '.gz', lambda: gzip.compress(data, compresslevel=level, mtime=0))]
+    if brotli is not None:
+        variants.insert(0, ('br', '.br', lambda: brotli.compress(data, quality=11)))
+    for encoding, suffix, fn in variants:
+        packed = fn()
+        if len(packed) < len(data) * 0.9:
+            path.with_name(path.name + suffix).write_bytes(packed)
+            written.append(encoding)
+    return written
+
+
+def emit(rel, data, manifest):
+    """Write `data` as the fingerprinted copy of `rel`; its dist path."""
+    name = hashed_name(rel, data)
+    target = DIST / name
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.write_bytes(data)
+    manifest['encodings'][name] = compress(target, data)
+    return name
+
+
+def logo_variants(manifest):
+    """PNG + WebP copies of the logo at LOGO_HEIGHTS."""
+    with Image.open(STATIC / LOGO) as source:
+        source.load()
+        for height in LOGO_HEIGHTS:
+            width = round(source.width * height / source.height)
+            image = source.resize((width, height), Image.LANCZOS)
+            variant = {'height': height, 'width': width}
+            for fmt, ext, options in (('PNG', 'png', {'optimize': True}),
+                                      ('WEBP', 'webp', {'quality': 85, 'method': 6})):
+                buf = io.BytesIO()
+                image.save(buf, fmt, **options)
+                stem = Path(LOGO).with_suffix('').as_posix()
+                variant[ext] = emit(f"{stem}-{height}.{ext}", buf.getvalue(), manifest)
+            manifest['logo'].append(variant)
+
+
+def build():
+    manifest = {'files': {}, 'encodings': {}, 'logo': []}
+    sources = sorted(p for p in STATIC.rglob('*') if p.is_file() and DIST not in p.parents)
+    for path in sources:
+        rel = path.relative_to(STATIC).as_posix()
+        manifest['files'][rel] = emit(rel, path.read_bytes(), manifest)
+    if Image is not None:
+        logo_variants(manifest)
+    else:
+        print("Pillow not installed: skipping logo variants")
+    if brotli is None:
+        print("brotli not installed: writing gzip only")
+
+    tmp = MANIFEST.with_suffix('.tmp')
+    tmp.write_text(json.dumps(manifest, indent=1, sort_keys=True))
+    os.replace(tmp, MANIFEST)
+    return manifest
+
+
+def clean():
+    """Remove dist files the current manifest does not point at.
+
+    Not part of `build`: pages rendered before a deploy may still ask for
+    the previous names, so run it once those have aged out.
+    """
+    manifest = load_manifest()
+    keep = {MANIFEST}
+    for name, encodings in manifest['encodings'].items():
+        keep.add(DIST / name)
+        keep.update(DIST / (name + suffix) for encoding, suffix in ENCODINGS if encoding in encodings)
+    removed = 0
+    for path in DIST.rglob('*'):
+        if path.is_file() and path not in keep:
+            path.unlink()
+            removed += 1
+    return removed
+
+
+# --- runtime ---
+
+def load_manifest():
+    try:
+        return json.loads(MANIFEST.read_text())
+    except FileNotFoundError:
+        return {'files': {}, 'encodings': {}, 'logo': []}
+
+
+_manifest = load_manifest()
+
+
+def asset_url(path):
+    name = _manifest['files'].get(path)
+    if name is None:
+        return url_for('static', filename=path)
+    return url_for('assets', filename=name)
+
+
+def logo_picture(height, alt='', **attrs):
+    """<picture> for the logo shown `height` px tall, with 1x/2x WebP and PNG sources."""
+    attrs = ''.join(f' {k}="{escape(v)}"' for k, v in attrs.items())
+    variants = _manifest['logo']
+    if not variants:
+        return Markup(f'<img src="{asset_url(LOGO)}" alt="{escape(alt)}" height="{height}"{attrs}>')
+
+    def pick(px):
+        return next((v for v in variants if v['height'] >= px), variants[-1])
+
+    one, two = pick(height), pick(2 * height)
+    width = round(one['width'] * height / one['height'])
+
+    def srcset(ext):
+        return ", ".join(f"{url_for('assets', filename=v[ext])} {x}x" for v, x in ((one, 1), (two, 2)))
+
+    return Markup(
+        f'<picture><source type="image/webp" srcset="{srcset("webp")}">'
+        f'<img src="{url_for("assets", filename=one["png"])}" srcset="{srcset("png")}" '
+        f'alt="{escape(alt)}" width="{width}" height="{height}"{attrs}></picture>'
+    )
+
+
+def serve(filename):
+    encodings = _manifest['encodings'].get(filename)
+    if encodings is None:
+        abort(404)
+    path, encoding = DIST / filename, None
+    for candidate, suffix in ENCODINGS:
+        if candidate in encodings and request.accept_encodings[candidate]:
+            path, encoding = DIST / (filename + suffix), candidate
+            break
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    response = send_file(path, mimetype=mimetype, conditional=True, etag=True)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Cache-Control'] = IMMUTABLE
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+class AssetMiddleware:
+    """Answer /assets/ before Flask's request hooks run.
+
+    Going through the full dispatch would touch the session (Flask-Login
+    refreshes it after every request), which adds `Vary: Cookie` and makes
+    browsers refetch an immutable file whenever the session cookie changes.
+    """
+
+    def __init__(self, app, wsgi_app):
+        self.app = app
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        if not path.startswith('/assets/'):
+            return self.wsgi_app(environ, start_response)
+        with self.app.request_context(environ):
+            try:
+                response = serve(path[len('/assets/'):])
+            except HTTPException as e:
+                response = e.get_response(environ)
+        return response(environ, start_response)
+
+
+def init_app(app):
+    global _manifest
+    _manifest = load_manifest()
+    # the rule is for url_for(); requests are answered by AssetMiddleware
+    app.add_url_rule('/assets/<path:filename>', 'assets', serve)
+    app.wsgi_app = AssetMiddleware(app, app.wsgi_app)
+    app.jinja_env.globals.update(asset_url=asset_url, logo_picture=logo_picture)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['build', 'clean'])
+    args = parser.parse_args(argv)
+
+    if args.command == 'clean':
+        print(f"removed {clean()} stale files")
+        return 0
+
+    DIST.mkdir(parents=True, exist_ok=True)
+    manifest = build()
+    before = after = 0
+    for rel, name in manifest['files'].items():
+        size = (DIST / name).stat().st_size
+        best = min([size] + [(DIST / (name + suffix)).stat().st_size
+                             for encoding, suffix in ENCODINGS if encoding in manifest['encodings'][name]])
+        before += size
+        after += best
+        print(f"  {rel:<32} -> {name:<44} {size:>9,} B  best {best:>9,} B")
+    for variant in manifest['logo']:
+        sizes = ", ".join(f"{ext} {(DIST / variant[ext]).stat().st_size:,} B" for ext in ('png', 'webp'))
+        print(f"  logo {variant['width']}x{variant['height']}: {sizes}")
+    print(f"{len(manifest['files'])} files, {before:,} B -> {after:,} B on the wire")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
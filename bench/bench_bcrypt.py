@@ -0,0 +1,77 @@
+"""Login hashing throughput at different bcrypt costs.
+
+    python bench/bench_bcrypt.py                              # costs 10-13, 16 concurrent logins
+    python bench/bench_bcrypt.py --costs 12 --concurrency 4 32 --workers 2 --queue 8
+
+Each cost runs `--logins` password checks from `--concurrency` client
+threads, once inline on the client threads (the old behaviour) and once
+through passwords.Hasher, and prints logins/s, p50/p95 latency and how
+many checks the bounded queue turned away with Busy (a 503 in the app).
+"""
+import argparse
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from passwords import Busy, Hasher, check_sync, hash_sync  # noqa: E402
+
+PASSWORD = "bench-password"
+
+
+def drive(check, logins, concurrency):
+    latencies, busy = [], [0]
+    lock = threading.Lock()
+
+    def one(_):
+        start = time.perf_counter()
+        try:
+            ok = check()
+        except Busy:
+            with lock:
+                busy[0] += 1
+            return
+        assert ok
+        with lock:
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as clients:
+        list(clients.map(one, range(logins)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0.0
+    return len(latencies) / elapsed, statistics.median(latencies) if latencies else 0.0, p95, busy[0]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--costs', type=int, nargs='+', default=[10, 11, 12, 13])
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[16])
+    parser.add_argument('--logins', type=int, default=64, help="checks per run")
+    parser.add_argument('--workers', type=int, help="hasher threads (default: CPU count)")
+    parser.add_argument('--queue', type=int, default=32, help="hasher backlog beyond the workers")
+    args = parser.parse_args(argv)
+
+    print(f"{'cost':>4} {'clients':>7} {'mode':>7} {'logins/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'busy':>5}")
+    for cost in args.costs:
+        hashed = hash_sync(PASSWORD, cost)
+        hasher = Hasher(rounds=cost, workers=args.workers, queue=args.queue, wait=60)
+        try:
+            for concurrency in args.concurrency:
+                runs = (('inline', lambda: check_sync(hashed, PASSWORD)),
+                        ('pool', lambda: hasher.check(hashed, PASSWORD)))
+                for mode, check in runs:
+                    rate, p50, p95, busy = drive(check, args.logins, concurrency)
+                    print(f"{cost:>4} {concurrency:>7} {mode:>7} {rate:>9.1f} {p50:>8.1f} {p95:>8.1f} {busy:>5}")
+        finally:
+            hasher.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
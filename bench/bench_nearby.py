@@ -0,0 +1,69 @@
+"""Radius-query benchmark: GridIndex vs. a full haversine scan.
+
+    python bench/bench_nearby.py                      # 10k, 100k, 1M points
+    python bench/bench_nearby.py --sizes 10000 50000 --queries 200
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from geo import GridIndex, haversine_km  # noqa: E402
+
+# points are scattered over a ~60 km square, roughly metro-sized
+CENTER = (8.228, 124.245)
+SPREAD_DEG = 0.27
+
+
+def random_point(rng):
+    return (CENTER[0] + rng.uniform(-SPREAD_DEG, SPREAD_DEG),
+            CENTER[1] + rng.uniform(-SPREAD_DEG, SPREAD_DEG))
+
+
+def brute_force(points, lat, lng, radius_km):
+    return [i for i, (plat, plng) in enumerate(points) if haversine_km(lat, lng, plat, plng) <= radius_km]
+
+
+def timed(fn, queries):
+    samples = []
+    for q in queries:
+        start = time.perf_counter()
+        fn(*q)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), max(samples)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--radii', type=float, nargs='+', default=[0.5, 2.0, 5.0])
+    parser.add_argument('--queries', type=int, default=100)
+    parser.add_argument('--scan-queries', type=int, default=5, help="full scans are slow; run fewer")
+    parser.add_argument('--cell-deg', type=float, default=0.01)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    print(f"{'points':>9} {'radius':>7} {'hits':>7} {'grid p50 ms':>12} {'grid max ms':>12} {'scan p50 ms':>12} {'speedup':>8}")
+    for n in args.sizes:
+        points = [random_point(rng) for _ in range(n)]
+        index = GridIndex(args.cell_deg)
+        start = time.perf_counter()
+        for i, (lat, lng) in enumerate(points):
+            index.upsert(i, lat, lng)
+        build_s = time.perf_counter() - start
+        for radius in args.radii:
+            queries = [random_point(rng) + (radius,) for _ in range(args.queries)]
+            grid_p50, grid_max = timed(index.within, queries)
+            scan_p50, _ = timed(lambda lat, lng, r: brute_force(points, lat, lng, r), queries[:args.scan_queries])
+            hits = statistics.mean(len(index.within(*q)) for q in queries[:20])
+            print(f"{n:>9} {radius:>6}k {hits:>7.0f} {grid_p50:>12.3f} {grid_max:>12.3f} {scan_p50:>12.1f} {scan_p50 / grid_p50:>7.0f}x")
+        print(f"{'':>9} index build: {build_s:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,216 @@
+"""Load-test the hot Flask routes against a seeded database.
+
+Seeds (optional), logs in one client per worker as a bench user, then for each
+scenario fires --requests requests at --concurrency and reports throughput,
+p50/p95/p99 latency and DB queries per request.
+
+    python bench/bench_routes.py --seed-data --reset --users 1000 --concurrency 8
+    python bench/bench_routes.py --json results.json
+    python bench/bench_routes.py --baseline results.json --max-regression 0.25
+
+By default requests go through the Flask test client in-process; --url sends
+real HTTP to a running server instead (queries/request is then unavailable).
+--database-url sqlite:// runs against a fresh in-memory SQLite database
+(seeded automatically), no MySQL server needed.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from dotenv import load_dotenv  # noqa: E402
+
+import seed as seeder  # noqa: E402
+
+SCENARIOS = ['my_meetups', 'invitations', 'leaderboard', 'update_location', 'create_invitation']
+
+
+class TestClientDriver:
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def get(self, path):
+        return self.client.get(path).status_code
+
+    def post(self, path, data=None, json_body=None):
+        return self.client.post(path, data=data, json=json_body).status_code
+
+
+class HttpDriver:
+
+    def __init__(self, base_url):
+        import requests
+        self.base_url = base_url.rstrip('/')
+        self.session = requests.Session()
+
+    def get(self, path):
+        return self.session.get(self.base_url + path, allow_redirects=False).status_code
+
+    def post(self, path, data=None, json_body=None):
+        return self.session.post(self.base_url + path, data=data, json=json_body, allow_redirects=False).status_code
+
+
+def make_request(scenario, driver, rng, args):
+    if scenario == 'my_meetups':
+        return driver.get('/my_meetups')
+    if scenario == 'invitations':
+        return driver.get('/invitations')
+    if scenario == 'leaderboard':
+        return driver.get(f'/leaderboard/{rng.randint(1, args.groups)}')
+    if scenario == 'update_location':
+        return driver.post('/update_location', json_body={
+            'lat': seeder.CENTER[0] + rng.uniform(-0.2, 0.2),
+            'lng': seeder.CENTER[1] + rng.uniform(-0.2, 0.2),
+            'accuracy': rng.uniform(5, 50)})
+    if scenario == 'create_invitation':
+        invitees = rng.sample(range(1, args.users + 1), min(args.invitees, args.users))
+        return driver.post('/create_invitation', data={
+            'location': 'Bench meetup', 'scheduled_time': '2030-01-01 18:00:00',
+            'lat': str(seeder.CENTER[0]), 'lng': str(seeder.CENTER[1]),
+            'user_ids': json.dumps(invitees)})
+    raise ValueError(scenario)
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    k = (len(ordered) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def run_scenario(scenario, drivers, args, query_count):
+    per_worker = [args.requests // len(drivers) + (1 if i < args.requests % len(drivers) else 0)
+                  for i in range(len(drivers))]
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    def worker(i):
+        rng = random.Random(args.seed * 1000 + i)
+        local, failed = [], 0
+        for _ in range(per_worker[i]):
+            start = time.perf_counter()
+            status = make_request(scenario, drivers[i], rng, args)
+            local.append((time.perf_counter() - start) * 1000)
+            failed += status >= 400
+        with lock:
+            latencies.extend(local)
+            errors.append(failed)
+
+    queries_before = query_count() if query_count else None
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(drivers)) as pool:
+        list(pool.map(worker, range(len(drivers))))
+    elapsed = time.perf_counter() - start
+    queries = (query_count() - queries_before) / len(latencies) if query_count and latencies else None
+    return {
+        'requests': len(latencies),
+        'errors': sum(errors),
+        'rps': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'mean_ms': round(statistics.mean(latencies), 2) if latencies else 0.0,
+        'queries_per_request': round(queries, 2) if queries is not None else None,
+    }
+
+
+def compare(results, baseline, max_regression):
+    regressions = []
+    for scenario, current in results.items():
+        before = baseline.get(scenario)
+        if not before:
+            continue
+        for metric in ('p95_ms', 'queries_per_request'):
+            old, new = before.get(metric), current.get(metric)
+            if old and new is not None and new > old * (1 + max_regression):
+                regressions.append(f"{scenario} {metric}: {old} -> {new}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    seeder.add_arguments(parser)
+    parser.add_argument('--seed-data', action='store_true', help="seed the database before running")
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=200, help="requests per scenario")
+    parser.add_argument('--warmup', type=int, default=10, help="untimed requests per scenario")
+    parser.add_argument('--invitees', type=int, default=5, help="invitees per create_invitation")
+    parser.add_argument('--url', help="benchmark a running server over HTTP instead of the test client")
+    parser.add_argument('--database-url', help="storage backend for the test client (default: DATABASE_URL / DB_*)")
+    parser.add_argument('--json', help="write results to this file")
+    parser.add_argument('--baseline', help="results file to compare against")
+    parser.add_argument('--max-regression', type=float, default=0.25,
+                        help="allowed relative growth of p95 / queries per request vs. the baseline")
+    args = parser.parse_args(argv)
+    load_dotenv()
+
+    import db
+    if args.url:
+        app = None
+    else:
+        from app import create_app
+        # the test client's session cookies never leave this process, so any key will do
+        config = {'SECRET_KEY': os.getenv('SECRET_KEY') or 'bench'}
+        if args.database_url:
+            config['DATABASE_URL'] = args.database_url
+        app = create_app(config)
+    backend = db.get_backend()
+    if backend.name == 'sqlite':
+        db.create_all()
+        # an in-memory database starts out empty
+        args.seed_data = args.seed_data or backend.memory
+
+    if args.seed_data:
+        conn = db.get_db_connection()
+        try:
+            print("seeded:", seeder.seed(conn, args))
+        finally:
+            conn.close()
+
+    if args.url:
+        drivers = [HttpDriver(args.url) for _ in range(args.concurrency)]
+        query_count = None
+    else:
+        query_count = db.query_count
+        drivers = [TestClientDriver(app) for _ in range(args.concurrency)]
+
+    for i, driver in enumerate(drivers):
+        status = driver.post('/login', data={'username': seeder.USERNAME.format(i + 1), 'password': seeder.PASSWORD})
+        if status != 302:
+            parser.error(f"login as {seeder.USERNAME.format(i + 1)} failed ({status}); seed with --seed-data first")
+
+    results = {}
+    print(f"{'scenario':<18} {'reqs':>6} {'err':>4} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'q/req':>6}")
+    for scenario in args.scenarios:
+        rng = random.Random(args.seed)
+        for _ in range(args.warmup):
+            make_request(scenario, drivers[0], rng, args)
+        r = results[scenario] = run_scenario(scenario, drivers, args, query_count)
+        qpr = '-' if r['queries_per_request'] is None else r['queries_per_request']
+        print(f"{scenario:<18} {r['requests']:>6} {r['errors']:>4} {r['rps']:>8} {r['p50_ms']:>8} "
+              f"{r['p95_ms']:>8} {r['p99_ms']:>8} {qpr:>6}")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+    if args.baseline:
+        regressions = compare(results, json.loads(Path(args.baseline).read_text()), args.max_regression)
+        for line in regressions:
+            print("REGRESSION", line)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""Seed a database with a reproducible synthetic HomiMeet dataset.
+
+Uses the DB_* settings from .env, so point them at a scratch database:
+
+    python bench/seed.py --users 2000 --meetups 10000 --invitations 40000 --reset
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from dotenv import load_dotenv  # noqa: E402
+
+import scores  # noqa: E402
+from passwords import hash_sync  # noqa: E402
+from db import get_db_connection  # noqa: E402
+
+USERNAME = "bench_user_{}"
+PASSWORD = "bench-password"
+CENTER = (8.228, 124.245)
+TABLES = ['punctuality_logs_archive', 'invitations_archive', 'meetups_archive',
+          'entity_versions', 'user_location_history', 'user_locations', 'group_scores', 'user_scores', 'punctuality_logs', 'invitations',
+          'meetups', 'group_members', 'user_groups', 'user_profiles', 'users']
+CHUNK = 1000
+
+
+def add_arguments(parser):
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--groups', type=int, default=20)
+    parser.add_argument('--meetups', type=int, default=2000)
+    parser.add_argument('--invitations', type=int, default=8000)
+    parser.add_argument('--logs', type=int, default=5000)
+    parser.add_argument('--locations', type=float, default=0.5, help="fraction of users with a location fix")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--reset', action='store_true', help="empty the tables first")
+
+
+def insert_rows(conn, table, columns, rows):
+    cur = conn.cursor()
+    marks = ", ".join(["%s"] * len(columns))
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({marks})"
+    for i in range(0, len(rows), CHUNK):
+        cur.executemany(sql, rows[i:i + CHUNK])
+    conn.commit()
+    cur.close()
+
+
+def reset(conn):
+    cur = conn.cursor()
+    cur.execute("SET FOREIGN_KEY_CHECKS = 0")
+    for table in TABLES:
+        cur.execute(f"TRUNCATE TABLE {table}")
+    cur.execute("SET FOREIGN_KEY_CHECKS = 1")
+    conn.commit()
+    cur.close()
+
+
+def seed(conn, args):
+    """Insert the dataset; returns a summary dict of row counts and timing."""
+    rng = random.Random(args.seed)
+    start = time.perf_counter()
+    if args.reset:
+        reset(conn)
+
+    # one hash for everyone, at the lowest cost: seeding is not a bcrypt benchmark
+    password = hash_sync(PASSWORD, 4)
+    insert_rows(conn, 'users', ['id', 'username', 'password'],
+                [(i, USERNAME.format(i), password) for i in range(1, args.users + 1)])
+    insert_rows(conn, 'user_groups', ['id', 'name', 'created_by'],
+                [(g, f"Bench group {g}", rng.randint(1, args.users)) for g in range(1, args.groups + 1)])
+
+    now = datetime.now().replace(microsecond=0)
+    meetups = []
+    for m in range(1, args.meetups + 1):
+        owner = rng.randint(1, args.users)
+        when = now + timedelta(minutes=rng.randint(-60 * 24 * 60, 60 * 24 * 60))
+        meetups.append((m, owner, rng.randint(1, args.groups), f"Bench spot {m}", when,
+                        CENTER[0] + rng.uniform(-0.2, 0.2), CENTER[1] + rng.uniform(-0.2, 0.2),
+                        'canceled' if rng.random() < 0.05 else 'scheduled', owner))
+    insert_rows(conn, 'meetups',
+                ['id', 'user_id', 'group_id', 'location', 'scheduled_time', 'lat', 'lng', 'status', 'created_by'],
+                meetups)
+
+    pairs = set()
+    target = min(args.invitations, args.meetups * (args.users - 1))
+    while len(pairs) < target:
+        pairs.add((rng.randint(1, args.meetups), rng.randint(1, args.users)))
+    insert_rows(conn, 'invitations', ['user_id', 'meetup_id', 'status'],
+                [(u, m, rng.choice(('pending', 'accepted', 'accepted', 'declined'))) for m, u in sorted(pairs)])
+
+    logs = []
+    for _ in range(args.logs):
+        status = rng.choice(('on_time', 'on_time', 'late', 'absent'))
+        logs.append((rng.randint(1, args.users), rng.randint(1, args.meetups), status, scores.SCORE_MAP[status]))
+    insert_rows(conn, 'punctuality_logs', ['user_id', 'meetup_id', 'status', 'score'], logs)
+    scores.rebuild(conn)
+
+    located = rng.sample(range(1, args.users + 1), int(args.users * args.locations))
+    insert_rows(conn, 'user_locations', ['user_id', 'lat', 'lng', 'accuracy', 'last_seen'],
+                [(u, CENTER[0] + rng.uniform(-0.2, 0.2), CENTER[1] + rng.uniform(-0.2, 0.2),
+                  rng.uniform(5, 50), now) for u in located])
+
+    return {'users': args.users, 'groups': args.groups, 'meetups': args.meetups,
+            'invitations': len(pairs), 'logs': len(logs), 'locations': len(located),
+            'seconds': round(time.perf_counter() - start, 2)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+    load_dotenv()
+    conn = get_db_connection()
+    try:
+        print(seed(conn, args))
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
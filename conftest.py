@@ -1,15 +1,33 @@
 import pytest
-from app import create_app  # if you have factory, otherwise import app and configure
+
+import app as app_module
+import db
+import eta
+import locations
+import nearby
+import versions
+from app import create_app
+
+
+@pytest.fixture
+def app():
+    # a fresh in-memory SQLite database per test; no MySQL needed
+    app = create_app({'TESTING': True, 'SECRET_KEY': 'test', 'DATABASE_URL': 'sqlite://',
+                      'BCRYPT_LOG_ROUNDS': 4})
+    db.create_all()
+    app_module.user_cache.clear()
+    versions.fragments.clear()
+    eta.eta_cache.clear()
+    eta.meetup_eta_cache.clear()
+    yield app
+    # the location buffer, nearby index and ETA caches are per process; drop them with the database
+    if locations._buffer is not None:
+        locations._buffer.close()
+    locations._buffer = None
+    nearby._service = None
+
 
 @pytest.fixture
-def client(tmp_path, monkeypatch):
-    # use sqlite for testing
-    dbfile = tmp_path / "test.db"
-    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{dbfile}")
-    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': f'sqlite:///{dbfile}'})
+def client(app):
     with app.test_client() as client:
-        with app.app_context():
-            # initialize db
-            from app import db
-            db.create_all()
         yield client
@@ -0,0 +1,533 @@
+import itertools
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from functools import partial
+
+import mysql.connector
+from flask import g, has_app_context, has_request_context, request, session
+
+import backends
+
+log = logging.getLogger('homimeet.sql')
+
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", 200))
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+_backend = None
+
+
+def get_backend():
+    """The configured backend: DATABASE_URL if set, otherwise MySQL from the DB_* settings."""
+    global _backend
+    if _backend is None:
+        url = os.environ.get("DATABASE_URL")
+        _backend = backends.from_url(url) if url else backends.MySQLBackend()
+    return _backend
+
+
+def configure(url):
+    """Switch to the backend for `url`, dropping the pools built for the previous one."""
+    global _backend, _pool, _replicas
+    with _pool_lock:
+        old, _pool, _replicas = _pool, None, None
+        _backend = backends.from_url(url) if url else backends.MySQLBackend()
+    if old is not None:
+        old.dispose()
+
+
+def get_db_connection(host=None, port=None):
+    """Connect to the primary, or to `host`/`port` (a read replica) with the same credentials."""
+    return get_backend().connect(host, port)
+
+
+class ConnectionPool:
+    """Bounded pool of DB connections.
+
+    Keeps up to `size` idle connections around and lets up to `max_overflow`
+    extra ones be opened under load (they are closed again on checkin).
+    Connections older than `recycle` seconds are replaced on checkout, and
+    with `pre_ping` every checkout pings the server first so a connection
+    dropped by MySQL's wait_timeout never reaches a request.
+    """
+
+    def __init__(self, connect, size=5, max_overflow=10, timeout=30.0, recycle=3600, pre_ping=True):
+        self._connect = connect
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+        self._cond = threading.Condition()
+        self._idle = []        # [(conn, created_at)], used as a LIFO stack
+        self._born = {}        # id(conn) -> created_at for checked-out connections
+        self._open = 0
+        self._stats = {
+            'checkouts': 0,
+            'waits': 0,
+            'wait_time': 0.0,
+            'timeouts': 0,
+            'connects': 0,
+            'recycled': 0,
+            'ping_failures': 0,
+        }
+
+    def checkout(self):
+        start = time.monotonic()
+        deadline = start + self.timeout
+        waited = False
+        with self._cond:
+            while True:
+                if self._idle:
+                    conn, born = self._idle.pop()
+                    break
+                if self._open < self.size + self.max_overflow:
+                    self._open += 1
+                    conn, born = None, None
+                    break
+                waited = True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolTimeout(f"no DB connection available after {self.timeout}s")
+                self._cond.wait(remaining)
+            self._stats['checkouts'] += 1
+            if waited:
+                self._stats['waits'] += 1
+                self._stats['wait_time'] += time.monotonic() - start
+
+        try:
+            if conn is not None and self.recycle and time.monotonic() - born > self.recycle:
+                self._close(conn)
+                conn = None
+                with self._cond:
+                    self._stats['recycled'] += 1
+            elif conn is not None and self.pre_ping and not self._ping(conn):
+                self._close(conn)
+                conn = None
+                with self._cond:
+                    self._stats['ping_failures'] += 1
+            if conn is None:
+                conn = self._connect()
+                born = time.monotonic()
+                with self._cond:
+                    self._stats['connects'] += 1
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self._born[id(conn)] = born
+        return conn
+
+    def checkin(self, conn):
+        with self._cond:
+            born = self._born.pop(id(conn), None)
+            idle = born is None and any(c is conn for c, _ in self._idle)
+        if born is None:
+            # a double checkin (already idle) or a connection the pool never
+            # handed out: neither is counted in _open, so leave the count alone
+            if not idle:
+                self._close(conn)
+            return
+        healthy = True
+        try:
+            # never hand a half-finished transaction to the next borrower
+            conn.rollback()
+        except Exception:
+            healthy = False
+        with self._cond:
+            if healthy and len(self._idle) < self.size:
+                self._idle.append((conn, born))
+                self._cond.notify()
+                return
+            self._open -= 1
+            self._cond.notify()
+        self._close(conn)
+
+    def dispose(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+        for conn, _ in idle:
+            self._close(conn)
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update({
+                'size': self.size,
+                'max_overflow': self.max_overflow,
+                'open': self._open,
+                'idle': len(self._idle),
+                'in_use': self._open - len(self._idle),
+            })
+        return stats
+
+    @staticmethod
+    def _ping(conn):
+        try:
+            conn.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+class Replica:
+    """A read replica's pool plus its health, from a periodic lag check.
+
+    A replica is skipped while it lags more than `max_lag` seconds, while
+    replication is stopped, and for one `check_interval` after it fails to
+    hand out a connection.
+    """
+
+    def __init__(self, name, pool, max_lag=10.0, check_interval=5.0):
+        self.name = name
+        self.pool = pool
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.lag = None
+        self.healthy = True
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def available(self):
+        if time.monotonic() - self._checked >= self.check_interval:
+            with self._lock:
+                if time.monotonic() - self._checked >= self.check_interval:
+                    self._check()
+                    self._checked = time.monotonic()
+        return self.healthy
+
+    def mark_down(self):
+        self.healthy = False
+        self._checked = time.monotonic()
+
+    def _check(self):
+        try:
+            conn = self.pool.checkout()
+        except Exception:
+            log.warning("replica %s unreachable", self.name)
+            self.healthy = False
+            return
+        try:
+            cur = conn.cursor(dictionary=True, buffered=True)
+            try:
+                try:
+                    cur.execute("SHOW REPLICA STATUS")
+                except mysql.connector.Error:
+                    cur.execute("SHOW SLAVE STATUS")   # MySQL < 8.0.22
+                row = cur.fetchone()
+            finally:
+                cur.close()
+        except mysql.connector.Error as e:
+            # typically a missing REPLICATION CLIENT grant: route by reachability only
+            log.warning("replica %s lag check failed: %s", self.name, e)
+            self.lag, self.healthy = None, True
+            return
+        finally:
+            self.pool.checkin(conn)
+        if row is None:
+            # not replicating from anything (e.g. a proxy or a primary alias)
+            self.lag, self.healthy = 0, True
+            return
+        self.lag = row.get('Seconds_Behind_Source', row.get('Seconds_Behind_Master'))
+        self.healthy = self.lag is not None and self.lag <= self.max_lag
+        if not self.healthy:
+            log.warning("replica %s skipped, lag %s s", self.name, self.lag)
+
+    def stats(self):
+        stats = self.pool.stats()
+        stats.update({'healthy': int(self.healthy), 'lag_seconds': -1 if self.lag is None else self.lag})
+        return stats
+
+
+def _pool_settings(prefix="DB_POOL"):
+    return dict(
+        size=int(os.environ.get(f"{prefix}_SIZE", 5)),
+        max_overflow=int(os.environ.get(f"{prefix}_MAX_OVERFLOW", 10)),
+        timeout=float(os.environ.get(f"{prefix}_TIMEOUT", 30)),
+        recycle=int(os.environ.get(f"{prefix}_RECYCLE", 3600)),
+        pre_ping=os.environ.get(f"{prefix}_PRE_PING", "1") not in ("0", "false", "False"),
+    )
+
+
+_pool = None
+_replicas = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(get_db_connection, **get_backend().pool_settings(_pool_settings()))
+    return _pool
+
+
+def get_replicas():
+    """Replicas from DB_REPLICA_HOSTS ("host[:port],..."); empty when unset."""
+    global _replicas
+    if _replicas is None:
+        with _pool_lock:
+            if _replicas is None:
+                replicas = []
+                if not get_backend().replicas:
+                    _replicas = replicas
+                    return _replicas
+                for entry in filter(None, (h.strip() for h in os.environ.get("DB_REPLICA_HOSTS", "").split(","))):
+                    host, _, port = entry.partition(":")
+                    connect = partial(get_db_connection, host, int(port) if port else None)
+                    replicas.append(Replica(entry, ConnectionPool(connect, **_pool_settings()),
+                                            max_lag=float(os.environ.get("DB_REPLICA_MAX_LAG_S", 10)),
+                                            check_interval=float(os.environ.get("DB_REPLICA_CHECK_S", 5))))
+                _replicas = replicas
+    return _replicas
+
+
+def pool_stats():
+    """{target: stats} for the primary and every replica."""
+    stats = {'primary': get_pool().stats()}
+    for replica in get_replicas():
+        stats[replica.name] = replica.stats()
+    return stats
+
+
+# Read routing: reads go to a replica unless this request or, for
+# DB_STICKY_S seconds after a write, this session has written; then they
+# go to the primary so users always see their own changes.
+STICKY_S = float(os.environ.get("DB_STICKY_S", 5))
+# asgi.py marks its writes with this cookie instead of rewriting the session
+PRIMARY_COOKIE = 'db_primary_until'
+_routing = Counter()
+_rr = itertools.count()   # next() is atomic under the GIL
+
+
+def routing_stats():
+    return dict(_routing)
+
+
+def pick_replica():
+    """A replica that is up and within DB_REPLICA_MAX_LAG_S, round-robin; None if there is none."""
+    replicas = [r for r in get_replicas() if r.available()]
+    if not replicas:
+        return None
+    return replicas[next(_rr) % len(replicas)]
+
+
+def sticky_until(session, cookies):
+    """Until when this client's reads go to the primary (epoch seconds)."""
+    until = session.get('_db_primary_until', 0)
+    try:
+        marked = float(cookies.get(PRIMARY_COOKIE, 0))
+    except ValueError:
+        marked = 0
+    # the cookie is unsigned; honour it only for one sticky window
+    if marked <= time.time() + STICKY_S:
+        until = max(until, marked)
+    return until
+
+
+def _read_conn():
+    """Replica connection for a read in this request, or None for the primary."""
+    if not has_request_context() or not get_replicas():
+        return None
+    if g.get('db_wrote') or sticky_until(session, request.cookies) > time.time():
+        _routing['reads_sticky'] += 1
+        return None
+    if 'db_replica' not in g:
+        g.db_replica = None
+        replica = pick_replica()
+        if replica is not None:
+            start = time.perf_counter()
+            try:
+                g.db_replica = (replica, replica.pool.checkout())
+            except Exception:
+                log.warning("replica %s checkout failed, reading from the primary", replica.name)
+                replica.mark_down()
+                _routing['replica_fallbacks'] += 1
+            request_stats()['connect_time'] += time.perf_counter() - start
+    if g.db_replica is None:
+        _routing['reads_primary'] += 1
+        return None
+    _routing['reads_replica'] += 1
+    return g.db_replica[1]
+
+
+def _wrote():
+    if has_request_context() and get_replicas():
+        g.db_wrote = True
+        session['_db_primary_until'] = time.time() + STICKY_S
+
+
+# Request-scoped connection: borrowed on first use, returned on teardown
+def get_db():
+    if 'db_conn' not in g:
+        start = time.perf_counter()
+        g.db_conn = get_pool().checkout()
+        request_stats()['connect_time'] += time.perf_counter() - start
+    return g.db_conn
+
+
+def close_db(exc=None):
+    conn = g.pop('db_conn', None)
+    if conn is not None:
+        get_pool().checkin(conn)
+    replica = g.pop('db_replica', None)
+    if replica is not None:
+        replica[0].pool.checkin(replica[1])
+
+
+def init_app(app):
+    if app.config.get('DATABASE_URL'):
+        configure(app.config['DATABASE_URL'])
+    app.teardown_appcontext(close_db)
+
+
+def create_all():
+    """Create the schema (sql/schema.sql, or its SQLite twin) on the configured database."""
+    conn = get_pool().checkout()
+    try:
+        get_backend().create_schema(conn)
+    finally:
+        get_pool().checkin(conn)
+
+
+# Query instrumentation: per-request stats live on flask.g, totals per process
+_query_lock = threading.Lock()
+_queries = 0
+
+_LITERALS = re.compile(r"'(?:[^'\\]|\\.|'')*'|\b\d+(?:\.\d+)?\b|%s")
+_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_ROWS = re.compile(r"(\(\.\.\.\))(?:\s*,\s*\(\.\.\.\))+")
+
+
+def fingerprint(query):
+    """Normalize SQL so every execution of one statement shape looks the same."""
+    sql = " ".join(query.split())
+    sql = _LITERALS.sub("?", sql)
+    sql = _LISTS.sub("(...)", sql)
+    return _ROWS.sub(r"\1", sql)
+
+
+def query_count():
+    """Statements run through the helpers below since process start."""
+    return _queries
+
+
+def request_stats():
+    if 'db_stats' not in g:
+        g.db_stats = {'queries': 0, 'db_time': 0.0, 'connect_time': 0.0, 'fingerprints': Counter()}
+    return g.db_stats
+
+
+def record_query(query, seconds):
+    global _queries
+    with _query_lock:
+        _queries += 1
+    if has_app_context():
+        stats = request_stats()
+        stats['queries'] += 1
+        stats['db_time'] += seconds
+        stats['fingerprints'][fingerprint(query)] += 1
+    if seconds * 1000 >= SLOW_QUERY_MS:
+        log.warning("slow query (%.1f ms): %s", seconds * 1000, fingerprint(query))
+
+
+_local = threading.local()
+
+
+@contextmanager
+def transaction():
+    """Unit of work: helper calls inside the block share one connection and
+    commit together on exit (or roll back together on an exception).
+
+    Uses the request's connection inside an app context, a pooled one
+    otherwise. Nested blocks join the outer transaction.
+    """
+    if getattr(_local, 'tx', None) is not None:
+        yield _local.tx
+        return
+    scoped = has_app_context()
+    conn = get_db() if scoped else get_pool().checkout()
+    _local.tx = conn
+    try:
+        yield conn
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        _local.tx = None
+        if not scoped:
+            get_pool().checkin(conn)
+
+
+def _run(query, params, fetch, many=False):
+    tx = getattr(_local, 'tx', None)
+    # outside a request (CLI, scripts) borrow a connection just for this call
+    scoped = tx is None and has_app_context()
+    if tx is not None:
+        conn = tx
+    elif scoped:
+        conn = (_read_conn() if fetch is not None else None) or get_db()
+    else:
+        conn = get_pool().checkout()
+    start = time.perf_counter()
+    try:
+        cur = conn.cursor(dictionary=fetch is not None, buffered=True)
+        try:
+            if many:
+                cur.executemany(query, params)
+            else:
+                cur.execute(query, params)
+            if fetch == 'all':
+                return cur.fetchall()
+            if fetch == 'one':
+                return cur.fetchone()
+            if tx is None:
+                conn.commit()
+            _wrote()
+            return cur.lastrowid
+        finally:
+            cur.close()
+            record_query(query, time.perf_counter() - start)
+    finally:
+        if tx is None and not scoped:
+            get_pool().checkin(conn)
+
+
+def fetchall_dict(query, params=()):
+    return _run(query, params, 'all')
+
+
+def fetchone_dict(query, params=()):
+    return _run(query, params, 'one')
+
+
+def execute(query, params=()):
+    return _run(query, params, None)
+
+
+def executemany(query, seq_of_params):
+    seq_of_params = list(seq_of_params)
+    if seq_of_params:
+        _run(query, seq_of_params, None, many=True)
@@ -0,0 +1,102 @@
+"""Straight-line ETA estimates for /get_eta and per-meetup participant ETAs.
+
+There is no routing here: distance is great-circle distance times a detour
+factor, divided by an average speed for the travel mode. Results are cached
+on rounded coordinates so the same page polling again (or several members
+standing in the same spot) does not recompute them.
+"""
+import os
+
+import numpy as np
+
+from cache import TTLCache
+from db import fetchall_dict
+from geo import haversine_km, haversine_km_np
+
+SPEED_KMH = {'driving': 30.0, 'walking': 5.0, 'cycling': 15.0}
+DETOUR_FACTOR = 1.3
+# 3 decimals is ~110 m: close enough that the ETA would not change
+ORIGIN_PRECISION = 3
+DEST_PRECISION = 4
+
+eta_cache = TTLCache(maxsize=int(os.environ.get("ETA_CACHE_SIZE", 4096)),
+                     ttl=float(os.environ.get("ETA_CACHE_TTL_S", 60)))
+meetup_eta_cache = TTLCache(maxsize=1024, ttl=float(os.environ.get("MEETUP_ETA_CACHE_TTL_S", 15)))
+
+
+def format_minutes(minutes):
+    if minutes is None:
+        return None
+    minutes = int(round(minutes))
+    if minutes < 1:
+        return "< 1 min"
+    if minutes < 60:
+        return f"{minutes} min"
+    return f"{minutes // 60} h {minutes % 60} min"
+
+
+def _eta(distance_km, speed_kmh):
+    minutes = distance_km * DETOUR_FACTOR / speed_kmh * 60
+    return {'distance_km': round(float(distance_km), 3), 'eta_minutes': round(float(minutes), 1),
+            'eta': format_minutes(minutes)}
+
+
+def estimate_eta(lat, lng, dest_lat, dest_lng, mode='driving'):
+    speed = SPEED_KMH.get(mode, SPEED_KMH['driving'])
+    key = (round(lat, ORIGIN_PRECISION), round(lng, ORIGIN_PRECISION),
+           round(dest_lat, DEST_PRECISION), round(dest_lng, DEST_PRECISION), mode)
+    return eta_cache.get_or_set(key, lambda: _eta(haversine_km(*key[:4]), speed))
+
+
+def meetup_etas(meetup_id, mode='driving'):
+    """ETA of the host and every accepted invitee from their last known fix."""
+    return meetup_eta_cache.get_or_set((int(meetup_id), mode), lambda: _meetup_etas(meetup_id, mode))
+
+
+# host plus accepted members, each with their last known fix; params (meetup_id, meetup_id)
+MEETUP_PARTICIPANTS = """
+    SELECT p.user_id, u.username, p.role, m.lat AS dest_lat, m.lng AS dest_lng,
+           l.lat, l.lng, l.last_seen
+    FROM (
+        SELECT user_id, 'host' AS role, id AS meetup_id FROM meetups WHERE id = %s
+        UNION
+        SELECT user_id, 'member' AS role, meetup_id FROM invitations
+        WHERE meetup_id = %s AND status = 'accepted'
+    ) p
+    JOIN meetups m ON m.id = p.meetup_id
+    JOIN users u ON u.id = p.user_id
+    LEFT JOIN user_locations l ON l.user_id = p.user_id
+    ORDER BY p.role
+"""
+
+
+def _meetup_etas(meetup_id, mode):
+    return participant_etas(fetchall_dict(MEETUP_PARTICIPANTS, (meetup_id, meetup_id)), mode)
+
+
+def participant_etas(rows, mode='driving'):
+    """ETAs for MEETUP_PARTICIPANTS rows (shared with the async API in asgi.py)."""
+    # a host who also accepted their own invite is listed once, as host
+    unique = {}
+    for r in rows:
+        unique.setdefault(r['user_id'], r)
+    rows = list(unique.values())
+    if not rows:
+        return []
+    result = [{'user_id': r['user_id'], 'username': r['username'], 'role': r['role'],
+               'last_seen': r['last_seen'], 'distance_km': None, 'eta_minutes': None, 'eta': None}
+              for r in rows]
+    dest_lat, dest_lng = rows[0]['dest_lat'], rows[0]['dest_lng']
+    located = [i for i, r in enumerate(rows) if r['lat'] is not None]
+    if dest_lat is None or dest_lng is None or not located:
+        return result
+
+    # one vectorized pass over every participant that has a fix
+    lats = np.array([rows[i]['lat'] for i in located], dtype=float)
+    lngs = np.array([rows[i]['lng'] for i in located], dtype=float)
+    distances = haversine_km_np(lats, lngs, float(dest_lat), float(dest_lng))
+    minutes = distances * DETOUR_FACTOR / SPEED_KMH.get(mode, SPEED_KMH['driving']) * 60
+    for i, d, mins in zip(located, distances, minutes):
+        result[i].update({'distance_km': round(float(d), 3), 'eta_minutes': round(float(mins), 1),
+                          'eta': format_minutes(mins)})
+    return result
@@ -0,0 +1,174 @@
+"""Per-user push events (invitations, member status, meetup changes) over SSE.
+
+Write paths call `broker.publish(user_ids, type, **data)`; every open
+/events stream of those users gets the event. Fan-out is in-process only:
+run a single worker process (threads / the ASGI event loop scale within it)
+or put a shared pub/sub in front of `publish` before scaling out.
+
+A subscriber that stops reading is not allowed to grow without bound: once
+its queue is full it is sent a `resync` event and disconnected, and the
+client reloads instead of replaying a backlog.
+
+Under plain WSGI every open stream pins a worker thread, so pages only
+open one when EVENTS_URL is set (asgi.py sets it to its own /events). A
+user gets at most EVENTS_MAX_PER_USER streams, and WSGI streams end after
+EVENTS_MAX_STREAM_S; the browser reconnects after the `retry:` delay.
+"""
+import asyncio
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+from collections import defaultdict
+
+KEEPALIVE_S = float(os.environ.get("EVENTS_KEEPALIVE_S", 15))
+MAX_STREAM_S = float(os.environ.get("EVENTS_MAX_STREAM_S", 300))
+RETRY_MS = 5000
+
+
+class TooManyStreams(Exception):
+    """The user already has EVENTS_MAX_PER_USER open streams."""
+
+
+class Subscription:
+
+    def __init__(self, user_id, maxsize):
+        self.user_id = user_id
+        self.overflowed = False
+        self._queue = queue.Queue(maxsize)
+
+    def put(self, event):
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+
+    def get(self, timeout):
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class AsyncSubscription(Subscription):
+    """Subscription read from an event loop; `put` is safe from any thread."""
+
+    def __init__(self, user_id, maxsize, loop):
+        self.user_id = user_id
+        self.overflowed = False
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize)
+
+    def put(self, event):
+        self._loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event):
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self, timeout):
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class EventBroker:
+
+    def __init__(self, queue_size=100, max_per_user=4):
+        self.queue_size = queue_size
+        self.max_per_user = max_per_user
+        self._subs = defaultdict(set)
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._stats = {'published': 0, 'delivered': 0, 'overflowed': 0, 'rejected': 0}
+
+    def subscribe(self, user_id, loop=None):
+        user_id = int(user_id)
+        if loop is None:
+            sub = Subscription(user_id, self.queue_size)
+        else:
+            sub = AsyncSubscription(user_id, self.queue_size, loop)
+        with self._lock:
+            if len(self._subs.get(user_id, ())) >= self.max_per_user:
+                self._stats['rejected'] += 1
+                raise TooManyStreams(f"user {user_id} already has {self.max_per_user} event streams")
+            self._subs[user_id].add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        """Drop `sub`; safe to call again (the stream's finally and the response's close both do)."""
+        with self._lock:
+            subs = self._subs.get(sub.user_id)
+            if subs is None or sub not in subs:
+                return
+            subs.discard(sub)
+            if not subs:
+                del self._subs[sub.user_id]
+            if sub.overflowed:
+                self._stats['overflowed'] += 1
+
+    def publish(self, user_ids, type, **data):
+        event = {'id': next(self._ids), 'type': type, 'data': data}
+        with self._lock:
+            self._stats['published'] += 1
+            targets = [sub for uid in {int(u) for u in user_ids} for sub in self._subs.get(uid, ())]
+            self._stats['delivered'] += len(targets)
+        for sub in targets:
+            sub.put(event)
+        return event
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['subscribers'] = sum(len(s) for s in self._subs.values())
+        return stats
+
+
+def format_event(event):
+    data = json.dumps(event['data'], default=str, separators=(',', ':'))
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {data}\n\n"
+
+
+RESYNC = "event: resync\ndata: {}\n\n"
+KEEPALIVE = ": keepalive\n\n"
+
+
+def stream(sub, max_age=MAX_STREAM_S):
+    """Blocking SSE body for the WSGI /events route; ends after `max_age` seconds."""
+    deadline = time.monotonic() + max_age
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return   # frees the worker thread; the client reconnects
+            event = sub.get(min(KEEPALIVE_S, remaining))
+            if sub.overflowed:
+                yield RESYNC
+                return
+            yield KEEPALIVE if event is None else format_event(event)
+    finally:
+        broker.unsubscribe(sub)
+
+
+async def astream(sub):
+    """Async SSE body for the ASGI /events route."""
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        while True:
+            event = await sub.get(KEEPALIVE_S)
+            if sub.overflowed:
+                yield RESYNC
+                return
+            yield KEEPALIVE if event is None else format_event(event)
+    finally:
+        broker.unsubscribe(sub)
+
+
+broker = EventBroker(int(os.environ.get("EVENTS_QUEUE_SIZE", 100)),
+                     int(os.environ.get("EVENTS_MAX_PER_USER", 4)))
@@ -0,0 +1,104 @@
+import threading
+from math import radians, cos, sin, asin, sqrt, ceil, floor
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(radians, (lat1, lng1, lat2, lng2))
+    a = sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * cos(lat2) * sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * asin(sqrt(a))
+
+
+def haversine_m(lat1, lng1, lat2, lng2):
+    return haversine_km(lat1, lng1, lat2, lng2) * 1000.0
+
+
+KM_PER_DEG_LAT = 111.32
+
+
+class GridIndex:
+    """In-memory spatial index bucketing points into fixed lat/lng cells.
+
+    A radius query only visits the cells overlapping the query's bounding
+    box and runs haversine on the points inside them, instead of scanning
+    every point. `cell_deg` of 0.01 is roughly 1.1 km at the equator.
+    """
+
+    def __init__(self, cell_deg=0.01):
+        self.cell_deg = cell_deg
+        self._cols = int(ceil(360.0 / cell_deg))
+        self._cells = {}    # (row, col) -> {key: (lat, lng, payload)}
+        self._where = {}    # key -> (row, col)
+        self._lock = threading.RLock()
+
+    def _cell(self, lat, lng):
+        return floor(lat / self.cell_deg), floor((lng + 180.0) / self.cell_deg) % self._cols
+
+    def upsert(self, key, lat, lng, payload=None):
+        cell = self._cell(lat, lng)
+        with self._lock:
+            old = self._where.get(key)
+            if old is not None and old != cell:
+                self._discard(key, old)
+            self._cells.setdefault(cell, {})[key] = (lat, lng, payload)
+            self._where[key] = cell
+
+    def remove(self, key):
+        with self._lock:
+            cell = self._where.pop(key, None)
+            if cell is not None:
+                self._discard(key, cell)
+
+    def _discard(self, key, cell):
+        bucket = self._cells.get(cell)
+        if bucket is not None:
+            bucket.pop(key, None)
+            if not bucket:
+                del self._cells[cell]
+
+    def get(self, key):
+        with self._lock:
+            cell = self._where.get(key)
+            return self._cells[cell].get(key) if cell is not None else None
+
+    def keys(self):
+        with self._lock:
+            return list(self._where)
+
+    def __len__(self):
+        return len(self._where)
+
+    def within(self, lat, lng, radius_km, limit=None):
+        """[(key, distance_km, payload)] within radius_km, nearest first."""
+        dlat = radius_km / KM_PER_DEG_LAT
+        coslat = cos(radians(min(abs(lat) + dlat, 90.0)))
+        dlng = 360.0 if coslat < 1e-9 else min(radius_km / (KM_PER_DEG_LAT * coslat), 360.0)
+        rows = range(floor((lat - dlat) / self.cell_deg), floor((lat + dlat) / self.cell_deg) + 1)
+        first_col = floor((lng - dlng + 180.0) / self.cell_deg)
+        last_col = floor((lng + dlng + 180.0) / self.cell_deg)
+        cols = {c % self._cols for c in range(first_col, min(last_col, first_col + self._cols - 1) + 1)}
+
+        hits = []
+        with self._lock:
+            if len(rows) * len(cols) > len(self._cells):
+                # huge radius: cheaper to walk the occupied cells
+                buckets = [b for (r, c), b in self._cells.items() if r in rows and c in cols]
+            else:
+                buckets = [self._cells[(r, c)] for r in rows for c in cols if (r, c) in self._cells]
+            for bucket in buckets:
+                for key, (plat, plng, payload) in bucket.items():
+                    d = haversine_km(lat, lng, plat, plng)
+                    if d <= radius_km:
+                        hits.append((key, d, payload))
+        hits.sort(key=lambda h: h[1])
+        return hits[:limit] if limit else hits
+
+
+def haversine_km_np(lat1, lng1, lat2, lng2):
+    """Vectorized haversine over NumPy arrays (or scalars, broadcast)."""
+    lat1, lng1, lat2, lng2 = (np.radians(np.asarray(v, dtype=float)) for v in (lat1, lng1, lat2, lng2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
@@ -0,0 +1,180 @@
+"""Write-coalescing ingestion for /update_location.
+
+Clients report a fix every few seconds. Instead of a round trip per fix,
+`LocationBuffer` keeps only the newest position per user in memory and a
+background thread writes everything pending with one multi-row
+INSERT ... ON DUPLICATE KEY UPDATE every `flush_interval` seconds.
+Fixes that moved less than `min_move_m` (and did not sharpen accuracy) are
+dropped, except for a periodic heartbeat so last_seen stays fresh.
+The same flush appends each fix to user_location_history, one row per user
+per `history_bucket_s` window, for the punctuality scorer.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from db import executemany, transaction
+from geo import haversine_m
+
+log = logging.getLogger(__name__)
+
+UPSERT = """
+    INSERT INTO user_locations (user_id, lat, lng, accuracy, last_seen)
+    VALUES (%s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE lat = VALUES(lat), lng = VALUES(lng),
+                            accuracy = VALUES(accuracy), last_seen = VALUES(last_seen)
+"""
+
+# the newest fix in a bucket wins
+HISTORY_UPSERT = """
+    INSERT INTO user_location_history (user_id, bucket, lat, lng, accuracy)
+    VALUES (%s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE lat = VALUES(lat), lng = VALUES(lng), accuracy = VALUES(accuracy)
+"""
+
+
+def bucket_start(seen, bucket_s):
+    return seen - timedelta(seconds=seen.timestamp() % bucket_s) if bucket_s else seen
+
+
+class LocationBuffer:
+
+    def __init__(self, flush_interval=0.5, min_move_m=10.0, heartbeat=60.0, history_bucket_s=60):
+        self.flush_interval = flush_interval
+        self.min_move_m = min_move_m
+        self.heartbeat = heartbeat
+        self.history_bucket_s = history_bucket_s    # 0 disables the history
+        self._lock = threading.Lock()
+        self._pending = {}    # user_id -> (lat, lng, accuracy, seen_at)
+        self._written = {}    # user_id -> (lat, lng, accuracy, monotonic write time)
+        self._pruned_at = time.monotonic()
+        self._stats = {
+            'received': 0,
+            'dropped': 0,      # too close to the last stored fix
+            'coalesced': 0,    # overwritten before it was flushed
+            'written': 0,
+            'flushes': 0,
+            'errors': 0,
+        }
+        self._listeners = []
+        self._thread = None
+        self._stop = threading.Event()
+
+    def add_listener(self, callback):
+        """Call callback(user_id, lat, lng, seen_at) for every fix once it is stored."""
+        self._listeners.append(callback)
+
+    def submit(self, user_id, lat, lng, accuracy=None):
+        """Queue a fix; returns False if it was dropped as redundant."""
+        now = time.monotonic()
+        with self._lock:
+            self._stats['received'] += 1
+            pending = self._pending.get(user_id)
+            if pending is None and self._is_redundant(user_id, lat, lng, accuracy, now):
+                self._stats['dropped'] += 1
+                return False
+            if pending is not None:
+                self._stats['coalesced'] += 1
+            self._pending[user_id] = (lat, lng, accuracy, datetime.now())
+        if self.flush_interval <= 0:
+            self.flush()
+        else:
+            self._ensure_worker()
+        return True
+
+    def _is_redundant(self, user_id, lat, lng, accuracy, now):
+        last = self._written.get(user_id)
+        if last is None or now - last[3] >= self.heartbeat:
+            return False
+        if haversine_m(last[0], last[1], lat, lng) >= self.min_move_m:
+            return False
+        # a much sharper fix of the same spot is still worth storing
+        if accuracy is not None and last[2] is not None and accuracy < last[2] / 2:
+            return False
+        return True
+
+    def flush(self):
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        if not batch:
+            return 0
+        rows = [(uid, lat, lng, acc, seen) for uid, (lat, lng, acc, seen) in batch.items()]
+        try:
+            with transaction():
+                executemany(UPSERT, rows)
+                if self.history_bucket_s:
+                    executemany(HISTORY_UPSERT, [(uid, bucket_start(seen, self.history_bucket_s), lat, lng, acc)
+                                                 for uid, lat, lng, acc, seen in rows])
+        except Exception:
+            log.exception("location flush failed, %d fixes requeued", len(batch))
+            with self._lock:
+                self._stats['errors'] += 1
+                for uid, fix in batch.items():
+                    self._pending.setdefault(uid, fix)   # keep anything newer
+            return 0
+        now = time.monotonic()
+        with self._lock:
+            for uid, (lat, lng, acc, _) in batch.items():
+                self._written[uid] = (lat, lng, acc, now)
+            if now - self._pruned_at >= self.heartbeat:
+                # past the heartbeat a fix is stored anyway, so older entries are dead weight
+                self._written = {uid: w for uid, w in self._written.items() if now - w[3] < self.heartbeat}
+                self._pruned_at = now
+            self._stats['written'] += len(rows)
+            self._stats['flushes'] += 1
+        for callback in self._listeners:
+            for row in rows:
+                try:
+                    callback(*row[:3], row[4])
+                except Exception:
+                    log.exception("location listener failed")
+        return len(rows)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['pending'] = len(self._pending)
+            stats['tracked'] = len(self._written)
+        return stats
+
+    def _ensure_worker(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="location-flush", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval * 4)
+        self.flush()
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_buffer():
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = LocationBuffer(
+                    flush_interval=int(os.environ.get("LOCATION_FLUSH_MS", 500)) / 1000.0,
+                    min_move_m=float(os.environ.get("LOCATION_MIN_MOVE_M", 10)),
+                    heartbeat=float(os.environ.get("LOCATION_HEARTBEAT_S", 60)),
+                    history_bucket_s=int(os.environ.get("LOCATION_HISTORY_BUCKET_S", 60)),
+                )
+                atexit.register(_buffer.close)
+    return _buffer
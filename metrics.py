@@ -0,0 +1,127 @@
+"""Request timing, Server-Timing headers and the Prometheus /metrics endpoint.
+
+Per-request DB numbers come from db.request_stats(); this module adds wall
+time, per-route latency histograms and a warning when one statement shape
+runs many times in a single request (the usual N+1 signature).
+
+/metrics exposes query shapes and pool state, so it answers only requests
+with `Authorization: Bearer $METRICS_TOKEN`, or, without a token
+configured, direct (not proxied) requests from loopback.
+"""
+import hmac
+import logging
+import os
+import threading
+import time
+
+from flask import abort, current_app, g, request
+
+import db
+
+log = logging.getLogger('homimeet.requests')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+REPEATED_QUERY_WARN = int(os.environ.get("REPEATED_QUERY_WARN", 10))
+LOOPBACK = ('127.0.0.1', '::1')
+
+
+class Histogram:
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self._series = {}   # labels tuple -> [bucket counts..., count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.setdefault(labels, [0] * (len(self.buckets) + 2))
+            for i, upper in enumerate(self.buckets):
+                if value <= upper:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def render(self, name, label_names):
+        lines = [f"# TYPE {name} histogram"]
+        with self._lock:
+            items = sorted(self._series.items())
+        for labels, series in items:
+            base = ",".join(f'{k}="{v}"' for k, v in zip(label_names, labels))
+            for upper, count in zip(self.buckets, series):
+                lines.append(f'{name}_bucket{{{base},le="{upper}"}} {count}')
+            lines.append(f'{name}_bucket{{{base},le="+Inf"}} {series[-2]}')
+            lines.append(f"{name}_count{{{base}}} {series[-2]}")
+            lines.append(f"{name}_sum{{{base}}} {round(series[-1], 6)}")
+        return lines
+
+
+request_latency = Histogram(LATENCY_BUCKETS)
+request_db_time = Histogram(LATENCY_BUCKETS)
+request_queries = Histogram(QUERY_BUCKETS)
+
+_collectors = []
+
+
+def register(collector):
+    """Add a callable returning extra exposition lines for /metrics."""
+    _collectors.append(collector)
+
+
+def _start_timer():
+    g.request_started = time.perf_counter()
+
+
+def _finish(response):
+    started = g.pop('request_started', None)
+    if started is None:
+        return response
+    total = time.perf_counter() - started
+    stats = db.request_stats()
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    labels = (route, request.method)
+    request_latency.observe(labels, total)
+    request_db_time.observe(labels, stats['db_time'])
+    request_queries.observe(labels, stats['queries'])
+
+    response.headers['Server-Timing'] = ", ".join([
+        f'db;dur={stats["db_time"] * 1000:.1f};desc="{stats["queries"]} queries"',
+        f'db-connect;dur={stats["connect_time"] * 1000:.1f}',
+        f'app;dur={total * 1000:.1f}',
+    ])
+    for shape, count in stats['fingerprints'].most_common(3):
+        if count < REPEATED_QUERY_WARN:
+            break
+        log.warning("%s %s ran the same statement %d times: %s", request.method, route, count, shape)
+    return response
+
+
+def render():
+    lines = []
+    lines += request_latency.render('homimeet_request_duration_seconds', ('route', 'method'))
+    lines += request_db_time.render('homimeet_request_db_seconds', ('route', 'method'))
+    lines += request_queries.render('homimeet_request_queries', ('route', 'method'))
+    lines.append(f"homimeet_db_queries_total {db.query_count()}")
+    for collector in _collectors:
+        lines += collector()
+    return "\n".join(lines) + "\n"
+
+
+def allowed():
+    token = current_app.config.get('METRICS_TOKEN')
+    if token:
+        return hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {token}")
+    # a reverse proxy on the same host connects from loopback too
+    return request.remote_addr in LOOPBACK and 'X-Forwarded-For' not in request.headers
+
+
+def serve():
+    if not allowed():
+        abort(403)
+    return render(), 200, {'Content-Type': 'text/plain; version=0.0.4'}
+
+
+def init_app(app):
+    app.before_request(_start_timer)
+    app.after_request(_finish)
+    app.add_url_rule('/metrics', 'metrics', serve)
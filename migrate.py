@@ -0,0 +1,154 @@
+"""Apply the SQL files under migrations/ in order and check hot-path query plans.
+
+    python migrate.py             # apply pending migrations
+    python migrate.py --dry-run   # list pending migrations only
+    python migrate.py --explain   # EXPLAIN the hot queries, fail on full scans
+"""
+import argparse
+import re
+import sys
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from db import get_db_connection
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent / "migrations"
+
+# Errors meaning "this change is already in place" (schema.sql is kept current,
+# and live databases picked up some columns by hand before migrations existed).
+ALREADY_APPLIED = {
+    1050,  # table already exists
+    1060,  # duplicate column name
+    1061,  # duplicate key name
+    1826,  # duplicate foreign key constraint name
+}
+
+def hot_queries():
+    """[(name, sql, params)]: the statements the hot routes and jobs run, with sample parameters.
+
+    The SQL comes from the modules that execute it, so the plans checked are
+    the plans the app gets.
+    """
+    import app
+    import archive
+    import punctuality
+    import scores
+    from pagination import keyset_clause
+
+    def page_two(ts_col, id_col):
+        # second page: the keyset condition is what could defeat the index
+        return keyset_clause(('2024-01-01 00:00:00', 100), ts_col, id_col)
+
+    ks, ks_params = page_two("m.scheduled_time", "m.id")
+    my_meetups = app.MY_MEETUPS_QUERY.format(where="m.user_id = %s", inv_where="i.user_id = %s AND i.status = 'accepted'", ks=ks)
+    pending_ks, pending_params = page_two("m.scheduled_time", "i.id")
+    scores_ks, scores_params = page_two("m.scheduled_time", "p.id")
+    three = ", ".join(["%s"] * 3)
+    return [
+        ('my_meetups', my_meetups, (1,) + ks_params + (21, 1) + ks_params + (21, 21)),
+        ('my_meetups (members)', app.MEMBERS_QUERY.format(marks=three), (1, 2, 3)),
+        ('invitations (pending)', app.PENDING_INVITES_QUERY.format(ks=pending_ks), (1,) + pending_params + (21,)),
+        ('invitations (user search)', app.USER_SEARCH_QUERY, ('jar%', '', 1, 11)),
+        ('leaderboard', scores.LEADERBOARD.format(order='DESC'), (1,)),
+        ('my_scores', app.MY_SCORES_QUERY.format(ks=scores_ks), (1,) + scores_params + (21,)),
+        ('dashboard', scores.USER_TOTAL, (1,)),
+        ('delete_meetup (score deltas)', scores.MEETUP_TOTALS, (1,)),
+        ('archive (candidates)', archive.CANDIDATES, ('2024-01-01', '2023-01-01', '1000-01-01', 0, 200)),
+        ('punctuality (candidates)', punctuality.CANDIDATES, ('2024-01-01', '2024-01-03', '1000-01-01', 0, 100)),
+        ('punctuality (fixes)', punctuality.FIXES.format(marks=three), (3600, 1800, 1, 2, 3)),
+    ]
+
+
+def split_statements(sql):
+    lines = [l for l in sql.splitlines() if not l.strip().startswith('--')]
+    return [s.strip() for s in re.split(r';\s*$', "\n".join(lines), flags=re.M) if s.strip()]
+
+
+def ensure_table(conn):
+    cur = conn.cursor()
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version VARCHAR(255) PRIMARY KEY,
+            applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.commit()
+    cur.close()
+
+
+def pending_migrations(conn):
+    ensure_table(conn)
+    cur = conn.cursor()
+    cur.execute("SELECT version FROM schema_migrations")
+    applied = {row[0] for row in cur.fetchall()}
+    cur.close()
+    return [p for p in sorted(MIGRATIONS_DIR.glob("*.sql")) if p.stem not in applied]
+
+
+def apply_migration(conn, path):
+    cur = conn.cursor()
+    try:
+        for statement in split_statements(path.read_text()):
+            try:
+                cur.execute(statement)
+            except Exception as e:
+                if getattr(e, 'errno', None) not in ALREADY_APPLIED:
+                    raise
+                print(f"  skipped (already applied): {e.msg}")
+        cur.execute("INSERT INTO schema_migrations (version) VALUES (%s)", (path.stem,))
+        conn.commit()
+    finally:
+        cur.close()
+
+
+def run_migrations(conn, dry_run=False):
+    todo = pending_migrations(conn)
+    for path in todo:
+        print(f"{'pending' if dry_run else 'applying'} {path.name}")
+        if not dry_run:
+            apply_migration(conn, path)
+    if not todo:
+        print("schema is up to date")
+    return todo
+
+
+def explain_hot_queries(conn):
+    """EXPLAIN every hot query; returns [(name, table, access type, key, ok)]."""
+    report = []
+    cur = conn.cursor(dictionary=True)
+    for name, sql, params in hot_queries():
+        cur.execute("EXPLAIN " + sql, params)
+        for row in cur.fetchall():
+            table = row.get('table') or ''
+            if table.startswith('<'):   # derived/union temp tables
+                continue
+            # a full scan is only acceptable on tiny const lookups
+            ok = row.get('key') is not None or row.get('type') in ('const', 'system', 'eq_ref')
+            report.append((name, table, row.get('type'), row.get('key'), ok))
+    cur.close()
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dry-run', action='store_true', help="only list pending migrations")
+    parser.add_argument('--explain', action='store_true', help="check that hot queries use an index")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    conn = get_db_connection()
+    try:
+        if args.explain:
+            report = explain_hot_queries(conn)
+            for name, table, access, key, ok in report:
+                print(f"{'ok  ' if ok else 'SCAN'} {name:<28} {table:<18} type={access} key={key}")
+            return 0 if all(r[4] for r in report) else 1
+        run_migrations(conn, dry_run=args.dry_run)
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
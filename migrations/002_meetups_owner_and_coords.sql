@@ -0,0 +1,7 @@
+-- Migration: columns app.py writes to meetups but that were never in schema.sql
+ALTER TABLE meetups ADD COLUMN user_id INT NULL AFTER id;
+ALTER TABLE meetups ADD COLUMN lat DOUBLE NULL;
+ALTER TABLE meetups ADD COLUMN lng DOUBLE NULL;
+ALTER TABLE meetups MODIFY COLUMN status ENUM('scheduled', 'canceled', 'rescheduled') DEFAULT 'scheduled';
+UPDATE meetups SET user_id = created_by WHERE user_id IS NULL AND created_by IS NOT NULL;
+ALTER TABLE meetups ADD CONSTRAINT fk_meetups_user FOREIGN KEY (user_id) REFERENCES users(id);
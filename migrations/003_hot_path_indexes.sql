@@ -0,0 +1,18 @@
+-- Migration: indexes for /my_meetups, /invitations, /leaderboard/<group_id>, /my_scores
+
+-- one invitation per (meetup, user); drop duplicates left by double-submits first
+DELETE i1 FROM invitations i1
+JOIN invitations i2 ON i1.meetup_id = i2.meetup_id AND i1.user_id = i2.user_id AND i1.id > i2.id;
+ALTER TABLE invitations ADD UNIQUE KEY uniq_invitation_meetup_user (meetup_id, user_id);
+
+-- pending/accepted invites of a user (covers the meetup join)
+CREATE INDEX idx_invitations_user_status ON invitations (user_id, status, meetup_id);
+
+-- meetups owned by a user, newest first (keyset on scheduled_time, id)
+CREATE INDEX idx_meetups_user_time ON meetups (user_id, scheduled_time);
+
+-- /my_scores and the dashboard average: logs of a user, with the score in the index
+CREATE INDEX idx_punctuality_user_meetup ON punctuality_logs (user_id, meetup_id, score, status);
+
+-- leaderboard: logs of each meetup in a group
+CREATE INDEX idx_punctuality_meetup_user ON punctuality_logs (meetup_id, user_id, score);
@@ -0,0 +1,32 @@
+-- Migration: materialized score totals, maintained incrementally by scores.py
+
+CREATE TABLE IF NOT EXISTS user_scores (
+    user_id INT PRIMARY KEY,
+    total_score INT NOT NULL DEFAULT 0,
+    log_count INT NOT NULL DEFAULT 0,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS group_scores (
+    group_id INT NOT NULL,
+    user_id INT NOT NULL,
+    total_score INT NOT NULL DEFAULT 0,
+    log_count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (group_id, user_id),
+    KEY idx_group_scores_rank (group_id, total_score),
+    FOREIGN KEY (group_id) REFERENCES user_groups(id) ON DELETE CASCADE,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+-- backfill from the existing logs (same statements as `python scores.py --rebuild`)
+DELETE FROM user_scores;
+INSERT INTO user_scores (user_id, total_score, log_count)
+SELECT user_id, COALESCE(SUM(score), 0), COUNT(*) FROM punctuality_logs
+WHERE user_id IS NOT NULL GROUP BY user_id;
+
+DELETE FROM group_scores;
+INSERT INTO group_scores (group_id, user_id, total_score, log_count)
+SELECT m.group_id, p.user_id, COALESCE(SUM(p.score), 0), COUNT(*)
+FROM punctuality_logs p JOIN meetups m ON m.id = p.meetup_id
+WHERE m.group_id IS NOT NULL AND p.user_id IS NOT NULL
+GROUP BY m.group_id, p.user_id;
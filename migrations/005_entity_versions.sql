@@ -0,0 +1,8 @@
+-- Migration: version counters behind ETags and the fragment cache (versions.py)
+
+CREATE TABLE IF NOT EXISTS entity_versions (
+    entity VARCHAR(16) NOT NULL,
+    entity_id INT NOT NULL,
+    version BIGINT UNSIGNED NOT NULL DEFAULT 1,
+    PRIMARY KEY (entity, entity_id)
+);
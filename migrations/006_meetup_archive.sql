@@ -0,0 +1,8 @@
+-- Migration: archive tables for old canceled / past meetups (moved there by archive.py)
+
+CREATE TABLE IF NOT EXISTS meetups_archive LIKE meetups;
+CREATE TABLE IF NOT EXISTS invitations_archive LIKE invitations;
+CREATE TABLE IF NOT EXISTS punctuality_logs_archive LIKE punctuality_logs;
+
+-- the archive job walks meetups by scheduled_time
+ALTER TABLE meetups ADD KEY idx_meetups_time (scheduled_time);
@@ -0,0 +1,17 @@
+-- Migration: time-bucketed location history for the punctuality scorer (punctuality.py)
+
+-- one row per user per LOCATION_HISTORY_BUCKET_S window (the newest fix in it);
+-- rows older than LOCATION_HISTORY_DAYS are pruned by `python punctuality.py --prune`
+CREATE TABLE IF NOT EXISTS user_location_history (
+    user_id INT NOT NULL,
+    bucket DATETIME NOT NULL,
+    lat DOUBLE NOT NULL,
+    lng DOUBLE NOT NULL,
+    accuracy FLOAT NULL,
+    PRIMARY KEY (user_id, bucket),
+    KEY idx_location_history_bucket (bucket)
+);
+
+-- set once the scorer has written a meetup's logs; the archive copy keeps the same columns
+ALTER TABLE meetups ADD COLUMN scored_at DATETIME NULL;
+ALTER TABLE meetups_archive ADD COLUMN scored_at DATETIME NULL;
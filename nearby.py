@@ -0,0 +1,123 @@
+"""Nearby meetups / users lookups backed by in-process GridIndex instances.
+
+The indexes are loaded from user_locations and meetups on first use and kept
+in sync two ways: this process pushes its own changes in directly (location
+flushes, meetup create/cancel/delete), and every `refresh_interval` seconds
+rows changed by other workers are pulled in by watermark (last_seen for
+locations, id for meetups) with a periodic full meetup reload to pick up
+remote deletions.
+"""
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from db import fetchall_dict
+from geo import GridIndex
+from locations import get_buffer
+
+
+class NearbyService:
+
+    def __init__(self, refresh_interval=5.0, full_refresh=300.0, user_max_age=1800.0, cell_deg=0.01):
+        self.refresh_interval = refresh_interval
+        self.full_refresh = full_refresh
+        self.user_max_age = user_max_age
+        self.users = GridIndex(cell_deg)
+        self.meetups = GridIndex(cell_deg)
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._last_refresh = 0.0
+        self._last_full = 0.0
+        self._seen_watermark = None
+        self._meetup_watermark = 0
+
+    # --- pushes from this process ---
+    def user_moved(self, user_id, lat, lng, seen_at=None):
+        self.users.upsert(int(user_id), float(lat), float(lng), seen_at or datetime.now())
+
+    def meetup_changed(self, meetup_id, lat, lng):
+        try:
+            self.meetups.upsert(int(meetup_id), float(lat), float(lng))
+        except (TypeError, ValueError):
+            self.meetups.remove(int(meetup_id))
+
+    def meetup_removed(self, meetup_id):
+        self.meetups.remove(int(meetup_id))
+
+    # --- pulls from the database ---
+    def _sync(self):
+        now = time.monotonic()
+        if self._loaded and now - self._last_refresh < self.refresh_interval:
+            return
+        with self._lock:
+            if self._loaded and now - self._last_refresh < self.refresh_interval:
+                return
+            full = not self._loaded or now - self._last_full >= self.full_refresh
+            self._load_users(full)
+            self._load_meetups(full)
+            self._loaded = True
+            self._last_refresh = now
+            if full:
+                self._last_full = now
+
+    def _load_users(self, full):
+        if full or self._seen_watermark is None:
+            rows = fetchall_dict("SELECT user_id, lat, lng, last_seen FROM user_locations")
+        else:
+            rows = fetchall_dict("SELECT user_id, lat, lng, last_seen FROM user_locations WHERE last_seen >= %s",
+                                 (self._seen_watermark,))
+        for r in rows:
+            self.users.upsert(int(r['user_id']), float(r['lat']), float(r['lng']), r['last_seen'])
+            if self._seen_watermark is None or r['last_seen'] > self._seen_watermark:
+                self._seen_watermark = r['last_seen']
+
+    def _load_meetups(self, full):
+        where = "lat IS NOT NULL AND lng IS NOT NULL AND status != 'canceled'"
+        if full:
+            rows = fetchall_dict(f"SELECT id, lat, lng FROM meetups WHERE {where}")
+            live = {int(r['id']) for r in rows}
+            for key in self.meetups.keys():
+                if key not in live:
+                    self.meetups.remove(key)
+        else:
+            rows = fetchall_dict(f"SELECT id, lat, lng FROM meetups WHERE id > %s AND {where}",
+                                 (self._meetup_watermark,))
+        for r in rows:
+            self.meetups.upsert(int(r['id']), float(r['lat']), float(r['lng']))
+            self._meetup_watermark = max(self._meetup_watermark, int(r['id']))
+
+    # --- queries ---
+    def nearby_meetups(self, lat, lng, radius_km, limit=50):
+        self._sync()
+        return [(key, dist) for key, dist, _ in self.meetups.within(lat, lng, radius_km, limit)]
+
+    def nearby_users(self, lat, lng, radius_km, limit=50, exclude=None):
+        self._sync()
+        cutoff = datetime.now() - timedelta(seconds=self.user_max_age)
+        hits = []
+        for key, dist, seen_at in self.users.within(lat, lng, radius_km):
+            if key == exclude or (seen_at is not None and seen_at < cutoff):
+                continue
+            hits.append((key, dist))
+            if len(hits) >= limit:
+                break
+        return hits
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_nearby():
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = NearbyService(
+                    refresh_interval=float(os.environ.get("NEARBY_REFRESH_S", 5)),
+                    full_refresh=float(os.environ.get("NEARBY_FULL_REFRESH_S", 300)),
+                    user_max_age=float(os.environ.get("NEARBY_USER_MAX_AGE_S", 1800)),
+                )
+                get_buffer().add_listener(_service.user_moved)
+    return _service
@@ -0,0 +1,53 @@
+import base64
+import json
+from datetime import datetime
+
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+# Keyset cursors over (scheduled_time DESC, id DESC).
+# The token is an opaque url-safe string holding the last row's sort key.
+def encode_cursor(scheduled_time, row_id):
+    ts = scheduled_time.isoformat(sep=' ') if isinstance(scheduled_time, datetime) else scheduled_time
+    raw = json.dumps([ts, row_id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        ts, row_id = json.loads(raw)
+        return ts, int(row_id)
+    except (ValueError, TypeError):
+        return None
+
+
+def keyset_clause(cursor, ts_col, id_col):
+    """SQL condition selecting rows strictly after `cursor` in
+    `ts_col DESC, id_col DESC` order (NULL times sort last)."""
+    if cursor is None:
+        return "1=1", ()
+    ts, row_id = cursor
+    if ts is None:
+        return f"({ts_col} IS NULL AND {id_col} < %s)", (row_id,)
+    return (f"({ts_col} < %s OR ({ts_col} = %s AND {id_col} < %s) OR {ts_col} IS NULL)",
+            (ts, ts, row_id))
+
+
+def page_size(value, default=PAGE_SIZE):
+    try:
+        return max(1, min(int(value), MAX_PAGE_SIZE))
+    except (TypeError, ValueError):
+        return default
+
+
+def split_page(rows, limit, ts_key='scheduled_time', id_key='id'):
+    """Trim the extra look-ahead row and return (rows, next_cursor)."""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(last[ts_key], last[id_key])
@@ -0,0 +1,184 @@
+"""Password hashing off the request threads.
+
+bcrypt is deliberately slow, and login bursts used to hash inline on every
+WSGI thread at once. `Hasher` runs hashes on a small thread pool (bcrypt
+releases the GIL, so threads use every core) and bounds the backlog: once
+`workers + queue` hashes are in flight, new ones fail fast with `Busy`
+(served as a 503) instead of piling up behind the cheap routes.
+
+Hashes whose cost differs from BCRYPT_LOG_ROUNDS are rehashed after a
+successful login. Pick the cost for the hardware with:
+
+    python passwords.py --calibrate --target-ms 250
+"""
+import argparse
+import atexit
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+import bcrypt
+
+
+_COST = re.compile(r"^\$2[abxy]?\$(\d\d)\$")
+
+
+class Busy(Exception):
+    """Too many hashes queued; retry later."""
+
+
+def hash_sync(password, rounds):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def check_sync(hashed, password):
+    try:
+        return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+    except ValueError:   # not a bcrypt hash
+        return False
+
+
+def cost_of(hashed):
+    match = _COST.match(hashed or '')
+    return int(match.group(1)) if match else None
+
+
+class Hasher:
+
+    def __init__(self, rounds=12, workers=None, queue=32, wait=10.0):
+        self.rounds = rounds
+        self.workers = workers or os.cpu_count() or 2
+        self.wait = wait
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        self._slots = threading.BoundedSemaphore(self.workers + queue)
+        self._lock = threading.Lock()
+        self._stats = {
+            'hashed': 0,
+            'checked': 0,
+            'rehashed': 0,
+            'busy': 0,         # rejected, backlog full
+            'timeouts': 0,     # caller gave up waiting
+            'hash_time': 0.0,
+        }
+        self._inflight = 0
+
+    def _count(self, key, value=1):
+        with self._lock:
+            self._stats[key] += value
+
+    def _submit(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            self._count('busy')
+            raise Busy("password hashing backlog is full")
+        with self._lock:
+            self._inflight += 1
+
+        def run():
+            start = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self._inflight -= 1
+                    self._stats['hash_time'] += time.perf_counter() - start
+                self._slots.release()
+        return self._pool.submit(run)
+
+    def _result(self, future):
+        try:
+            return future.result(timeout=self.wait)
+        except FutureTimeout:
+            self._count('timeouts')
+            raise Busy("password hashing timed out") from None
+
+    def hash(self, password):
+        self._count('hashed')
+        return self._result(self._submit(hash_sync, password, self.rounds))
+
+    def check(self, hashed, password):
+        self._count('checked')
+        return self._result(self._submit(check_sync, hashed, password))
+
+    def needs_rehash(self, hashed):
+        return cost_of(hashed) != self.rounds
+
+    def rehash(self, hashed, password):
+        """A new hash of `password` if `hashed` used another cost, else None.
+
+        Also None while the pool is busy; the next login tries again.
+        """
+        if not self.needs_rehash(hashed):
+            return None
+        try:
+            new_hash = self.hash(password)
+        except Busy:
+            return None
+        self._count('rehashed')
+        return new_hash
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['inflight'] = self._inflight
+        return stats
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+
+
+_hasher = None
+_hasher_lock = threading.Lock()
+
+
+def get_hasher():
+    global _hasher
+    if _hasher is None:
+        with _hasher_lock:
+            if _hasher is None:
+                _hasher = Hasher(
+                    rounds=int(os.environ.get("BCRYPT_LOG_ROUNDS", 12)),
+                    workers=int(os.environ.get("BCRYPT_WORKERS", 0)) or None,
+                    queue=int(os.environ.get("BCRYPT_QUEUE", 32)),
+                    wait=float(os.environ.get("BCRYPT_WAIT_S", 10)),
+                )
+                atexit.register(_hasher.close)
+    return _hasher
+
+
+def calibrate(target_ms=250, low=8, high=16, samples=3):
+    """[(rounds, ms)] timings and the highest cost whose hash fits in `target_ms`."""
+    timings = []
+    best = low
+    for rounds in range(low, high + 1):
+        start = time.perf_counter()
+        for _ in range(samples):
+            hash_sync("calibration-password", rounds)
+        ms = (time.perf_counter() - start) / samples * 1000
+        timings.append((rounds, ms))
+        if ms > target_ms:
+            break
+        best = rounds
+    return timings, best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calibrate', action='store_true', help="time bcrypt costs on this machine")
+    parser.add_argument('--target-ms', type=float, default=250, help="hash time to aim for")
+    args = parser.parse_args(argv)
+    if not args.calibrate:
+        parser.error("nothing to do: pass --calibrate")
+
+    timings, best = calibrate(args.target_ms)
+    for rounds, ms in timings:
+        print(f"  cost {rounds:>2}: {ms:8.1f} ms")
+    print(f"BCRYPT_LOG_ROUNDS={best}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,187 @@
+"""Score punctuality automatically from the location history.
+
+    python punctuality.py --dry-run       # print what would be logged
+    python punctuality.py                 # score every meetup whose late window has closed
+    python punctuality.py --every 300     # keep running, one pass every 5 minutes
+    python punctuality.py --prune         # also drop history older than LOCATION_HISTORY_DAYS
+
+A meetup is scored once `--late-min` minutes have passed since its
+scheduled_time. For a chunk of meetups, every accepted invitee's history
+fixes from `--before-min` before to `--late-min` after are pulled in one
+query and classified in one vectorized pass. The first fix within
+`--radius-m` of the meetup (widened by the fix's accuracy, up to 100 m) is
+the arrival. Arriving by `--grace-min` is on_time, by `--late-min` is late,
+and never arriving is absent. Invitees with no fixes at all are left for
+/submit_punctuality unless `--no-data absent` is given. Anyone logged by hand
+already is skipped. Each chunk's logs go in with one bulk insert and one
+transaction, which also sets meetups.scored_at.
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from dotenv import load_dotenv
+
+import scores
+from db import get_db_connection, execute, executemany, fetchall_dict, transaction
+from geo import haversine_km_np
+
+MAX_ACCURACY_M = 100.0
+
+CANDIDATES = """
+    SELECT id, lat, lng, scheduled_time FROM meetups
+    WHERE scheduled_time BETWEEN %s AND %s AND status != 'canceled' AND scored_at IS NULL
+      AND lat IS NOT NULL AND lng IS NOT NULL
+      AND (scheduled_time, id) > (%s, %s)
+    ORDER BY scheduled_time, id
+    LIMIT %s
+"""
+
+# accepted invitees nobody has logged yet
+PARTICIPANTS = """
+    SELECT i.meetup_id, i.user_id FROM invitations i
+    WHERE i.meetup_id IN ({marks}) AND i.status = 'accepted'
+      AND NOT EXISTS (SELECT 1 FROM punctuality_logs p
+                      WHERE p.meetup_id = i.meetup_id AND p.user_id = i.user_id)
+"""
+
+FIXES = """
+    SELECT i.meetup_id, h.user_id, h.bucket, h.lat, h.lng, h.accuracy
+    FROM invitations i
+    JOIN meetups m ON m.id = i.meetup_id
+    JOIN user_location_history h ON h.user_id = i.user_id
+     AND h.bucket BETWEEN m.scheduled_time - INTERVAL %s SECOND AND m.scheduled_time + INTERVAL %s SECOND
+    WHERE i.meetup_id IN ({marks}) AND i.status = 'accepted'
+"""
+
+INSERT_LOG = "INSERT INTO punctuality_logs (user_id, meetup_id, status, score) VALUES (%s, %s, %s, %s)"
+
+
+def classify(meetups, pairs, fixes, grace_s=300, late_s=1800, radius_m=150.0, no_data='skip'):
+    """[(user_id, meetup_id, status)] for `pairs` of (meetup_id, user_id).
+
+    `meetups` maps id -> (lat, lng, scheduled_time); `fixes` are FIXES rows.
+    """
+    if not pairs:
+        return []
+    index = {pair: i for i, pair in enumerate(pairs)}
+    fixes = [f for f in fixes if (f['meetup_id'], f['user_id']) in index]
+    arrival = np.full(len(pairs), np.inf)
+    seen = np.zeros(len(pairs), dtype=bool)
+    if fixes:
+        which = np.array([index[(f['meetup_id'], f['user_id'])] for f in fixes], dtype=np.intp)
+        dest = np.array([meetups[f['meetup_id']][:2] for f in fixes], dtype=float)
+        offset = np.array([(f['bucket'] - meetups[f['meetup_id']][2]).total_seconds() for f in fixes])
+        accuracy = np.array([f['accuracy'] or 0.0 for f in fixes], dtype=float)
+        distance = haversine_km_np([f['lat'] for f in fixes], [f['lng'] for f in fixes],
+                                   dest[:, 0], dest[:, 1]) * 1000.0
+        there = distance <= radius_m + np.minimum(accuracy, MAX_ACCURACY_M)
+        np.minimum.at(arrival, which[there], offset[there])
+        seen[which] = True
+    status = np.where(arrival <= grace_s, 'on_time', np.where(arrival <= late_s, 'late', 'absent'))
+    return [(user_id, meetup_id, str(status[i]))
+            for i, (meetup_id, user_id) in enumerate(pairs)
+            if seen[i] or no_data == 'absent']
+
+
+def write(meetup_ids, results):
+    """Log `results` and mark the meetups scored; meetups another run got to first are skipped."""
+    marks = ", ".join(["%s"] * len(meetup_ids))
+    with transaction():
+        claimed = {r['id'] for r in fetchall_dict(
+            f"SELECT id FROM meetups WHERE id IN ({marks}) AND scored_at IS NULL FOR UPDATE", tuple(meetup_ids))}
+        rows = [(u, m, s, scores.SCORE_MAP[s]) for u, m, s in results if m in claimed]
+        if rows:
+            executemany(INSERT_LOG, rows)
+        deltas = {}
+        for user_id, meetup_id, _, score in rows:
+            deltas.setdefault(meetup_id, []).append((user_id, score, 1))
+        for meetup_id, meetup_deltas in deltas.items():
+            scores.apply_deltas(meetup_id, meetup_deltas)
+        if claimed:
+            execute(f"UPDATE meetups SET scored_at = NOW() WHERE id IN ({', '.join(['%s'] * len(claimed))})",
+                    tuple(claimed))
+    return len(rows)
+
+
+def run(grace_min=5, late_min=30, before_min=60, radius_m=150.0, lookback_h=48, chunk=100,
+        no_data='skip', dry_run=False):
+    """One pass over the meetups due for scoring; returns (meetups, logs)."""
+    now = datetime.now()
+    grace_s, late_s, before_s = grace_min * 60, late_min * 60, before_min * 60
+    last = (datetime(1000, 1, 1), 0)
+    meetup_count = log_count = 0
+    while True:
+        rows = fetchall_dict(CANDIDATES, (now - timedelta(hours=lookback_h), now - timedelta(seconds=late_s))
+                             + last + (chunk,))
+        if not rows:
+            break
+        last = (rows[-1]['scheduled_time'], rows[-1]['id'])
+        ids = tuple(r['id'] for r in rows)
+        marks = ", ".join(["%s"] * len(ids))
+        meetups = {r['id']: (r['lat'], r['lng'], r['scheduled_time']) for r in rows}
+        pairs = [(r['meetup_id'], r['user_id']) for r in fetchall_dict(PARTICIPANTS.format(marks=marks), ids)]
+        fixes = fetchall_dict(FIXES.format(marks=marks), (before_s, late_s) + ids)
+        results = classify(meetups, pairs, fixes, grace_s, late_s, radius_m, no_data)
+        if dry_run:
+            for user_id, meetup_id, status in results:
+                print(f"meetup {meetup_id} user {user_id}: {status}")
+            log_count += len(results)
+        else:
+            log_count += write(ids, results)
+        meetup_count += len(rows)
+    return meetup_count, log_count
+
+
+def prune_history(days, chunk=5000):
+    """Delete history buckets older than `days`, `chunk` rows per statement."""
+    before = datetime.now() - timedelta(days=days)
+    conn = get_db_connection()
+    deleted = 0
+    try:
+        cur = conn.cursor()
+        while True:
+            cur.execute("DELETE FROM user_location_history WHERE bucket < %s LIMIT %s", (before, chunk))
+            conn.commit()
+            deleted += cur.rowcount
+            if cur.rowcount < chunk:
+                break
+        cur.close()
+    finally:
+        conn.close()
+    return deleted
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--grace-min', type=int, default=5, help="arrivals up to this late are on time")
+    parser.add_argument('--late-min', type=int, default=30, help="arrivals up to this late are late; later is absent")
+    parser.add_argument('--before-min', type=int, default=60, help="history to read before the start")
+    parser.add_argument('--radius-m', type=float, default=150.0, help="distance that counts as arrived")
+    parser.add_argument('--lookback-hours', type=int, default=48, help="ignore meetups older than this")
+    parser.add_argument('--chunk', type=int, default=100, help="meetups per query / transaction")
+    parser.add_argument('--no-data', choices=('skip', 'absent'), default='skip',
+                        help="what to log for invitees without any history")
+    parser.add_argument('--dry-run', action='store_true', help="classify and print, write nothing")
+    parser.add_argument('--prune', action='store_true', help="drop history older than LOCATION_HISTORY_DAYS")
+    parser.add_argument('--every', type=float, help="repeat every this many seconds")
+    args = parser.parse_args(argv)
+    load_dotenv()
+
+    while True:
+        meetups, logs = run(args.grace_min, args.late_min, args.before_min, args.radius_m,
+                            args.lookback_hours, args.chunk, args.no_data, args.dry_run)
+        print(f"{meetups} meetups scored, {logs} logs {'classified' if args.dry_run else 'written'}")
+        if args.prune and not args.dry_run:
+            days = int(os.environ.get("LOCATION_HISTORY_DAYS", 7))
+            print(f"pruned {prune_history(days)} history rows older than {days} days")
+        if not args.every:
+            return 0
+        time.sleep(args.every)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,172 @@
+"""Materialized punctuality totals (user_scores, group_scores).
+
+The aggregates are kept in step with punctuality_logs by the write paths in
+app.py; run this module to recompute them from scratch or to check them:
+
+    python scores.py --verify    # report drift, exit 1 if any
+    python scores.py --rebuild   # recompute both tables from the logs
+"""
+import argparse
+import sys
+
+from dotenv import load_dotenv
+
+import versions
+from db import get_db_connection, fetchall_dict, fetchone_dict, execute, executemany, transaction
+
+SCORE_MAP = {'on_time': 3, 'late': -1, 'absent': -3}
+
+# archived meetups keep counting toward scores (see archive.py)
+ALL_LOGS = """(SELECT user_id, meetup_id, score FROM punctuality_logs
+              UNION ALL SELECT user_id, meetup_id, score FROM punctuality_logs_archive)"""
+ALL_MEETUPS = "(SELECT id, group_id FROM meetups UNION ALL SELECT id, group_id FROM meetups_archive)"
+
+REBUILD_STATEMENTS = [
+    "DELETE FROM user_scores",
+    f"""INSERT INTO user_scores (user_id, total_score, log_count)
+       SELECT user_id, COALESCE(SUM(score), 0), COUNT(*) FROM {ALL_LOGS} p
+       WHERE user_id IS NOT NULL GROUP BY user_id""",
+    "DELETE FROM group_scores",
+    f"""INSERT INTO group_scores (group_id, user_id, total_score, log_count)
+       SELECT m.group_id, p.user_id, COALESCE(SUM(p.score), 0), COUNT(*)
+       FROM {ALL_LOGS} p JOIN {ALL_MEETUPS} m ON m.id = p.meetup_id
+       WHERE m.group_id IS NOT NULL AND p.user_id IS NOT NULL
+       GROUP BY m.group_id, p.user_id""",
+    # cached leaderboards (versions.py) must not survive a rebuild
+    """INSERT INTO entity_versions (entity, entity_id, version)
+       SELECT 'group', id, 1 FROM user_groups
+       ON DUPLICATE KEY UPDATE version = version + 1""",
+]
+
+USER_DELTA = """
+    INSERT INTO user_scores (user_id, total_score, log_count) VALUES (%s, %s, %s)
+    ON DUPLICATE KEY UPDATE total_score = total_score + VALUES(total_score),
+                            log_count = log_count + VALUES(log_count)
+"""
+GROUP_DELTA = """
+    INSERT INTO group_scores (group_id, user_id, total_score, log_count) VALUES (%s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE total_score = total_score + VALUES(total_score),
+                            log_count = log_count + VALUES(log_count)
+"""
+
+MEETUP_TOTALS = """
+    SELECT user_id, COALESCE(SUM(score), 0) AS total, COUNT(*) AS n
+    FROM punctuality_logs WHERE meetup_id = %s AND user_id IS NOT NULL
+    GROUP BY user_id
+"""
+
+LEADERBOARD = """
+    SELECT u.username, gs.total_score
+    FROM group_scores gs
+    JOIN users u ON u.id = gs.user_id
+    WHERE gs.group_id = %s AND gs.log_count > 0
+    ORDER BY gs.total_score {order}
+"""
+
+USER_TOTAL = "SELECT total_score, log_count FROM user_scores WHERE user_id = %s"
+
+
+def record_punctuality(user_id, meetup_id, status):
+    score = SCORE_MAP.get(status, 0)
+    with transaction():
+        execute("INSERT INTO punctuality_logs (user_id, meetup_id, status, score) VALUES (%s,%s,%s,%s)",
+                (user_id, meetup_id, status, score))
+        apply_deltas(meetup_id, [(user_id, score, 1)])
+    return score
+
+
+def apply_deltas(meetup_id, deltas):
+    """Add [(user_id, score, count)] for one meetup to both aggregates."""
+    executemany(USER_DELTA, deltas)
+    meetup = fetchone_dict("SELECT group_id FROM meetups WHERE id = %s", (meetup_id,))
+    if meetup and meetup['group_id'] is not None:
+        executemany(GROUP_DELTA, [(meetup['group_id'], u, s, n) for u, s, n in deltas])
+        versions.bump(('group', meetup['group_id']))
+
+
+def remove_meetup_scores(meetup_id):
+    # call before the meetup's logs are deleted
+    rows = fetchall_dict(MEETUP_TOTALS, (meetup_id,))
+    apply_deltas(meetup_id, [(r['user_id'], -int(r['total']), -int(r['n'])) for r in rows])
+
+
+def group_leaderboard(group_id, descending=True):
+    return fetchall_dict(LEADERBOARD.format(order='DESC' if descending else 'ASC'), (group_id,))
+
+
+def average_score(user_id):
+    row = fetchone_dict(USER_TOTAL, (user_id,))
+    if not row or not row['log_count']:
+        return 0
+    return row['total_score'] / row['log_count']
+
+
+def rebuild(conn):
+    cur = conn.cursor()
+    try:
+        for statement in REBUILD_STATEMENTS:
+            cur.execute(statement)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+def verify(conn):
+    """Return [(table, key, stored, expected)] for every aggregate row that drifted."""
+    cur = conn.cursor()
+    drift = []
+    checks = [
+        ('user_scores',
+         "SELECT user_id, total_score, log_count FROM user_scores WHERE log_count != 0 OR total_score != 0",
+         f"SELECT user_id, COALESCE(SUM(score), 0), COUNT(*) FROM {ALL_LOGS} p "
+         "WHERE user_id IS NOT NULL GROUP BY user_id"),
+        ('group_scores',
+         "SELECT group_id, user_id, total_score, log_count FROM group_scores WHERE log_count != 0 OR total_score != 0",
+         "SELECT m.group_id, p.user_id, COALESCE(SUM(p.score), 0), COUNT(*) "
+         f"FROM {ALL_LOGS} p JOIN {ALL_MEETUPS} m ON m.id = p.meetup_id "
+         "WHERE m.group_id IS NOT NULL AND p.user_id IS NOT NULL GROUP BY m.group_id, p.user_id"),
+    ]
+    try:
+        for table, stored_sql, expected_sql in checks:
+            cur.execute(stored_sql)
+            stored = {tuple(r[:-2]): (int(r[-2]), int(r[-1])) for r in cur.fetchall()}
+            cur.execute(expected_sql)
+            expected = {tuple(r[:-2]): (int(r[-2]), int(r[-1])) for r in cur.fetchall()}
+            for key in sorted(stored.keys() | expected.keys()):
+                if stored.get(key) != expected.get(key):
+                    drift.append((table, key, stored.get(key), expected.get(key)))
+    finally:
+        cur.close()
+    return drift
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rebuild', action='store_true', help="recompute aggregates from punctuality_logs (and its archive)")
+    parser.add_argument('--verify', action='store_true', help="compare aggregates with punctuality_logs")
+    args = parser.parse_args(argv)
+    if not (args.rebuild or args.verify):
+        parser.error("nothing to do: pass --rebuild and/or --verify")
+
+    load_dotenv()
+    conn = get_db_connection()
+    try:
+        if args.rebuild:
+            rebuild(conn)
+            print("aggregates rebuilt")
+        if args.verify:
+            drift = verify(conn)
+            for table, key, stored, expected in drift:
+                print(f"{table} {key}: stored (total, count)={stored} expected={expected}")
+            print(f"{len(drift)} drifted row(s)")
+            return 1 if drift else 0
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
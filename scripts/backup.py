@@ -0,0 +1,349 @@
+"""Parallel, compressed, incremental backups of the HomiMeet database.
+
+    python scripts/backup.py dump                                # full dump into backups/<timestamp>/
+    python scripts/backup.py dump --incremental-from backups/20250811_0351
+    python scripts/backup.py restore backups/20250812_0300 --jobs 8
+
+A dump is a directory holding a manifest.json, one `SHOW CREATE TABLE` file
+per table and one gzip'd CSV per table (NULL is written as \\N). Tables are
+dumped in parallel, one connection per job. All jobs read the same
+`START TRANSACTION WITH CONSISTENT SNAPSHOT`, opened under a brief
+`FLUSH TABLES WITH READ LOCK`. Without the RELOAD privilege the dump falls
+back to a single connection, which is still consistent.
+
+Append-only tables (--append-only, default: punctuality_logs) are dumped
+incrementally against a base dump: only rows above the base's id watermark,
+plus the list of ids still present, so rows deleted since the base are
+dropped again on restore. Everything else is dumped in full every time.
+
+Restore recreates each table without its secondary indexes and foreign
+keys, bulk-loads the base and every incremental in the chain in parallel
+with checks off, then builds the indexes with one ALTER per table and the
+foreign keys last.
+"""
+import argparse
+import csv
+import gzip
+import json
+import queue
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import mysql.connector  # noqa: E402
+from dotenv import load_dotenv  # noqa: E402
+
+from db import get_db_connection  # noqa: E402
+
+BACKUP_DIR = Path(__file__).resolve().parent.parent / "backups"
+APPEND_ONLY = ['punctuality_logs']
+NULL = "\\N"
+FETCH_ROWS = 5000
+
+csv.field_size_limit(sys.maxsize)
+
+
+# --- dump ---
+
+def open_snapshot(jobs):
+    """`jobs` connections reading one consistent snapshot, plus the binlog position if known."""
+    conns = [get_db_connection() for _ in range(jobs)]
+    coordinator = get_db_connection()
+    cur = coordinator.cursor()
+    position = None
+    try:
+        cur.execute("FLUSH TABLES WITH READ LOCK")
+        locked = True
+    except mysql.connector.Error as e:
+        print(f"no global read lock ({e.msg}); dumping over one connection to keep one snapshot")
+        for conn in conns[1:]:
+            conn.close()
+        conns, locked = conns[:1], False
+    try:
+        for conn in conns:
+            c = conn.cursor()
+            c.execute("SET SESSION TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+            c.execute("START TRANSACTION WITH CONSISTENT SNAPSHOT, READ ONLY")
+            c.close()
+        if locked:
+            for statement in ("SHOW BINARY LOG STATUS", "SHOW MASTER STATUS"):   # 8.4+, older
+                try:
+                    cur.execute(statement)
+                    row = cur.fetchone()
+                    position = {'file': row[0], 'position': row[1]} if row else None
+                    break
+                except mysql.connector.Error:
+                    continue
+    finally:
+        if locked:
+            cur.execute("UNLOCK TABLES")
+        cur.close()
+        coordinator.close()
+    return conns, position
+
+
+def list_tables(conn):
+    cur = conn.cursor()
+    cur.execute("SHOW FULL TABLES WHERE Table_type = 'BASE TABLE'")
+    tables = [row[0] for row in cur.fetchall()]
+    sizes = {}
+    cur.execute("SELECT table_name, data_length FROM information_schema.tables WHERE table_schema = DATABASE()")
+    for name, size in cur.fetchall():
+        sizes[name] = size or 0
+    cur.close()
+    # biggest first so the long tables start early
+    return sorted(tables, key=lambda t: -sizes.get(t, 0))
+
+
+def _text(value):
+    if value is None:
+        return NULL
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value).decode('utf-8', 'surrogateescape')
+    return str(value)
+
+
+def dump_table(conn, table, out_dir, base=None, append_only=(), level=6):
+    start = time.perf_counter()
+    cur = conn.cursor()
+    cur.execute(f"SHOW CREATE TABLE `{table}`")
+    (out_dir / f"{table}.schema.sql").write_text(cur.fetchone()[1] + ";\n")
+
+    where, params, entry = "", (), {'mode': 'full'}
+    if table in append_only:
+        cur.execute(f"SELECT COALESCE(MAX(id), 0) FROM `{table}`")
+        entry['watermark'] = int(cur.fetchone()[0])
+        since = (base or {}).get(table, {}).get('watermark')
+        if since is not None:
+            where, params = "WHERE id > %s", (since,)
+            entry.update(mode='incremental', since=since)
+            with gzip.open(out_dir / f"{table}.ids.gz", 'wt', compresslevel=level) as f:
+                cur.execute(f"SELECT id FROM `{table}` ORDER BY id")
+                for batch in iter(lambda: cur.fetchmany(FETCH_ROWS), []):
+                    f.write("".join(f"{r[0]}\n" for r in batch))
+    cur.close()
+
+    cur = conn.cursor(buffered=False)
+    cur.execute(f"SELECT * FROM `{table}` {where} ORDER BY 1", params)
+    columns = list(cur.column_names)
+    rows = 0
+    path = out_dir / f"{table}.csv.gz"
+    with gzip.open(path, 'wt', compresslevel=level, newline='') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(columns)
+        for batch in iter(lambda: cur.fetchmany(FETCH_ROWS), []):
+            writer.writerows([_text(v) for v in row] for row in batch)
+            rows += len(batch)
+    cur.close()
+    entry.update(columns=columns, rows=rows, bytes=path.stat().st_size,
+                 seconds=round(time.perf_counter() - start, 3))
+    return entry
+
+
+def dump(out_root, jobs=4, base_dir=None, append_only=APPEND_ONLY, tables=None, level=6):
+    base_manifest = json.loads((Path(base_dir) / "manifest.json").read_text()) if base_dir else None
+    out_dir = Path(out_root) / datetime.now().strftime("%Y%m%d_%H%M%S")
+    out_dir.mkdir(parents=True)
+    start = time.perf_counter()
+    conns, position = open_snapshot(jobs)
+    try:
+        names = tables or list_tables(conns[0])
+        free = queue.Queue()
+        for conn in conns:
+            free.put(conn)
+
+        def work(table):
+            conn = free.get()
+            try:
+                entry = dump_table(conn, table, out_dir, base_manifest and base_manifest['tables'],
+                                   append_only, level)
+            finally:
+                free.put(conn)
+            print(f"  {table:<28} {entry['rows']:>10} rows {entry['bytes'] / 1e6:>9.2f} MB "
+                  f"{entry['seconds']:>7.2f} s  {entry['mode']}")
+            return table, entry
+
+        with ThreadPoolExecutor(max_workers=len(conns)) as pool:
+            results = dict(pool.map(work, names))
+    finally:
+        for conn in conns:
+            conn.close()
+
+    elapsed = time.perf_counter() - start
+    manifest = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'base': str(Path(base_dir).resolve()) if base_dir else None,
+        'binlog': position,
+        'jobs': len(conns),
+        'tables': results,
+    }
+    (out_dir / "manifest.json").write_text(json.dumps(manifest, indent=2))
+    rows = sum(e['rows'] for e in results.values())
+    size = sum(e['bytes'] for e in results.values())
+    print(f"dumped {rows} rows, {size / 1e6:.2f} MB compressed in {elapsed:.1f} s "
+          f"({rows / elapsed:,.0f} rows/s) -> {out_dir}")
+    return out_dir
+
+
+# --- restore ---
+
+_INDEX_LINE = re.compile(r"^\s*(UNIQUE KEY|KEY|FULLTEXT KEY|SPATIAL KEY)\b")
+_FK_LINE = re.compile(r"^\s*CONSTRAINT\b.*\bFOREIGN KEY\b")
+
+
+def split_schema(create_sql):
+    """CREATE TABLE without secondary indexes / FKs, plus the deferred ADD clauses."""
+    lines = create_sql.strip().rstrip(';').splitlines()
+    head, body, tail = lines[0], lines[1:-1], lines[-1]
+    keep, indexes, fks = [], [], []
+    for line in body:
+        clause = line.strip().rstrip(',')
+        if _INDEX_LINE.match(clause):
+            indexes.append("ADD " + clause)
+        elif _FK_LINE.match(clause):
+            fks.append("ADD " + clause)
+        else:
+            keep.append("  " + clause)
+    return "\n".join([head, ",\n".join(keep), tail]), indexes, fks
+
+
+def manifest_chain(backup_dir):
+    """[oldest base, ..., backup_dir] as (dir, manifest) pairs."""
+    chain = []
+    path = Path(backup_dir)
+    while path is not None:
+        manifest = json.loads((path / "manifest.json").read_text())
+        chain.append((path, manifest))
+        path = Path(manifest['base']) if manifest.get('base') else None
+    return chain[::-1]
+
+
+def _load_rows(conn, table, path, batch_size):
+    cur = conn.cursor()
+    rows = 0
+    with gzip.open(path, 'rt', newline='') as f:
+        reader = csv.reader(f)
+        columns = next(reader)
+        sql = (f"INSERT INTO `{table}` ({', '.join(f'`{c}`' for c in columns)}) "
+               f"VALUES ({', '.join(['%s'] * len(columns))})")
+        batch = []
+        for record in reader:
+            batch.append([None if v == NULL else v for v in record])
+            if len(batch) >= batch_size:
+                cur.executemany(sql, batch)   # sent as one multi-row INSERT
+                conn.commit()
+                rows += len(batch)
+                batch = []
+        if batch:
+            cur.executemany(sql, batch)
+            conn.commit()
+            rows += len(batch)
+    cur.close()
+    return rows
+
+
+def _drop_deleted(conn, table, ids_path):
+    cur = conn.cursor()
+    cur.execute(f"CREATE TEMPORARY TABLE `_keep_{table}` (id BIGINT PRIMARY KEY)")
+    with gzip.open(ids_path, 'rt') as f:
+        ids = [(int(line),) for line in f if line.strip()]
+    for i in range(0, len(ids), 10000):
+        cur.executemany(f"INSERT INTO `_keep_{table}` (id) VALUES (%s)", ids[i:i + 10000])
+    cur.execute(f"DELETE t FROM `{table}` t LEFT JOIN `_keep_{table}` k ON k.id = t.id WHERE k.id IS NULL")
+    deleted = cur.rowcount
+    cur.execute(f"DROP TEMPORARY TABLE `_keep_{table}`")
+    conn.commit()
+    cur.close()
+    return deleted
+
+
+def restore_table(table, chain, batch_size):
+    start = time.perf_counter()
+    final_dir, _ = chain[-1]
+    create_sql, indexes, fks = split_schema((final_dir / f"{table}.schema.sql").read_text())
+    conn = get_db_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute("SET SESSION foreign_key_checks = 0")
+        cur.execute("SET SESSION unique_checks = 0")
+        cur.execute(f"DROP TABLE IF EXISTS `{table}`")
+        cur.execute(create_sql)
+        rows, size = 0, 0
+        # the newest full copy, then each incremental taken on top of it
+        dumps = [(path, m['tables'][table]) for path, m in chain if table in m['tables']]
+        first = max(i for i, (_, entry) in enumerate(dumps) if entry['mode'] == 'full')
+        for path, entry in dumps[first:]:
+            rows += _load_rows(conn, table, path / f"{table}.csv.gz", batch_size)
+            size += entry['bytes']
+        if (final_dir / f"{table}.ids.gz").exists():
+            _drop_deleted(conn, table, final_dir / f"{table}.ids.gz")
+        if indexes:
+            cur.execute(f"ALTER TABLE `{table}` {', '.join(indexes)}")
+        cur.close()
+        conn.commit()
+    finally:
+        conn.close()
+    return table, {'rows': rows, 'bytes': size, 'seconds': round(time.perf_counter() - start, 3), 'fks': fks}
+
+
+def restore(backup_dir, jobs=4, batch_size=2000):
+    chain = manifest_chain(backup_dir)
+    tables = list(chain[-1][1]['tables'])
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        results = {}
+        for table, entry in pool.map(lambda t: restore_table(t, chain, batch_size), tables):
+            results[table] = entry
+            print(f"  {table:<28} {entry['rows']:>10} rows {entry['seconds']:>7.2f} s")
+
+    # foreign keys last, once every referenced table is back
+    conn = get_db_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute("SET SESSION foreign_key_checks = 0")
+        for table, entry in results.items():
+            if entry['fks']:
+                cur.execute(f"ALTER TABLE `{table}` {', '.join(entry['fks'])}")
+        cur.close()
+    finally:
+        conn.close()
+
+    elapsed = time.perf_counter() - start
+    rows = sum(e['rows'] for e in results.values())
+    size = sum(e['bytes'] for e in results.values())
+    print(f"restored {rows} rows ({size / 1e6:.2f} MB compressed) in {elapsed:.1f} s "
+          f"({rows / elapsed:,.0f} rows/s, {size / 1e6 / elapsed:.2f} MB/s) from {len(chain)} dump(s)")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+    d = sub.add_parser('dump', help="write a new backup directory")
+    d.add_argument('--out', default=str(BACKUP_DIR))
+    d.add_argument('--jobs', type=int, default=4, help="tables dumped in parallel")
+    d.add_argument('--incremental-from', help="base backup directory for append-only tables")
+    d.add_argument('--append-only', nargs='*', default=APPEND_ONLY, help="tables dumped by id watermark")
+    d.add_argument('--tables', nargs='*', help="only these tables")
+    d.add_argument('--level', type=int, default=6, help="gzip level (1 fastest, 9 smallest)")
+    r = sub.add_parser('restore', help="load a backup directory (and its base chain)")
+    r.add_argument('backup_dir')
+    r.add_argument('--jobs', type=int, default=4, help="tables restored in parallel")
+    r.add_argument('--batch', type=int, default=2000, help="rows per INSERT")
+    args = parser.parse_args(argv)
+    load_dotenv()
+
+    if args.command == 'dump':
+        dump(args.out, args.jobs, args.incremental_from, args.append_only, args.tables, args.level)
+    else:
+        restore(args.backup_dir, args.jobs, args.batch)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -28,11 +28,18 @@ CREATE TABLE IF NOT EXISTS group_members (
 -- Meetups Table
 CREATE TABLE IF NOT EXISTS meetups (
     id INT AUTO_INCREMENT PRIMARY KEY,
+    user_id INT,
     group_id INT,
     location VARCHAR(255),
     scheduled_time DATETIME,
+    lat DOUBLE NULL,
+    lng DOUBLE NULL,
     status ENUM('scheduled', 'canceled', 'rescheduled') DEFAULT 'scheduled',
     created_by INT,
+    scored_at DATETIME NULL,
+    KEY idx_meetups_user_time (user_id, scheduled_time),
+    KEY idx_meetups_time (scheduled_time),
+    CONSTRAINT fk_meetups_user FOREIGN KEY (user_id) REFERENCES users(id),
     FOREIGN KEY (group_id) REFERENCES user_groups(id),
     FOREIGN KEY (created_by) REFERENCES users(id)
 );
@@ -44,6 +51,8 @@ CREATE TABLE IF NOT EXISTS punctuality_logs (
     meetup_id INT,
     status ENUM('on_time', 'late', 'absent'),
     score INT,
+    KEY idx_punctuality_user_meetup (user_id, meetup_id, score, status),
+    KEY idx_punctuality_meetup_user (meetup_id, user_id, score),
     FOREIGN KEY (user_id) REFERENCES users(id),
     FOREIGN KEY (meetup_id) REFERENCES meetups(id)
 );
@@ -54,6 +63,8 @@ CREATE TABLE IF NOT EXISTS invitations (
     user_id INT,
     meetup_id INT,
     status ENUM('pending', 'accepted', 'declined') DEFAULT 'pending',
+    UNIQUE KEY uniq_invitation_meetup_user (meetup_id, user_id),
+    KEY idx_invitations_user_status (user_id, status, meetup_id),
     FOREIGN KEY (user_id) REFERENCES users(id),
     FOREIGN KEY (meetup_id) REFERENCES meetups(id)
 );
@@ -65,4 +76,57 @@ CREATE TABLE IF NOT EXISTS user_profiles (
     FOREIGN KEY (user_id) REFERENCES users(id)
 );
 
+-- Last known position per user (see migrations/001_create_user_locations.sql)
+CREATE TABLE IF NOT EXISTS user_locations (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    user_id INT NOT NULL,
+    lat DOUBLE NOT NULL,
+    lng DOUBLE NOT NULL,
+    accuracy FLOAT NULL,
+    last_seen DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    UNIQUE KEY uniq_user (user_id)
+);
+
+-- Bucketed position history for the punctuality scorer (see migrations/007_location_history.sql)
+CREATE TABLE IF NOT EXISTS user_location_history (
+    user_id INT NOT NULL,
+    bucket DATETIME NOT NULL,
+    lat DOUBLE NOT NULL,
+    lng DOUBLE NOT NULL,
+    accuracy FLOAT NULL,
+    PRIMARY KEY (user_id, bucket),
+    KEY idx_location_history_bucket (bucket)
+);
+
+-- Materialized score totals (maintained by scores.py, rebuild with `python scores.py --rebuild`)
+CREATE TABLE IF NOT EXISTS user_scores (
+    user_id INT PRIMARY KEY,
+    total_score INT NOT NULL DEFAULT 0,
+    log_count INT NOT NULL DEFAULT 0,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS group_scores (
+    group_id INT NOT NULL,
+    user_id INT NOT NULL,
+    total_score INT NOT NULL DEFAULT 0,
+    log_count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (group_id, user_id),
+    KEY idx_group_scores_rank (group_id, total_score),
+    FOREIGN KEY (group_id) REFERENCES user_groups(id) ON DELETE CASCADE,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+-- Version counters for ETags / fragment caching (bumped by the write routes, see versions.py)
+CREATE TABLE IF NOT EXISTS entity_versions (
+    entity VARCHAR(16) NOT NULL,
+    entity_id INT NOT NULL,
+    version BIGINT UNSIGNED NOT NULL DEFAULT 1,
+    PRIMARY KEY (entity, entity_id)
+);
 
+-- Archived meetups and their rows (same columns; filled by `python archive.py`)
+CREATE TABLE IF NOT EXISTS meetups_archive LIKE meetups;
+CREATE TABLE IF NOT EXISTS invitations_archive LIKE invitations;
+CREATE TABLE IF NOT EXISTS punctuality_logs_archive LIKE punctuality_logs;
@@ -0,0 +1,129 @@
+-- SQLite twin of schema.sql for DATABASE_URL=sqlite://... (tests, benchmarks; see backends.py).
+-- Keep it in step with schema.sql and the migrations.
+
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username VARCHAR(150) NOT NULL UNIQUE COLLATE NOCASE,
+    password VARCHAR(255) NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS user_groups (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name VARCHAR(100) NOT NULL,
+    created_by INT REFERENCES users(id)
+);
+
+CREATE TABLE IF NOT EXISTS group_members (
+    group_id INT REFERENCES user_groups(id),
+    user_id INT REFERENCES users(id),
+    PRIMARY KEY (group_id, user_id)
+);
+
+CREATE TABLE IF NOT EXISTS meetups (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INT REFERENCES users(id),
+    group_id INT REFERENCES user_groups(id),
+    location VARCHAR(255),
+    scheduled_time DATETIME,
+    lat DOUBLE NULL,
+    lng DOUBLE NULL,
+    status TEXT DEFAULT 'scheduled' CHECK (status IN ('scheduled', 'canceled', 'rescheduled')),
+    created_by INT REFERENCES users(id),
+    scored_at DATETIME NULL
+);
+CREATE INDEX IF NOT EXISTS idx_meetups_user_time ON meetups (user_id, scheduled_time);
+CREATE INDEX IF NOT EXISTS idx_meetups_time ON meetups (scheduled_time);
+
+CREATE TABLE IF NOT EXISTS punctuality_logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INT REFERENCES users(id),
+    meetup_id INT REFERENCES meetups(id),
+    status TEXT CHECK (status IN ('on_time', 'late', 'absent')),
+    score INT
+);
+CREATE INDEX IF NOT EXISTS idx_punctuality_user_meetup ON punctuality_logs (user_id, meetup_id, score, status);
+CREATE INDEX IF NOT EXISTS idx_punctuality_meetup_user ON punctuality_logs (meetup_id, user_id, score);
+
+CREATE TABLE IF NOT EXISTS invitations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INT REFERENCES users(id),
+    meetup_id INT REFERENCES meetups(id),
+    status TEXT DEFAULT 'pending' CHECK (status IN ('pending', 'accepted', 'declined')),
+    UNIQUE (meetup_id, user_id)
+);
+CREATE INDEX IF NOT EXISTS idx_invitations_user_status ON invitations (user_id, status, meetup_id);
+
+CREATE TABLE IF NOT EXISTS user_profiles (
+    user_id INT PRIMARY KEY REFERENCES users(id),
+    bio TEXT
+);
+
+CREATE TABLE IF NOT EXISTS user_locations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INT NOT NULL UNIQUE REFERENCES users(id) ON DELETE CASCADE,
+    lat DOUBLE NOT NULL,
+    lng DOUBLE NOT NULL,
+    accuracy FLOAT NULL,
+    last_seen DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS user_location_history (
+    user_id INT NOT NULL,
+    bucket DATETIME NOT NULL,
+    lat DOUBLE NOT NULL,
+    lng DOUBLE NOT NULL,
+    accuracy FLOAT NULL,
+    PRIMARY KEY (user_id, bucket)
+);
+CREATE INDEX IF NOT EXISTS idx_location_history_bucket ON user_location_history (bucket);
+
+CREATE TABLE IF NOT EXISTS user_scores (
+    user_id INT PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    total_score INT NOT NULL DEFAULT 0,
+    log_count INT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS group_scores (
+    group_id INT NOT NULL REFERENCES user_groups(id) ON DELETE CASCADE,
+    user_id INT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    total_score INT NOT NULL DEFAULT 0,
+    log_count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (group_id, user_id)
+);
+CREATE INDEX IF NOT EXISTS idx_group_scores_rank ON group_scores (group_id, total_score);
+
+CREATE TABLE IF NOT EXISTS entity_versions (
+    entity VARCHAR(16) NOT NULL,
+    entity_id INT NOT NULL,
+    version BIGINT NOT NULL DEFAULT 1,
+    PRIMARY KEY (entity, entity_id)
+);
+
+-- archive tables: same columns, no keys beyond the id (archive.py copies rows with SELECT *)
+CREATE TABLE IF NOT EXISTS meetups_archive (
+    id INTEGER PRIMARY KEY,
+    user_id INT,
+    group_id INT,
+    location VARCHAR(255),
+    scheduled_time DATETIME,
+    lat DOUBLE NULL,
+    lng DOUBLE NULL,
+    status TEXT DEFAULT 'scheduled',
+    created_by INT,
+    scored_at DATETIME NULL
+);
+
+CREATE TABLE IF NOT EXISTS invitations_archive (
+    id INTEGER PRIMARY KEY,
+    user_id INT,
+    meetup_id INT,
+    status TEXT DEFAULT 'pending'
+);
+
+CREATE TABLE IF NOT EXISTS punctuality_logs_archive (
+    id INTEGER PRIMARY KEY,
+    user_id INT,
+    meetup_id INT,
+    status TEXT,
+    score INT
+);
@@ -0,0 +1,18 @@
+document.addEventListener("DOMContentLoaded", function() {
+  let scoreCircle = document.getElementById("scoreCircle");
+  let targetScore = parseInt(scoreCircle.dataset.score, 10);
+  let currentScore = 0;
+  let scoreText = document.getElementById("scoreText");
+
+  let interval = setInterval(function() {
+    if (currentScore >= targetScore) {
+      clearInterval(interval);
+      scoreCircle.classList.add("pulse");
+      setTimeout(() => scoreCircle.classList.remove("pulse"), 800);
+    } else {
+      currentScore++;
+      scoreText.textContent = currentScore + "%";
+      scoreCircle.style.background = `conic-gradient(#4caf50 ${currentScore}%, #e0e0e0 ${currentScore}%)`;
+    }
+  }, 20);
+});
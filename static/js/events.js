@@ -0,0 +1,48 @@
+(function(){
+  // Live updates pushed by the server (see events.py): toast + small in-page patches
+  if (!window.EventSource) return;
+  const urls = document.currentScript.dataset;   // data-events-url, data-invitations-url
+  const toasts = document.getElementById('eventToasts');
+  function toast(text, href) {
+    const el = document.createElement('div');
+    el.className = 'alert alert-info shadow-sm mb-2';
+    el.textContent = text + ' ';
+    if (href) {
+      const a = document.createElement('a');
+      a.href = href; a.textContent = 'View';
+      el.appendChild(a);
+    }
+    toasts.appendChild(el);
+    setTimeout(() => el.remove(), 8000);
+  }
+  function removeAll(selector) {
+    document.querySelectorAll(selector).forEach(el => el.remove());
+  }
+
+  const source = new EventSource(urls.eventsUrl);
+  source.addEventListener('invitation.created', e => {
+    const d = JSON.parse(e.data);
+    toast(`New invitation from ${d.sender}: ${d.location}`, urls.invitationsUrl);
+  });
+  ['invitation.accepted', 'invitation.declined'].forEach(type => source.addEventListener(type, e => {
+    const d = JSON.parse(e.data);
+    const status = type.split('.')[1];
+    document.querySelectorAll(`[data-member-status="${d.meetup_id}-${d.user_id}"]`)
+      .forEach(el => { el.textContent = ' — ' + status; });
+    toast(`${d.username} ${status} your invitation.`);
+  }));
+  source.addEventListener('invitation.kicked', e => {
+    const d = JSON.parse(e.data);
+    removeAll(`.invite-item[data-meetup-id="${d.meetup_id}"], #meetup-row-${d.meetup_id}`);
+    toast('You were removed from a meetup.');
+  });
+  ['meetup.canceled', 'meetup.deleted'].forEach(type => source.addEventListener(type, e => {
+    const d = JSON.parse(e.data);
+    removeAll(`.invite-item[data-meetup-id="${d.meetup_id}"]`);
+    if (type === 'meetup.deleted') removeAll(`#meetup-row-${d.meetup_id}`);
+    toast(`A meetup was ${type.split('.')[1]}.`);
+  }));
+  // the server dropped us for falling behind: the page is stale, start over
+  source.addEventListener('resync', () => { source.close(); window.location.reload(); });
+  window.addEventListener('beforeunload', () => source.close());
+})();
@@ -0,0 +1,253 @@
+/* ===== server-provided data (the #invitationsData block in invitations.html) ===== */
+const PAGE_DATA = JSON.parse(document.getElementById('invitationsData').textContent);
+const EXISTING_MEETUPS = PAGE_DATA.meetups;
+/* ================================ */
+
+/* ---- user multi-select (searches /api/users by username prefix) ---- */
+const userSearch = document.getElementById('userSearch');
+const userSuggestions = document.getElementById('userSuggestions');
+const selectedUsersDiv = document.getElementById('selectedUsers');
+const userIdsInput = document.getElementById('user_ids');
+const USER_SEARCH_URL = PAGE_DATA.searchUrl;
+const knownUsers = {};   // id -> username for selected chips
+let selectedUserIds = [];
+
+function renderSelectedChips(){
+  selectedUsersDiv.innerHTML = '';
+  selectedUserIds.forEach(id => {
+    const username = knownUsers[id];
+    if (!username) return;
+    const chip = document.createElement('span');
+    chip.className = 'chip';
+    chip.textContent = username + ' ';
+    const remove = document.createElement('span');
+    remove.className = 'remove';
+    remove.textContent = '✕';
+    remove.onclick = () => {
+      selectedUserIds = selectedUserIds.filter(x => String(x)!==String(id));
+      userIdsInput.value = JSON.stringify(selectedUserIds);
+      renderSelectedChips();
+    };
+    chip.appendChild(remove);
+    selectedUsersDiv.appendChild(chip);
+  });
+  userIdsInput.value = JSON.stringify(selectedUserIds);
+}
+
+let userSearchTimer = null;
+let userSearchSeq = 0;
+function showUserSuggestions(query) {
+  if (userSearchTimer) clearTimeout(userSearchTimer);
+  userSuggestions.innerHTML = '';
+  if (!query) { userSuggestions.style.display = 'none'; return; }
+  userSearchTimer = setTimeout(() => {
+    const seq = ++userSearchSeq;
+    fetch(`${USER_SEARCH_URL}?q=${encodeURIComponent(query)}&limit=10`, { credentials: 'same-origin' })
+      .then(r => r.json())
+      .then(data => {
+        if (seq !== userSearchSeq) return;   // a newer keystroke already fired
+        userSuggestions.innerHTML = '';
+        const matches = (data.users || []).filter(u => !selectedUserIds.includes(String(u.id)));
+        matches.forEach(u => {
+          const btn = document.createElement('button');
+          btn.type='button';
+          btn.className='list-group-item list-group-item-action';
+          btn.textContent = u.username;
+          btn.onclick = () => {
+            knownUsers[String(u.id)] = u.username;
+            selectedUserIds.push(String(u.id));
+            renderSelectedChips();
+            userSuggestions.style.display='none';
+            userSearch.value='';
+          };
+          userSuggestions.appendChild(btn);
+        });
+        userSuggestions.style.display = matches.length ? 'block' : 'none';
+      }).catch(() => { userSuggestions.style.display = 'none'; });
+  }, 200);
+}
+
+userSearch.addEventListener('input', (e) => showUserSuggestions(e.target.value));
+document.addEventListener('click', (e) => { if (!userSuggestions.contains(e.target) && e.target !== userSearch) userSuggestions.style.display='none'; });
+
+/* ---- Map & place autocomplete toggles ---- */
+const btnHaversine = document.getElementById('btnHaversine');
+const btnGoogle = document.getElementById('btnGoogle');
+const haversineMode = document.getElementById('haversine_mode');
+const googleMode = document.getElementById('google_mode');
+const placeSearch = document.getElementById('placeSearch');
+const placeSuggestions = document.getElementById('placeSuggestions');
+
+btnHaversine.addEventListener('click', () => {
+  btnHaversine.classList.add('active');
+  btnGoogle.classList.remove('active');
+  haversineMode.style.display = 'block';
+  googleMode.style.display = 'none';
+  setTimeout(()=>{ if (window.haversineMap && window.haversineMap.invalidateSize) window.haversineMap.invalidateSize(); }, 250);
+});
+btnGoogle.addEventListener('click', () => {
+  btnGoogle.classList.add('active');
+  btnHaversine.classList.remove('active');
+  haversineMode.style.display = 'none';
+  googleMode.style.display = 'block';
+  setTimeout(()=> {
+    if (window.googleMap && google && google.maps) {
+      google.maps.event.trigger(window.googleMap, 'resize');
+      const lat = parseFloat(document.getElementById('lat').value), lng = parseFloat(document.getElementById('lng').value);
+      if (!isNaN(lat) && !isNaN(lng)) window.googleMap.setCenter({lat, lng});
+    }
+  }, 300);
+});
+
+/* Initialize Leaflet map */
+window.addEventListener('DOMContentLoaded', () => {
+  try {
+    window.haversineMap = L.map('haversineMap').setView([8.228,124.245], 12);
+    L.tileLayer('https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png').addTo(window.haversineMap);
+  } catch(e){ console.warn('Leaflet init failed', e); }
+
+  window.havMarker = null;
+  if (window.haversineMap && window.haversineMap.on) {
+    window.haversineMap.on('click', function(e){
+      if (window.havMarker) window.haversineMap.removeLayer(window.havMarker);
+      window.havMarker = L.marker(e.latlng).addTo(window.haversineMap);
+      document.getElementById('lat').value = e.latlng.lat;
+      document.getElementById('lng').value = e.latlng.lng;
+    });
+  }
+
+  // Nominatim for place search (haversine mode)
+  let nomTimeout = null;
+  placeSearch.addEventListener('input', (e) => {
+    const q = e.target.value.trim();
+    placeSuggestions.innerHTML = '';
+    if (nomTimeout) clearTimeout(nomTimeout);
+    nomTimeout = setTimeout(() => {
+      if (q.length < 2) { placeSuggestions.style.display='none'; return; }
+      fetch(`https://nominatim.openstreetmap.org/search?format=json&q=${encodeURIComponent(q)}&limit=8`)
+        .then(r => r.json())
+        .then(results => {
+          placeSuggestions.innerHTML = '';
+          results.forEach(res => {
+            const btn = document.createElement('button');
+            btn.type='button';
+            btn.className='list-group-item list-group-item-action';
+            btn.textContent = res.display_name;
+            btn.onclick = () => {
+              const lat = parseFloat(res.lat), lon = parseFloat(res.lon);
+              document.getElementById('lat').value = lat;
+              document.getElementById('lng').value = lon;
+              placeSearch.value = res.display_name;
+              placeSuggestions.style.display='none';
+              if (btnHaversine.classList.contains('active') && window.haversineMap) {
+                if (window.havMarker) window.haversineMap.removeLayer(window.havMarker);
+                window.havMarker = L.marker([lat, lon]).addTo(window.haversineMap);
+                window.haversineMap.setView([lat, lon], 14);
+              } else if (window.googleMap) {
+                const loc = new google.maps.LatLng(lat, lon);
+                if (window.googleMarker) window.googleMarker.setMap(null);
+                window.googleMarker = new google.maps.Marker({ position: loc, map: window.googleMap });
+                window.googleMap.setCenter(loc);
+                window.googleMap.setZoom(14);
+              }
+            };
+            placeSuggestions.appendChild(btn);
+          });
+          placeSuggestions.style.display = results.length ? 'block' : 'none';
+        }).catch(()=>{ placeSuggestions.style.display='none'; });
+    }, 250);
+  });
+  document.addEventListener('click', (e) => { if (!placeSuggestions.contains(e.target) && e.target !== placeSearch) placeSuggestions.style.display='none'; });
+});
+
+/* Google Places + map init (global callback) */
+window.initGoogleComponents = function() {
+  try {
+    const googleMapEl = document.getElementById('googleMap');
+    window.googleMap = new google.maps.Map(googleMapEl, { center: { lat:8.228, lng:124.245 }, zoom: 12 });
+    window.googleMarker = null;
+    const ac = new google.maps.places.Autocomplete(document.getElementById('placeSearch'), { fields: ['geometry','formatted_address','name'] });
+    ac.addListener('place_changed', () => {
+      const place = ac.getPlace();
+      if (!place.geometry) return;
+      const lat = place.geometry.location.lat(), lng = place.geometry.location.lng();
+      document.getElementById('lat').value = lat;
+      document.getElementById('lng').value = lng;
+      if (window.googleMarker) window.googleMarker.setMap(null);
+      window.googleMarker = new google.maps.Marker({ position: place.geometry.location, map: window.googleMap });
+      window.googleMap.setCenter(place.geometry.location);
+      window.googleMap.setZoom(14);
+    });
+  } catch(err) { console.warn('Google components failed to initialize:', err); }
+};
+
+/* Meetup select centers maps */
+document.getElementById('meetupSelect').addEventListener('change', function(){
+  const opt = this.options[this.selectedIndex];
+  const lat = opt.dataset.lat, lng = opt.dataset.lng;
+  if (lat && lng) {
+    document.getElementById('lat').value = lat;
+    document.getElementById('lng').value = lng;
+    const latf = parseFloat(lat), lngf = parseFloat(lng);
+    if (btnHaversine.classList.contains('active') && window.haversineMap) {
+      if (window.havMarker) window.haversineMap.removeLayer(window.havMarker);
+      window.havMarker = L.marker([latf, lngf]).addTo(window.haversineMap);
+      window.haversineMap.setView([latf, lngf], 14);
+    } else if (window.googleMap) {
+      const loc = new google.maps.LatLng(latf, lngf);
+      if (window.googleMarker) window.googleMarker.setMap(null);
+      window.googleMarker = new google.maps.Marker({ position: loc, map: window.googleMap });
+      window.googleMap.setCenter(loc);
+      window.googleMap.setZoom(14);
+    }
+  }
+});
+
+/* Preview centers map on chosen coords */
+document.getElementById('previewBtn').addEventListener('click', () => {
+  const lat = parseFloat(document.getElementById('lat').value);
+  const lng = parseFloat(document.getElementById('lng').value);
+  if (!lat || !lng) return alert('No coordinates selected yet.');
+  if (btnHaversine.classList.contains('active') && window.haversineMap) {
+    if (window.havMarker) window.haversineMap.removeLayer(window.havMarker);
+    window.havMarker = L.marker([lat, lng]).addTo(window.haversineMap);
+    window.haversineMap.setView([lat, lng], 14);
+  } else if (window.googleMap) {
+    const loc = new google.maps.LatLng(lat, lng);
+    if (window.googleMarker) window.googleMarker.setMap(null);
+    window.googleMarker = new google.maps.Marker({ position: loc, map: window.googleMap });
+    window.googleMap.setCenter(loc);
+    window.googleMap.setZoom(14);
+  }
+});
+
+/* Ensure hidden user_ids set on submit */
+document.getElementById('createInviteForm').addEventListener('submit', function(){
+  if (!userIdsInput.value) userIdsInput.value = JSON.stringify(selectedUserIds);
+});
+
+/* AJAX accept/decline with fade-out */
+document.querySelectorAll('.respond-btn').forEach(btn => {
+  btn.addEventListener('click', function(e){
+    e.preventDefault();
+    const inviteId = this.dataset.inviteId;
+    const action = this.dataset.action;
+    fetch(PAGE_DATA.respondUrl, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8', 'X-Requested-With': 'XMLHttpRequest' },
+      body: new URLSearchParams({ invite_id: inviteId, action: action })
+    }).then(resp => {
+      if (resp.ok) {
+        const card = document.getElementById('invite-card-' + inviteId);
+        if (card) {
+          card.style.transition = 'opacity .28s, transform .28s';
+          card.style.opacity = '0';
+          card.style.transform = 'translateY(-10px)';
+          setTimeout(()=> card.remove(), 320);
+        }
+      } else {
+        resp.text().then(t => alert('Failed: ' + t));
+      }
+    }).catch(err => alert('Network error'));
+  });
+});
@@ -0,0 +1,82 @@
+(function(){
+  // Only run location prompt on /my_meetups
+  if (typeof window === 'undefined') return;
+  const path = window.location.pathname || '';
+  if (path !== '/my_meetups') return;
+
+  const key = 'homi_share_location_choice_v1'; // localStorage key
+
+  // If user remembered choice, do not show modal again.
+  const saved = localStorage.getItem(key);
+  if (saved === 'decline') return;
+  if (saved === 'accept') {
+    startSharing(); // already accepted previously
+    return;
+  }
+
+  // Show bootstrap modal
+  const locModalEl = document.getElementById('locationModal');
+  const locModal = new bootstrap.Modal(locModalEl);
+  locModal.show();
+
+  const form = document.getElementById('locationConsentForm');
+  const rememberCheckbox = document.getElementById('rememberLocationChoice');
+  document.getElementById('declineLocationBtn').addEventListener('click', () => {
+    if (rememberCheckbox.checked) localStorage.setItem(key, 'decline');
+  });
+
+  form.addEventListener('submit', function(e){
+    e.preventDefault();
+    if (rememberCheckbox.checked) localStorage.setItem(key, 'accept');
+    locModal.hide();
+    startSharing();
+  });
+
+  let watchId = null;
+  let periodicTimer = null;
+
+  function startSharing() {
+    // request a single immediate position and then watch/periodic updates
+    if (!navigator.geolocation) {
+      console.warn('Geolocation not supported');
+      return;
+    }
+
+    // helper to POST position to server
+    function postPos(lat, lng, accuracy) {
+      fetch('/update_location', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json', 'X-Requested-With': 'XMLHttpRequest' },
+        credentials: 'same-origin',
+        body: JSON.stringify({ lat: lat, lng: lng, accuracy: accuracy || null })
+      }).catch(err => console.warn('update_location failed', err));
+    }
+
+    // get one immediate fix
+    navigator.geolocation.getCurrentPosition(function(pos){
+      postPos(pos.coords.latitude, pos.coords.longitude, pos.coords.accuracy);
+    }, function(err){
+      console.warn('Initial geolocation denied or failed', err);
+    }, { enableHighAccuracy: true, maximumAge: 10000, timeout: 10000 });
+
+    // watchPosition (updates when device moves)
+    try {
+      watchId = navigator.geolocation.watchPosition(function(pos){
+        postPos(pos.coords.latitude, pos.coords.longitude, pos.coords.accuracy);
+      }, function(err){ console.warn('watchPosition error', err); }, { enableHighAccuracy: true, maximumAge: 5000 });
+    } catch (e) {
+      // fallback to periodic polling every 60s
+      periodicTimer = setInterval(function(){
+        navigator.geolocation.getCurrentPosition(function(pos){
+          postPos(pos.coords.latitude, pos.coords.longitude, pos.coords.accuracy);
+        });
+      }, 60 * 1000);
+    }
+
+    // When the page unloads, stop watching
+    window.addEventListener('beforeunload', function(){
+      if (watchId !== null && navigator.geolocation.clearWatch) navigator.geolocation.clearWatch(watchId);
+      if (periodicTimer) clearInterval(periodicTimer);
+    });
+  }
+})();
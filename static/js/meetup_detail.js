@@ -0,0 +1,45 @@
+// Meetup page: the location map and member ETAs. Values come from data-* attributes.
+function initMap() {
+  const el = document.getElementById('map');
+  const meetupLatLng = {
+    lat: parseFloat(el.dataset.lat),
+    lng: parseFloat(el.dataset.lng)
+  };
+
+  const map = new google.maps.Map(el, {
+    zoom: 15,
+    center: meetupLatLng
+  });
+
+  new google.maps.Marker({
+    position: meetupLatLng,
+    map: map,
+    title: "Meetup Location"
+  });
+}
+
+// Refresh member ETAs from their last shared location (server caches for a few seconds)
+document.addEventListener('DOMContentLoaded', function () {
+  const table = document.querySelector('[data-etas-url]');
+  const cells = document.querySelectorAll('.member-eta');
+  if (!table || !cells.length) return;
+  function refresh() {
+    fetch(table.dataset.etasUrl, { credentials: 'same-origin' })
+      .then(r => r.ok ? r.json() : null)
+      .then(data => {
+        if (!data) return;
+        const byUser = {};
+        data.participants.forEach(p => { byUser[String(p.user_id)] = p; });
+        cells.forEach(cell => {
+          const p = byUser[cell.dataset.userId];
+          cell.innerHTML = '';
+          const badge = document.createElement('span');
+          badge.className = p && p.eta ? 'badge bg-info' : 'text-muted';
+          badge.textContent = p && p.eta ? `${p.eta} (${p.distance_km} km)` : '—';
+          cell.appendChild(badge);
+        });
+      }).catch(() => {});
+  }
+  refresh();
+  setInterval(refresh, 30000);
+});
@@ -0,0 +1,159 @@
+(function () {
+  /* Smooth accordion open/close with easing (same script as before) */
+  function easeOutCubic(t) { return 1 - Math.pow(1 - t, 3); }
+  function animate({duration, timingFn, onUpdate, onComplete}) {
+    const start = performance.now();
+    let rafId = null;
+    function frame(now) {
+      const elapsed = Math.min(duration, now - start);
+      const progress = duration === 0 ? 1 : (elapsed / duration);
+      const eased = timingFn(progress);
+      onUpdate(eased);
+      if (elapsed < duration) {
+        rafId = requestAnimationFrame(frame);
+      } else {
+        onComplete && onComplete();
+      }
+    }
+    rafId = requestAnimationFrame(frame);
+    return () => { if (rafId) cancelAnimationFrame(rafId); };
+  }
+
+  function expandBody(bodyEl, cb) {
+    if (!bodyEl) return;
+    bodyEl.style.display = 'block';
+    const prev = bodyEl.style.height;
+    bodyEl.style.height = 'auto';
+    const targetHeight = bodyEl.scrollHeight;
+    bodyEl.style.height = prev;
+    bodyEl.setAttribute('aria-hidden','false');
+    const duration = Math.min(420, Math.max(200, targetHeight * 0.6));
+    animate({
+      duration,
+      timingFn: easeOutCubic,
+      onUpdate: (t) => { bodyEl.style.height = (targetHeight * t) + 'px'; },
+      onComplete: () => { bodyEl.style.height = 'auto'; cb && cb(); }
+    });
+  }
+
+  function collapseBody(bodyEl, cb) {
+    if (!bodyEl) return;
+    const startHeight = bodyEl.scrollHeight;
+    const duration = Math.min(360, Math.max(180, startHeight * 0.5));
+    bodyEl.style.height = startHeight + 'px';
+    bodyEl.setAttribute('aria-hidden','true');
+    animate({
+      duration,
+      timingFn: (t) => 1 - Math.pow(1 - t, 3),
+      onUpdate: (tt) => { const value = startHeight * (1 - tt); bodyEl.style.height = value + 'px'; },
+      onComplete: () => { bodyEl.style.height = '0px'; bodyEl.style.display = ''; cb && cb(); }
+    });
+  }
+
+  function closeOtherBodies(parentEl, exceptEl) {
+    const single = parentEl && parentEl.dataset && parentEl.dataset.single === 'true';
+    if (!single) return;
+    const bodies = parentEl.querySelectorAll('.meetup-body');
+    bodies.forEach(b => {
+      if (b === exceptEl) return;
+      if (b.getAttribute('aria-hidden') === 'false') {
+        collapseBody(b);
+        const toggle = parentEl.querySelector('[data-target="#' + b.id + '"]');
+        if (toggle) toggle.setAttribute('aria-expanded','false');
+      }
+    });
+  }
+
+  function getNavHeight() {
+    const nav = document.querySelector('.navbar');
+    return nav ? nav.offsetHeight : 0;
+  }
+
+  function scrollRowIntoView(rowEl) {
+    if (!rowEl) return;
+    const navH = getNavHeight();
+    const gap = 12;
+    const rect = rowEl.getBoundingClientRect();
+    const targetY = window.scrollY + rect.top - navH - gap;
+    window.scrollTo({ top: Math.max(0, Math.floor(targetY)), behavior: 'smooth' });
+  }
+
+  document.addEventListener('DOMContentLoaded', function () {
+    const Accordion = document.getElementById('meetupAccordion');
+    const toggles = document.querySelectorAll('.meetup-toggle');
+
+    document.querySelectorAll('.meetup-body').forEach(body => {
+      const hidden = body.getAttribute('aria-hidden') === 'true';
+      if (hidden) { body.style.height = '0px'; body.style.display = ''; }
+      else { body.style.display = 'block'; body.style.height = 'auto'; }
+    });
+
+    toggles.forEach(toggle => {
+      toggle.addEventListener('click', function (e) {
+        const targetSelector = this.dataset.target;
+        if (!targetSelector) return;
+        const body = document.querySelector(targetSelector);
+        if (!body) return;
+        const parent = Accordion;
+        const isOpen = body.getAttribute('aria-hidden') === 'false';
+        if (!isOpen) {
+          closeOtherBodies(parent, body);
+          expandBody(body, () => {
+            this.setAttribute('aria-expanded','true');
+            body.setAttribute('aria-hidden','false');
+            const focusable = body.querySelector('button, [href], input, select, textarea, [tabindex]:not([tabindex="-1"])');
+            if (focusable) try { focusable.focus({ preventScroll: true }); } catch(e){}
+          });
+          const row = this.closest('.meetup-row');
+          setTimeout(() => scrollRowIntoView(row), 160);
+          this.setAttribute('aria-expanded','true');
+        } else {
+          collapseBody(body, () => { this.setAttribute('aria-expanded','false'); });
+          this.setAttribute('aria-expanded','false');
+        }
+      });
+
+      toggle.addEventListener('keydown', function (e) {
+        if (e.key === 'Enter' || e.key === ' ') {
+          e.preventDefault(); this.click();
+        }
+      });
+    });
+
+    const autoOpenToggle = Array.from(toggles).find(t => t.getAttribute('aria-expanded') === 'true');
+    if (autoOpenToggle) {
+      const targetSel = autoOpenToggle.dataset.target;
+      const targetBody = document.querySelector(targetSel);
+      if (targetBody) {
+        expandBody(targetBody, () => {
+          const row = autoOpenToggle.closest('.meetup-row');
+          setTimeout(() => scrollRowIntoView(row), 120);
+        });
+      }
+    }
+
+    const mapModalEl = document.getElementById('mapModal');
+    const mapModalIframe = document.getElementById('mapModalIframe');
+    const mapModalTitle = document.getElementById('mapModalTitle');
+    let mapModal = mapModalEl ? new bootstrap.Modal(mapModalEl) : null;
+
+    document.querySelectorAll('.view-map-btn').forEach(btn => {
+      btn.addEventListener('click', function () {
+        const lat = this.dataset.lat;
+        const lng = this.dataset.lng;
+        const loc = this.dataset.location || 'Map';
+        if (!lat || !lng) return;
+        const url = `https://www.google.com/maps?q=${encodeURIComponent(lat)},${encodeURIComponent(lng)}&z=15&output=embed`;
+        if (mapModalIframe) mapModalIframe.src = url;
+        if (mapModalTitle) mapModalTitle.textContent = `Map — ${loc}`;
+        if (mapModal) mapModal.show();
+      });
+    });
+
+    if (mapModalEl) {
+      mapModalEl.addEventListener('hidden.bs.modal', function () {
+        if (mapModalIframe) mapModalIframe.src = '';
+      });
+    }
+  });
+})();
@@ -0,0 +1,97 @@
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import aiodb
+import app as app_module
+import db
+
+
+@pytest.fixture
+def api(app, client, monkeypatch):
+    """The ASGI tier over the test app; aiodb runs its statements through db.py's SQLite."""
+    monkeypatch.setattr(app_module, '_app', app)
+    import asgi
+    monkeypatch.setattr(asgi, 'flask_app', app)
+    calls = []
+
+    async def run(query, params, fetch, primary=True):
+        calls.append((fetch, primary))
+        if fetch == 'all':
+            return db.fetchall_dict(query, params)
+        if fetch == 'one':
+            return db.fetchone_dict(query, params)
+        return db.execute(query, params)
+    monkeypatch.setattr(aiodb, '_run', run)
+
+    for username in ('alice', 'bob'):
+        client.post('/signup', data={'username': username, 'password': 'secret'})
+    client.post('/login', data={'username': 'alice', 'password': 'secret'})
+    bob = db.fetchone_dict("SELECT id FROM users WHERE username = %s", ('bob',))['id']
+    client.post('/create_invitation', data={'invitees[]': [bob], 'location': 'Cafe', 'lat': '52.5', 'lng': '13.4'})
+    client.get('/logout')
+    client.post('/login', data={'username': 'bob', 'password': 'secret'})
+
+    api = TestClient(asgi.app)
+    api.cookies.set(app.config['SESSION_COOKIE_NAME'], client.get_cookie(app.config['SESSION_COOKIE_NAME']).value)
+    api.calls = calls
+    app_module.user_cache.clear()
+    return api
+
+
+def test_asgi_requires_login(api):
+    api.cookies.clear()
+    assert api.get('/api/nearby?lat=52.5&lng=13.4').status_code == 401
+
+
+def test_asgi_reads_the_user_on_a_cache_miss(api):
+    assert api.post('/get_eta', json={'lat': 52.5, 'lng': 13.4, 'destination': '52.51,13.41'}).status_code == 200
+    # a replica-eligible read
+    assert ('one', False) in api.calls
+
+
+def test_asgi_respond_invite(api):
+    invite = db.fetchone_dict("SELECT id, meetup_id FROM invitations")
+    response = api.post('/respond_invite', data={'invite_id': invite['id'], 'action': 'accept'},
+                        headers={'X-Requested-With': 'XMLHttpRequest'})
+    assert response.status_code == 204
+    assert db.fetchone_dict("SELECT status FROM invitations WHERE id = %s", (invite['id'],))['status'] == 'accepted'
+    assert db.fetchone_dict("SELECT version FROM entity_versions WHERE entity = 'meetup' AND entity_id = %s",
+                            (invite['meetup_id'],))['version'] == 2
+
+
+def test_asgi_nearby_and_etas(api):
+    meetup = db.fetchone_dict("SELECT id FROM meetups")['id']
+    assert api.post('/update_location', json={'lat': 52.5, 'lng': 13.4}).json()['ok']
+    response = api.get('/api/nearby?lat=52.5&lng=13.4&kind=meetups')
+    assert response.status_code == 200
+    assert [m['id'] for m in response.json()['meetups']] == [meetup]
+    response = api.get(f'/api/meetup/{meetup}/etas')
+    assert response.status_code == 200
+    assert response.json()['meetup_id'] == meetup
+    assert api.get('/api/meetup/999/etas').status_code == 403
+
+
+def test_asgi_writes_stick_to_the_primary(api, app, monkeypatch):
+    class Down:
+        name = 'replica'
+
+        def available(self):
+            return False
+    monkeypatch.setattr(db, 'get_replicas', lambda: [Down()])
+    invite = db.fetchone_dict("SELECT id FROM invitations")
+    response = api.post('/respond_invite', data={'invite_id': invite['id'], 'action': 'accept'},
+                        headers={'X-Requested-With': 'XMLHttpRequest'})
+    cookies = response.headers.get_list('set-cookie')
+    # only the stickiness cookie; the session cookie is left alone
+    assert len(cookies) == 1 and cookies[0].startswith(db.PRIMARY_COOKIE + '=')
+    assert db.sticky_until({}, {db.PRIMARY_COOKIE: api.cookies[db.PRIMARY_COOKIE]}) > time.time()
+    # buffered location pings don't stick
+    response = api.post('/update_location', json={'lat': 52.5, 'lng': 13.4})
+    assert 'set-cookie' not in response.headers
+
+
+def test_forged_primary_cookie_is_ignored():
+    assert db.sticky_until({}, {db.PRIMARY_COOKIE: str(time.time() + 3600)}) == 0
+    assert db.sticky_until({}, {db.PRIMARY_COOKIE: 'junk'}) == 0
@@ -0,0 +1,68 @@
+import db
+import passwords
+
+
+def signup(client, username='alice', password='secret'):
+    return client.post('/signup', data={'username': username, 'password': password})
+
+
+def login(client, username='alice', password='secret'):
+    return client.post('/login', data={'username': username, 'password': password})
+
+
+def test_signup_stores_a_bcrypt_hash(client):
+    response = signup(client)
+    assert response.status_code == 302
+    assert response.location.endswith('/login')
+    row = db.fetchone_dict("SELECT password FROM users WHERE username = %s", ('alice',))
+    assert row['password'] != 'secret'
+    assert passwords.check_sync(row['password'], 'secret')
+
+
+def test_login_and_logout(client):
+    signup(client)
+    response = login(client)
+    assert response.status_code == 302
+    assert response.location.endswith('/dashboard')
+    assert client.get('/dashboard').status_code == 200
+    client.get('/logout')
+    assert client.get('/dashboard').status_code == 401
+
+
+def test_login_rejects_a_wrong_password(client):
+    signup(client)
+    response = login(client, password='wrong')
+    assert response.status_code == 200
+    assert b'Invalid credentials' in response.data
+    assert client.get('/dashboard').status_code == 401
+
+
+def test_login_rejects_an_unknown_user(client):
+    response = login(client, username='nobody')
+    assert response.status_code == 200
+    assert b'Invalid credentials' in response.data
+
+
+def test_login_required_redirects(client):
+    response = client.get('/my_meetups')
+    assert response.status_code == 401
+
+
+def test_login_rehashes_at_the_configured_cost(client):
+    db.execute("INSERT INTO users (username, password) VALUES (%s, %s)",
+               ('bob', passwords.hash_sync('secret', 5)))
+    assert login(client, username='bob').status_code == 302
+    row = db.fetchone_dict("SELECT password FROM users WHERE username = %s", ('bob',))
+    assert passwords.cost_of(row['password']) == 4
+    assert passwords.check_sync(row['password'], 'secret')
+
+
+def test_login_busy_returns_503(client, monkeypatch):
+    signup(client)
+
+    def busy(*args):
+        raise passwords.Busy()
+    monkeypatch.setattr(passwords.get_hasher(), 'check', busy)
+    response = login(client)
+    assert response.status_code == 503
+    assert response.headers['Retry-After']
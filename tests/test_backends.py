@@ -0,0 +1,58 @@
+import sqlite3
+
+from backends import translate
+
+
+def test_placeholders():
+    assert translate("SELECT * FROM users WHERE id = %s AND username = %s") == \
+        "SELECT * FROM users WHERE id = ? AND username = ?"
+
+
+def test_on_duplicate_key_becomes_on_conflict():
+    sql = translate("INSERT INTO user_scores (user_id, total_score) VALUES (%s, %s) "
+                    "ON DUPLICATE KEY UPDATE total_score = total_score + VALUES(total_score)")
+    assert sql == ("INSERT INTO user_scores (user_id, total_score) VALUES (?, ?) "
+                   "ON CONFLICT DO UPDATE SET total_score = total_score + excluded.total_score")
+
+
+def test_insert_select_gets_a_where_before_on_conflict():
+    sql = translate("INSERT INTO a (x) SELECT y FROM b ON DUPLICATE KEY UPDATE x = VALUES(x)")
+    assert "FROM b  WHERE true ON CONFLICT DO UPDATE SET x = excluded.x" in sql
+    # one WHERE is enough
+    sql = translate("INSERT INTO a (x) SELECT y FROM b WHERE y > 1 ON DUPLICATE KEY UPDATE x = VALUES(x)")
+    assert "WHERE true" not in sql
+    assert sql.endswith("WHERE y > 1 ON CONFLICT DO UPDATE SET x = excluded.x")
+
+
+def test_insert_select_upsert_runs():
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE a (x INTEGER PRIMARY KEY, n INTEGER)")
+    conn.execute("CREATE TABLE b (y INTEGER)")
+    conn.executemany("INSERT INTO b VALUES (?)", [(1,), (2,)])
+    conn.execute("INSERT INTO a VALUES (1, 5)")
+    conn.execute(translate("INSERT INTO a (x, n) SELECT y, 1 FROM b "
+                           "ON DUPLICATE KEY UPDATE n = n + VALUES(n)"))
+    assert conn.execute("SELECT x, n FROM a ORDER BY x").fetchall() == [(1, 6), (2, 1)]
+
+
+def test_interval():
+    assert translate("SELECT m.scheduled_time + INTERVAL %s SECOND") == \
+        "SELECT datetime(m.scheduled_time, '+' || ? || ' seconds')"
+    assert translate("DELETE FROM h WHERE bucket < NOW() - INTERVAL 7 DAY") == \
+        "DELETE FROM h WHERE bucket < datetime(datetime('now', 'localtime'), '-' || 7 || ' days')"
+
+
+def test_now():
+    assert translate("UPDATE users SET seen_at = NOW()") == \
+        "UPDATE users SET seen_at = datetime('now', 'localtime')"
+
+
+def test_insert_ignore():
+    assert translate("INSERT IGNORE INTO invitations (user_id) VALUES (%s)") == \
+        "INSERT OR IGNORE INTO invitations (user_id) VALUES (?)"
+
+
+def test_truncate_and_for_update():
+    assert translate("TRUNCATE TABLE user_scores") == "DELETE FROM user_scores"
+    assert translate("SELECT id FROM meetups WHERE id = %s FOR UPDATE") == \
+        "SELECT id FROM meetups WHERE id = ?"
@@ -0,0 +1,55 @@
+import app as app_module
+import cache
+import db
+from cache import TTLCache
+
+
+def test_least_recently_used_entries_are_evicted():
+    c = TTLCache(maxsize=2)
+    c.set('a', 1)
+    c.set('b', 2)
+    assert c.get('a') == 1     # 'b' is now the oldest
+    c.set('c', 3)
+    assert c.get('b') is None
+    assert (c.get('a'), c.get('c')) == (1, 3)
+    assert c.stats()['evictions'] == 1
+
+
+def test_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, 'monotonic', lambda: now[0])
+    c = TTLCache(ttl=10)
+    c.set('a', 1)
+    c.set('b', 2, ttl=60)
+    now[0] += 11
+    assert c.get('a', 'gone') == 'gone'
+    assert c.get('b') == 2
+    stats = c.stats()
+    assert (stats['hits'], stats['misses'], stats['expired'], stats['size']) == (1, 1, 1, 1)
+
+
+def test_get_or_set_calls_the_factory_once():
+    c, calls = TTLCache(), []
+
+    def factory():
+        calls.append(1)
+        return 'value'
+    assert c.get_or_set('k', factory) == 'value'
+    assert c.get_or_set('k', factory) == 'value'
+    assert len(calls) == 1
+    c.invalidate('k')
+    c.get_or_set('k', factory)
+    assert len(calls) == 2
+
+
+def test_authenticated_requests_do_not_reread_users(client):
+    client.post('/signup', data={'username': 'alice', 'password': 'secret'})
+    client.post('/login', data={'username': 'alice', 'password': 'secret'})
+    client.get('/dashboard')
+    db.execute("UPDATE users SET username = 'renamed'")
+    # served from the cache, so the rename is not seen until it is invalidated
+    assert client.get('/dashboard').status_code == 200
+    assert app_module.user_cache.get('1').username == 'alice'
+    app_module.user_cache.invalidate('1')
+    client.get('/dashboard')
+    assert app_module.user_cache.get('1').username == 'renamed'
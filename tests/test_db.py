@@ -0,0 +1,98 @@
+import pytest
+
+import db
+from db import ConnectionPool, PoolTimeout
+
+
+class FakeConn:
+
+    def __init__(self):
+        self.closed = False
+        self.alive = True
+
+    def ping(self, reconnect=False):
+        if not self.alive:
+            raise OSError("gone away")
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+def make_pool(**kwargs):
+    opened = []
+
+    def connect():
+        opened.append(FakeConn())
+        return opened[-1]
+    return ConnectionPool(connect, **kwargs), opened
+
+
+def test_checkout_reuses_idle_connections():
+    pool, opened = make_pool(size=2, max_overflow=0)
+    conn = pool.checkout()
+    pool.checkin(conn)
+    assert pool.checkout() is conn
+    assert len(opened) == 1
+    assert pool.stats()['in_use'] == 1
+
+
+def test_overflow_connections_are_closed_on_checkin():
+    pool, opened = make_pool(size=1, max_overflow=1)
+    a, b = pool.checkout(), pool.checkout()
+    pool.checkin(a)
+    pool.checkin(b)
+    assert b.closed and not a.closed
+    assert pool.stats()['open'] == 1
+
+
+def test_checkout_times_out_when_exhausted():
+    pool, opened = make_pool(size=1, max_overflow=0, timeout=0.05)
+    pool.checkout()
+    with pytest.raises(PoolTimeout):
+        pool.checkout()
+    assert pool.stats()['timeouts'] == 1
+
+
+def test_old_connections_are_recycled(monkeypatch):
+    pool, opened = make_pool(size=1, max_overflow=0, recycle=60)
+    conn = pool.checkout()
+    pool.checkin(conn)
+    now = db.time.monotonic()
+    monkeypatch.setattr(db.time, 'monotonic', lambda: now + 61)
+    assert pool.checkout() is not conn
+    assert conn.closed
+    assert pool.stats()['recycled'] == 1
+
+
+def test_dead_connections_fail_the_pre_ping():
+    pool, opened = make_pool(size=1, max_overflow=0)
+    conn = pool.checkout()
+    pool.checkin(conn)
+    conn.alive = False
+    assert pool.checkout() is not conn
+    assert pool.stats()['ping_failures'] == 1
+
+
+def test_failed_connect_releases_its_slot():
+    def connect():
+        raise OSError("refused")
+    pool = ConnectionPool(connect, size=1, max_overflow=0, timeout=0.05)
+    for _ in range(2):
+        with pytest.raises(OSError):
+            pool.checkout()
+    assert pool.stats()['open'] == 0
+
+
+def test_stray_and_double_checkins_keep_the_count():
+    pool, opened = make_pool(size=2, max_overflow=0)
+    conn = pool.checkout()
+    pool.checkin(conn)
+    pool.checkin(conn)
+    stray = FakeConn()
+    pool.checkin(stray)
+    assert stray.closed and not conn.closed
+    assert pool.stats()['open'] == 1
+    assert pool.stats()['idle'] == 1
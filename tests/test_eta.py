@@ -0,0 +1,39 @@
+import pytest
+
+import eta
+from geo import haversine_km
+
+
+def row(user_id, lat, lng, role='member', dest=(52.52, 13.405)):
+    return {'user_id': user_id, 'username': f'u{user_id}', 'role': role, 'last_seen': None,
+            'lat': lat, 'lng': lng, 'dest_lat': dest[0], 'dest_lng': dest[1]}
+
+
+def test_participant_etas_match_the_scalar_estimate():
+    rows = [row(1, 52.50, 13.40, role='host'), row(2, 52.40, 13.20), row(3, None, None)]
+    result = eta.participant_etas(rows, 'walking')
+    assert [r['user_id'] for r in result] == [1, 2, 3]
+    for r, (lat, lng) in zip(result[:2], [(52.50, 13.40), (52.40, 13.20)]):
+        expected = eta._eta(haversine_km(lat, lng, 52.52, 13.405), eta.SPEED_KMH['walking'])
+        assert r['distance_km'] == pytest.approx(expected['distance_km'], abs=1e-3)
+        assert r['eta'] == expected['eta']
+    # no fix yet: listed without an ETA
+    assert result[2]['eta'] is None and result[2]['distance_km'] is None
+
+
+def test_participant_etas_list_a_host_once():
+    rows = [row(1, 52.5, 13.4, role='host'), row(1, 52.5, 13.4), row(2, 52.5, 13.4)]
+    assert [(r['user_id'], r['role']) for r in eta.participant_etas(rows)] == [(1, 'host'), (2, 'member')]
+
+
+def test_participant_etas_without_a_destination():
+    result = eta.participant_etas([row(1, 52.5, 13.4, dest=(None, None))])
+    assert result[0]['eta'] is None
+    assert eta.participant_etas([]) == []
+
+
+def test_format_minutes():
+    assert eta.format_minutes(None) is None
+    assert eta.format_minutes(0.2) == "< 1 min"
+    assert eta.format_minutes(12.4) == "12 min"
+    assert eta.format_minutes(135) == "2 h 15 min"
@@ -0,0 +1,64 @@
+import pytest
+from flask_login import login_user
+
+from app import User
+from events import KEEPALIVE, RESYNC, EventBroker, TooManyStreams, broker, format_event, stream
+
+
+def test_stream_closed_before_reading_unsubscribes(app):
+    before = broker.stats()['subscribers']
+    with app.test_request_context('/events'):
+        login_user(User(1, 'alice'))
+        response = app.view_functions['events']()
+        assert response.status_code == 200
+        assert broker.stats()['subscribers'] == before + 1
+        # the client goes away before the body is ever iterated
+        response.close()
+    assert broker.stats()['subscribers'] == before
+
+
+def test_broker_delivers_to_the_targeted_users():
+    b = EventBroker()
+    alice, bob = b.subscribe(1), b.subscribe(2)
+    event = b.publish(['1'], 'invitation.created', meetup_id=5)
+    assert alice.get(0) == event and event['data'] == {'meetup_id': 5}
+    assert bob.get(0) is None
+
+
+def test_broker_limits_streams_per_user():
+    b = EventBroker(max_per_user=2)
+    subs = [b.subscribe(1), b.subscribe(1)]
+    with pytest.raises(TooManyStreams):
+        b.subscribe(1)
+    b.subscribe(2)
+    b.unsubscribe(subs[0])
+    b.unsubscribe(subs[0])      # a second unsubscribe is harmless
+    b.subscribe(1)
+    stats = b.stats()
+    assert (stats['subscribers'], stats['rejected']) == (3, 1)
+
+
+def test_a_slow_subscriber_is_told_to_resync():
+    b = EventBroker(queue_size=2)
+    sub = b.subscribe(1)
+    for n in range(3):
+        b.publish([1], 'meetup.canceled', meetup_id=n)
+    body = stream(sub, max_age=5)
+    assert next(body).startswith('retry:')
+    assert next(body) == RESYNC
+    assert list(body) == []
+    assert b.stats()['subscribers'] == 1    # stream() unsubscribes from the module broker
+    b.unsubscribe(sub)
+    assert (b.stats()['subscribers'], b.stats()['overflowed']) == (0, 1)
+
+
+def test_streams_end_after_their_max_age():
+    sub = broker.subscribe(99)
+    body = stream(sub, max_age=0.01)
+    assert next(body).startswith('retry:')
+    assert list(body) == [KEEPALIVE]
+    assert sub not in broker._subs.get(99, ())
+
+
+def test_format_event():
+    assert format_event({'id': 3, 'type': 'x', 'data': {'a': 1}}) == 'id: 3\nevent: x\ndata: {"a":1}\n\n'
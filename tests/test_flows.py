@@ -0,0 +1,106 @@
+import db
+import versions
+
+
+def signup(client, *usernames):
+    for username in usernames:
+        client.post('/signup', data={'username': username, 'password': 'secret'})
+
+
+def login_as(client, username):
+    client.get('/logout')
+    client.post('/login', data={'username': username, 'password': 'secret'})
+    return db.fetchone_dict("SELECT id FROM users WHERE username = %s", (username,))['id']
+
+
+def user_score(user_id):
+    return db.fetchone_dict("SELECT total_score, log_count FROM user_scores WHERE user_id = %s", (user_id,))
+
+
+def test_meetup_lifecycle(client):
+    signup(client, 'alice', 'bob')
+    bob = login_as(client, 'bob')
+    alice = login_as(client, 'alice')
+
+    # create + invite in one request; a missing user is skipped, not inserted
+    response = client.post('/create_invitation', data={'invitees[]': [bob, 999], 'location': 'Cafe',
+                                                       'scheduled_time': '2030-01-01 10:00:00'})
+    assert response.status_code == 302
+    meetup = db.fetchone_dict("SELECT id FROM meetups WHERE user_id = %s", (alice,))['id']
+    invites = db.fetchall_dict("SELECT id, user_id, status FROM invitations WHERE meetup_id = %s", (meetup,))
+    assert [(i['user_id'], i['status']) for i in invites] == [(bob, 'pending')]
+    # a double submit adds nothing
+    client.post('/create_invitation', data={'invitees[]': [bob], 'meetup_id': meetup})
+    assert db.fetchone_dict("SELECT COUNT(*) AS n FROM invitations WHERE meetup_id = %s", (meetup,))['n'] == 1
+
+    assert client.get('/my_meetups').status_code == 200   # shows the flash, untagged
+    page = client.get('/my_meetups')
+    etag = page.headers['ETag']
+    assert client.get('/my_meetups', headers={'If-None-Match': etag}).status_code == 304
+    before = versions.get([('meetup', meetup), ('user', alice)])
+
+    login_as(client, 'bob')
+    response = client.post('/respond_invite', data={'invite_id': invites[0]['id'], 'action': 'accept'})
+    assert response.status_code == 302
+    assert db.fetchone_dict("SELECT status FROM invitations WHERE id = %s", (invites[0]['id'],))['status'] == 'accepted'
+    after = versions.get([('meetup', meetup), ('user', alice)])
+    assert all(after[key] > before[key] for key in before)
+
+    client.post('/submit_punctuality', data={'user_id': bob, 'meetup_id': meetup, 'status': 'on_time'})
+    assert user_score(bob) == {'total_score': 3, 'log_count': 1}
+
+    # the host's cached page is stale now
+    login_as(client, 'alice')
+    assert client.get('/my_meetups', headers={'If-None-Match': etag}).status_code == 200
+
+    client.post('/delete_meetup', data={'meetup_id': meetup})
+    assert db.fetchone_dict("SELECT id FROM meetups WHERE id = %s", (meetup,)) is None
+    assert db.fetchall_dict("SELECT id FROM invitations WHERE meetup_id = %s", (meetup,)) == []
+    assert db.fetchall_dict("SELECT id FROM punctuality_logs WHERE meetup_id = %s", (meetup,)) == []
+    assert user_score(bob) == {'total_score': 0, 'log_count': 0}
+    assert versions.get([('meetup', meetup)])[('meetup', meetup)] > after[('meetup', meetup)]
+
+
+def test_delete_meetup_is_owner_only(client):
+    signup(client, 'alice', 'mallory')
+    alice = login_as(client, 'alice')
+    client.post('/create_invitation', data={'invitees[]': [alice], 'location': 'Park'})
+    meetup = db.fetchone_dict("SELECT id FROM meetups WHERE user_id = %s", (alice,))['id']
+
+    login_as(client, 'mallory')
+    client.post('/delete_meetup', data={'meetup_id': meetup})
+    assert db.fetchone_dict("SELECT id FROM meetups WHERE id = %s", (meetup,)) is not None
+
+
+def test_pages_with_a_flash_are_not_tagged(client):
+    signup(client, 'alice', 'bob')
+    bob = login_as(client, 'bob')
+    login_as(client, 'alice')
+    client.post('/create_invitation', data={'invitees[]': [bob], 'location': 'Cafe'})
+
+    page = client.get('/invitations')
+    assert b'Invitations sent successfully' in page.data
+    assert 'ETag' not in page.headers
+    assert page.headers['Cache-Control'] == 'no-store'
+    # the next render has no flash and may be revalidated
+    page = client.get('/invitations')
+    assert b'Invitations sent successfully' not in page.data
+    assert client.get('/invitations', headers={'If-None-Match': page.headers['ETag']}).status_code == 304
+
+
+def test_invite_and_kick_reject_bad_ids(client):
+    signup(client, 'alice', 'bob')
+    bob = login_as(client, 'bob')
+    alice = login_as(client, 'alice')
+    client.post('/create_invitation', data={'invitees[]': [alice], 'location': 'Park'})
+    meetup = db.fetchone_dict("SELECT id FROM meetups WHERE user_id = %s", (alice,))['id']
+
+    assert client.post('/invite', data={'meetup_id': meetup}).status_code == 400
+    assert client.post('/invite', data={'meetup_id': meetup, 'user_id': 'bob'}).status_code == 400
+    assert client.post('/invite', data={'meetup_id': meetup, 'user_id': 999}).status_code == 400
+    assert client.post('/kick_user', data={'meetup_id': meetup, 'user_id': ''}).status_code == 400
+    assert db.fetchone_dict("SELECT COUNT(*) AS n FROM invitations WHERE meetup_id = %s", (meetup,))['n'] == 1
+
+    assert client.post('/invite', data={'meetup_id': meetup, 'user_id': bob}).status_code == 302
+    assert client.post('/kick_user', data={'meetup_id': meetup, 'user_id': bob}).status_code == 302
+    assert db.fetchone_dict("SELECT COUNT(*) AS n FROM invitations WHERE meetup_id = %s", (meetup,))['n'] == 1
@@ -0,0 +1,54 @@
+import random
+
+import pytest
+
+from geo import GridIndex, haversine_km
+
+
+def brute_force(points, lat, lng, radius_km):
+    return sorted(k for k, (plat, plng) in points.items() if haversine_km(lat, lng, plat, plng) <= radius_km)
+
+
+def test_points_just_across_a_cell_boundary():
+    index = GridIndex(cell_deg=0.01)
+    index.upsert('same', 52.00985, 13.00985)
+    index.upsert('east', 52.00995, 13.01005)
+    index.upsert('north', 52.01005, 13.00995)
+    index.upsert('diagonal', 52.01005, 13.01005)
+    index.upsert('far', 52.0110, 13.0110)
+    # the query sits in a cell corner, metres from its three neighbours
+    hits = index.within(52.00995, 13.00995, 0.05)
+    assert sorted(k for k, _, _ in hits) == ['diagonal', 'east', 'north', 'same']
+    assert len(index.within(52.00995, 13.00995, 0.05, limit=2)) == 2
+
+
+def test_antimeridian_and_poles():
+    index = GridIndex(cell_deg=0.5)
+    index.upsert('fiji', -17.0, 179.99)
+    index.upsert('samoa', -17.0, -179.99)
+    index.upsert('pole', 89.99, 0.0)
+    assert sorted(k for k, _, _ in index.within(-17.0, 180.0, 5)) == ['fiji', 'samoa']
+    assert [k for k, _, _ in index.within(89.99, 120.0, 5)] == ['pole']
+
+
+def test_moves_and_removals():
+    index = GridIndex()
+    index.upsert(1, 52.0, 13.0, payload='a')
+    index.upsert(1, 48.0, 11.0, payload='b')
+    assert index.within(52.0, 13.0, 1) == []
+    assert [(k, p) for k, _, p in index.within(48.0, 11.0, 1)] == [(1, 'b')]
+    index.remove(1)
+    assert len(index) == 0 and index.within(48.0, 11.0, 1) == []
+
+
+@pytest.mark.parametrize('radius_km', [0.3, 2, 25, 500])
+def test_within_matches_a_full_scan(radius_km):
+    rng = random.Random(radius_km)
+    index, points = GridIndex(cell_deg=0.01), {}
+    for key in range(2000):
+        lat, lng = 52.0 + rng.uniform(-3, 3), 13.0 + rng.uniform(-3, 3)
+        index.upsert(key, lat, lng)
+        points[key] = (lat, lng)
+    hits = index.within(52.0, 13.0, radius_km)
+    assert sorted(k for k, _, _ in hits) == brute_force(points, 52.0, 13.0, radius_km)
+    assert [d for _, d, _ in hits] == sorted(d for _, d, _ in hits)
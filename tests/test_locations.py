@@ -0,0 +1,61 @@
+import pytest
+
+import db
+from locations import LocationBuffer
+
+
+@pytest.fixture
+def buffer(app):
+    for name in ('alice', 'bob'):
+        db.execute("INSERT INTO users (username, password) VALUES (%s, %s)", (name, 'x'))
+    buffer = LocationBuffer(flush_interval=60, min_move_m=10, heartbeat=60, history_bucket_s=60)
+    yield buffer
+    buffer.close()
+
+
+def stored(user_id):
+    return db.fetchone_dict("SELECT lat, lng FROM user_locations WHERE user_id = %s", (user_id,))
+
+
+def test_fixes_are_coalesced_until_the_flush(buffer):
+    assert buffer.submit(1, 52.0, 13.0)
+    assert buffer.submit(1, 52.1, 13.1)
+    assert buffer.submit(2, 48.0, 11.0)
+    assert stored(1) is None
+    assert buffer.flush() == 2
+    assert stored(1) == {'lat': 52.1, 'lng': 13.1}
+    assert stored(2) == {'lat': 48.0, 'lng': 11.0}
+    assert db.fetchone_dict("SELECT COUNT(*) AS n FROM user_location_history")['n'] == 2
+    stats = buffer.stats()
+    assert (stats['received'], stats['coalesced'], stats['written'], stats['pending']) == (3, 1, 2, 0)
+
+
+def test_small_moves_are_dropped_until_the_heartbeat(buffer):
+    buffer.submit(1, 52.0, 13.0, accuracy=20)
+    buffer.flush()
+    assert not buffer.submit(1, 52.00001, 13.0, accuracy=20)      # ~1 m
+    assert buffer.submit(1, 52.00001, 13.0, accuracy=5)           # much sharper
+    buffer.flush()
+    assert buffer.submit(1, 52.001, 13.0)                         # ~110 m
+    assert buffer.stats()['dropped'] == 1
+
+
+def test_listeners_see_stored_fixes(buffer):
+    seen = []
+    buffer.add_listener(lambda user_id, lat, lng, seen_at: seen.append((user_id, lat, lng)))
+    buffer.submit(1, 52.0, 13.0)
+    buffer.flush()
+    assert seen == [(1, 52.0, 13.0)]
+
+
+def test_a_failed_flush_requeues_the_batch(buffer, monkeypatch):
+    buffer.submit(1, 52.0, 13.0)
+
+    def fail(*args):
+        raise RuntimeError("db down")
+    monkeypatch.setattr('locations.executemany', fail)
+    assert buffer.flush() == 0
+    assert buffer.stats()['pending'] == 1
+    monkeypatch.undo()
+    assert buffer.flush() == 1
+    assert stored(1) == {'lat': 52.0, 'lng': 13.0}
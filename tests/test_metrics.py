@@ -0,0 +1,63 @@
+import logging
+
+import db
+import metrics
+from db import fingerprint
+
+
+def test_fingerprint_normalizes_literals_and_lists():
+    assert fingerprint("SELECT *  FROM users\n WHERE name = 'o''k' AND n = 42") == \
+        "SELECT * FROM users WHERE name = ? AND n = ?"
+    assert fingerprint("SELECT id FROM m WHERE id IN (%s, %s, %s)") == \
+        fingerprint("SELECT id FROM m WHERE id IN (%s, %s)") == "SELECT id FROM m WHERE id IN (...)"
+    assert fingerprint("INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s), (%s, %s)") == \
+        "INSERT INTO t (a, b) VALUES (...)"
+    # digits inside names are not literals
+    assert fingerprint("SELECT * FROM t2 WHERE x = 1.5") == "SELECT * FROM t2 WHERE x = ?"
+
+
+def test_histogram_buckets_are_cumulative():
+    h = metrics.Histogram((1, 5))
+    for value in (0.5, 3, 10):
+        h.observe(('r', 'GET'), value)
+    lines = h.render('x', ('route', 'method'))
+    assert 'x_bucket{route="r",method="GET",le="1"} 1' in lines
+    assert 'x_bucket{route="r",method="GET",le="5"} 2' in lines
+    assert 'x_bucket{route="r",method="GET",le="+Inf"} 3' in lines
+    assert 'x_sum{route="r",method="GET"} 13.5' in lines
+
+
+def test_responses_carry_server_timing(client):
+    response = client.get('/login')
+    assert 'db;dur=' in response.headers['Server-Timing']
+    assert 'app;dur=' in response.headers['Server-Timing']
+
+
+def test_repeated_statements_are_logged(app, caplog, monkeypatch):
+    monkeypatch.setattr(metrics, 'REPEATED_QUERY_WARN', 3)
+
+    @app.route('/n_plus_one')
+    def n_plus_one():
+        for user_id in range(3):
+            db.fetchone_dict("SELECT id FROM users WHERE id = %s", (user_id,))
+        return 'ok'
+    with caplog.at_level(logging.WARNING, logger='homimeet.requests'):
+        app.test_client().get('/n_plus_one')
+    assert "ran the same statement 3 times: SELECT id FROM users WHERE id = ?" in caplog.text
+
+
+def test_metrics_is_loopback_only_without_a_token(client):
+    assert client.get('/metrics').status_code == 200
+    assert client.get('/metrics', environ_base={'REMOTE_ADDR': '203.0.113.5'}).status_code == 403
+    # proxied from the same host
+    assert client.get('/metrics', headers={'X-Forwarded-For': '203.0.113.5'}).status_code == 403
+
+
+def test_metrics_token(app, client):
+    app.config['METRICS_TOKEN'] = 'scrape'
+    assert client.get('/metrics').status_code == 403
+    assert client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 403
+    response = client.get('/metrics', headers={'Authorization': 'Bearer scrape'},
+                          environ_base={'REMOTE_ADDR': '203.0.113.5'})
+    assert response.status_code == 200
+    assert 'homimeet_db_queries_total' in response.get_data(as_text=True)
@@ -0,0 +1,54 @@
+import sqlite3
+from datetime import datetime
+
+from backends import translate
+from pagination import decode_cursor, encode_cursor, keyset_clause, page_size, split_page
+
+
+def test_cursor_round_trip():
+    token = encode_cursor(datetime(2030, 1, 2, 3, 4, 5), 42)
+    assert decode_cursor(token) == ('2030-01-02 03:04:05', 42)
+    assert decode_cursor(encode_cursor(None, 7)) == (None, 7)
+
+
+def test_bad_cursors_start_over():
+    assert decode_cursor(None) is None
+    assert decode_cursor('') is None
+    assert decode_cursor('not-a-cursor') is None
+
+
+def test_page_size_is_clamped():
+    assert page_size(None) == 20
+    assert page_size('abc', default=5) == 5
+    assert page_size('0') == 1
+    assert page_size('1000') == 100
+
+
+def test_split_page():
+    rows = [{'id': i, 'scheduled_time': f'2030-01-0{i}'} for i in (3, 2, 1)]
+    assert split_page(rows, 3) == (rows, None)
+    page, cursor = split_page(rows, 2)
+    assert page == rows[:2]
+    assert decode_cursor(cursor) == ('2030-01-02', 2)
+
+
+def test_keyset_pages_cover_every_row_once():
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE m (id INTEGER PRIMARY KEY, scheduled_time TEXT)")
+    # ties on the time and NULL times, which sort last
+    times = ['2030-01-01', '2030-01-02', '2030-01-02', None, '2030-01-03', None, '2030-01-02']
+    conn.executemany("INSERT INTO m (scheduled_time) VALUES (?)", [(t,) for t in times])
+    expected = [r[0] for r in conn.execute(
+        "SELECT id FROM m ORDER BY scheduled_time IS NULL, scheduled_time DESC, id DESC")]
+
+    seen, cursor = [], None
+    while True:
+        clause, params = keyset_clause(decode_cursor(cursor), "scheduled_time", "id")
+        rows = [{'id': i, 'scheduled_time': t} for i, t in conn.execute(translate(
+            f"SELECT id, scheduled_time FROM m WHERE {clause} "
+            "ORDER BY scheduled_time IS NULL, scheduled_time DESC, id DESC LIMIT %s"), params + (3,))]
+        page, cursor = split_page(rows, 2)
+        seen += [r['id'] for r in page]
+        if cursor is None:
+            break
+    assert seen == expected
@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta
+
+from punctuality import classify
+
+START = datetime(2030, 1, 1, 18, 0)
+MEETUPS = {1: (52.52, 13.405, START)}
+
+
+def fix(user_id, minutes, lat=52.52, lng=13.405, accuracy=None, meetup_id=1):
+    return {'meetup_id': meetup_id, 'user_id': user_id, 'bucket': START + timedelta(minutes=minutes),
+            'lat': lat, 'lng': lng, 'accuracy': accuracy}
+
+
+def test_arrival_time_decides_the_status():
+    pairs = [(1, 10), (1, 11), (1, 12), (1, 13)]
+    fixes = [
+        fix(10, -10), fix(10, 20),            # early: the first arrival counts
+        fix(11, 4),                           # inside the 5 minute grace
+        fix(12, 6), fix(12, 29),              # late
+        fix(13, 31), fix(13, -5, lat=52.6),   # too late, and far away before that
+    ]
+    assert classify(MEETUPS, pairs, fixes) == [
+        (10, 1, 'on_time'), (11, 1, 'on_time'), (12, 1, 'late'), (13, 1, 'absent')]
+
+
+def test_fixes_away_from_the_meetup_do_not_count():
+    # ~220 m away: outside the 150 m radius unless the fix is that inaccurate,
+    # but an accuracy only widens it by up to 100 m
+    assert classify(MEETUPS, [(1, 10)], [fix(10, 0, lat=52.522)]) == [(10, 1, 'absent')]
+    assert classify(MEETUPS, [(1, 10)], [fix(10, 0, lat=52.522, accuracy=80)]) == [(10, 1, 'on_time')]
+    assert classify(MEETUPS, [(1, 10)], [fix(10, 0, lat=52.5235, accuracy=500)]) == [(10, 1, 'absent')]
+
+
+def test_invitees_without_history():
+    assert classify(MEETUPS, [(1, 10)], []) == []
+    assert classify(MEETUPS, [(1, 10)], [], no_data='absent') == [(10, 1, 'absent')]
+    assert classify(MEETUPS, [], [fix(10, 0)]) == []
+    # fixes for pairs that were not asked about are ignored
+    assert classify(MEETUPS, [(1, 10)], [fix(11, 0)]) == []
@@ -0,0 +1,128 @@
+"""Entity version counters for conditional GETs and fragment caching.
+
+Write routes bump ('user', id), ('meetup', id) and ('group', id) counters
+in entity_versions; read routes build a weak ETag from the counters they
+depend on and answer 304 when the browser already has that page, before
+running any page query. The same counters key the rendered fragment cache,
+so a changed meetup invalidates only its own cached blocks.
+"""
+import hashlib
+import os
+from pathlib import Path
+
+from flask import g, make_response, request, session
+
+from cache import TTLCache
+from db import execute, fetchall_dict
+
+BUMP = """
+    INSERT INTO entity_versions (entity, entity_id, version) VALUES {rows}
+    ON DUPLICATE KEY UPDATE version = version + 1
+"""
+
+# everyone who sees the meetups on their pages: hosts and every invitee
+BUMP_PARTICIPANTS = """
+    INSERT INTO entity_versions (entity, entity_id, version)
+    SELECT 'user', p.user_id, 1 FROM (
+        SELECT user_id FROM meetups WHERE id IN ({marks})
+        UNION
+        SELECT user_id FROM invitations WHERE meetup_id IN ({marks})
+    ) p WHERE p.user_id IS NOT NULL
+    ON DUPLICATE KEY UPDATE version = version + 1
+"""
+
+
+def bump_sql(count):
+    """BUMP for `count` keys; pass the (entity, id) pairs flattened."""
+    return BUMP.format(rows=", ".join(["(%s, %s, 1)"] * count))
+
+
+def bump_participants_sql(count):
+    """BUMP_PARTICIPANTS for `count` meetup ids; pass the ids twice."""
+    return BUMP_PARTICIPANTS.format(marks=", ".join(["%s"] * count))
+
+
+fragments = TTLCache(maxsize=int(os.environ.get("FRAGMENT_CACHE_SIZE", 5000)),
+                     ttl=float(os.environ.get("FRAGMENT_CACHE_TTL_S", 3600)))
+
+
+def bump(*keys):
+    """Bump ('entity', id) counters; sorted so concurrent bumps lock in one order."""
+    keys = sorted({(entity, int(entity_id)) for entity, entity_id in keys})
+    if keys:
+        # one multi-row statement, one round trip
+        execute(bump_sql(len(keys)), tuple(v for key in keys for v in key))
+
+
+def bump_meetup(meetup_id, *user_ids):
+    """A meetup or its member list changed: bump it and every participant.
+
+    Call after inserts and before deletes, so the affected rows are still
+    there to be found; `user_ids` adds users who are no longer linked.
+    """
+    execute(bump_participants_sql(1), (meetup_id, meetup_id))
+    bump(('meetup', meetup_id), *(('user', u) for u in user_ids))
+
+
+def get(keys):
+    """{(entity, id): version} for `keys`; never-bumped entities are 0."""
+    keys = list({(entity, int(entity_id)) for entity, entity_id in keys})
+    versions = dict.fromkeys(keys, 0)
+    if keys:
+        marks = ", ".join(["(%s, %s)"] * len(keys))
+        for r in fetchall_dict(f"SELECT entity, entity_id, version FROM entity_versions "
+                               f"WHERE (entity, entity_id) IN ({marks})",
+                               tuple(v for key in keys for v in key)):
+            versions[(r['entity'], r['entity_id'])] = r['version']
+    return versions
+
+
+_build = None
+
+
+def build_tag():
+    """Changes whenever the templates or built assets do, so a deploy never serves a stale 304."""
+    global _build
+    if _build is None:
+        root = Path(__file__).resolve().parent
+        # pages embed fingerprinted asset URLs, so a new asset build is a new page
+        stamps = [p.stat().st_mtime_ns for p in root.joinpath('templates').rglob('*.html')]
+        stamps += [p.stat().st_mtime_ns for p in root.joinpath('static', 'dist').glob('manifest.json')]
+        stamp = max(stamps, default=0)
+        _build = os.environ.get("APP_BUILD", "") + str(stamp)
+    return _build
+
+
+def etag_for(*parts):
+    raw = "|".join(str(p) for p in (build_tag(),) + parts)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:20]
+
+
+def not_modified(*parts):
+    """ETag for the current request plus a 304 response if the client has it.
+
+    Requests with pending flash messages always render, so the message
+    is not left behind in the session, and `tagged` sends that page
+    untagged: the flash is not part of the tag, so a later 304 would
+    bring it back.
+    """
+    tag = etag_for(request.path, request.query_string.decode('latin-1'), *parts)
+    if '_flashes' in session:
+        g.flashed = True
+        return tag, None
+    if request.if_none_match.contains_weak(tag):
+        response = make_response('', 304)
+        response.set_etag(tag, weak=True)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return tag, response
+    return tag, None
+
+
+def tagged(response, tag):
+    response = make_response(response)
+    if g.get('flashed'):
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+    response.set_etag(tag, weak=True)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response